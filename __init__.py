@@ -6,6 +6,8 @@ ComfyUI-FasterWhisper: Video/Audio Transcription Plugin
 - 媒体加载器: 加载视频和音频文件，支持预览
 - 语音识别: 使用 faster-whisper 进行语音转文字
 - 视频烧录: 将字幕烧录到视频中
+- 字幕预览: 只渲染少量画面快速调整字幕样式
+- 多版本烧录: 一次解码输出多个字幕版本和分辨率
 - 保存视频: 保存处理后的视频
 - 文本展示: 查看 SRT 字幕内容
 """
@@ -25,6 +27,8 @@ os.makedirs(MEDIA_INPUT_DIR, exist_ok=True)
 from .nodes.media_loader import MediaLoaderNode
 from .nodes.speech_recognition import SpeechRecognitionNode
 from .nodes.video_burn import VideoBurnNode
+from .nodes.subtitle_preview import SubtitlePreviewNode
+from .nodes.video_burn_multi import VideoBurnMultiNode
 from .nodes.save_video import SaveVideoNode
 from .nodes.text_display import TextDisplayNode
 from .nodes.cloud_api_model_loader import CloudApiModelLoaderNode
@@ -35,6 +39,8 @@ NODE_CLASS_MAPPINGS = {
     "FW_MediaLoader": MediaLoaderNode,
     "FW_SpeechRecognition": SpeechRecognitionNode,
     "FW_VideoBurn": VideoBurnNode,
+    "FW_SubtitlePreview": SubtitlePreviewNode,
+    "FW_VideoBurnMulti": VideoBurnMultiNode,
     "FW_SaveVideo": SaveVideoNode,
     "FW_TextDisplay": TextDisplayNode,
     "FW_CloudApiModelLoader": CloudApiModelLoaderNode,
@@ -46,6 +52,8 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "FW_MediaLoader": "🎬 媒体加载器 (视频/音频)",
     "FW_SpeechRecognition": "🎤 语音识别文字",
     "FW_VideoBurn": "📝 文本与视频烧录",
+    "FW_SubtitlePreview": "🔍 字幕样式预览",
+    "FW_VideoBurnMulti": "🎞️ 多版本烧录 (单次解码)",
     "FW_SaveVideo": "💾 保存视频",
     "FW_TextDisplay": "📄 文本展示框",
     "FW_CloudApiModelLoader": "☁️ 云端大模型设置",
@@ -55,6 +63,14 @@ NODE_DISPLAY_NAME_MAPPINGS = {
 # Web 目录
 WEB_DIRECTORY = "./web"
 
+# 注册服务器 API 路由（上传、媒体列表等）
+try:
+    from server import PromptServer
+    from .server_api import register_routes
+    register_routes(PromptServer.instance.routes)
+except Exception as e:
+    print(f"\033[93m[FasterWhisper]\033[0m API 路由注册失败: {e}")
+
 # 导出
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS', 'WEB_DIRECTORY']
 
@@ -68,6 +68,63 @@ class CloudApiModelLoaderNode:
                     "default": "自动检测",
                     "tooltip": "API 格式：\n- 自动检测: 根据 URL 自动判断\n- Chat Completions: 使用 messages 数组\n- Completions: 使用 prompt 字符串（doubao-seed 等）",
                 }),
+                "batch_size": ("INT", {
+                    "default": 40,
+                    "min": 1,
+                    "max": 100,
+                    "step": 1,
+                    "tooltip": "每个请求最多翻译的字幕条数，实际按 token 预算装箱；1 表示逐条翻译",
+                }),
+                "context_window": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 2000000,
+                    "step": 1024,
+                    "tooltip": "模型上下文长度（token），用于计算每批的输入预算；0 表示自动（32768）",
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 16,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1,
+                    "tooltip": "同时进行的翻译请求数，云端接口通常可承受 16-32 个并发",
+                }),
+                "request_timeout": ("INT", {
+                    "default": 60,
+                    "min": 5,
+                    "max": 1800,
+                    "step": 5,
+                    "tooltip": "单个请求的超时时间（秒）",
+                }),
+                "translation_memory": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "启用翻译记忆：相同的字幕直接使用以前的译文",
+                }),
+                "stream": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "流式接收模型输出，每条译文完成即显示在文本展示框中；接口不支持流式响应时关闭",
+                }),
+                "rpm_limit": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 100000,
+                    "step": 1,
+                    "tooltip": "每分钟请求数上限，0 表示不限制（按服务商账号的限额填写）",
+                }),
+                "tpm_limit": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 100000000,
+                    "step": 1000,
+                    "tooltip": "每分钟 token 数上限（估算值），0 表示不限制",
+                }),
+                "max_retries": ("INT", {
+                    "default": 5,
+                    "min": 0,
+                    "max": 20,
+                    "step": 1,
+                    "tooltip": "限流（429）、服务端临时错误和网络错误的最大重试次数",
+                }),
             },
         }
 
@@ -87,6 +144,15 @@ class CloudApiModelLoaderNode:
         max_tokens=1024,
         system_prompt="",
         api_format="自动检测",
+        batch_size=40,
+        context_window=0,
+        max_concurrency=16,
+        request_timeout=60,
+        translation_memory=True,
+        stream=True,
+        rpm_limit=0,
+        tpm_limit=0,
+        max_retries=5,
     ):
         resolved_api_url = (api_url or "").strip()
         if not resolved_api_url:
@@ -101,6 +167,15 @@ class CloudApiModelLoaderNode:
             "temperature": temperature,
             "max_tokens": max_tokens,
             "system_prompt": system_prompt,
+            "batch_size": batch_size,
+            "context_window": context_window,
+            "max_concurrency": max_concurrency,
+            "request_timeout": request_timeout,
+            "translation_memory": translation_memory,
+            "rpm_limit": rpm_limit,
+            "tpm_limit": tpm_limit,
+            "max_retries": max_retries,
+            "stream": stream,
             "api_format": api_format,
         }
 
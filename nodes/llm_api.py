@@ -3,9 +3,56 @@ LLM API 节点 - 用于配置外部大模型 API 作为翻译模型
 支持 OpenAI 兼容 API、Ollama、以及其他自定义 API
 """
 
-import requests
 import json
 import re
+import time
+import asyncio
+import threading
+from functools import partial
+
+from ..utils import http_pool
+from ..utils import translation_memory
+from ..utils.async_runtime import run_sync, submit, wait_future, WAIT_INTERVAL
+from ..utils.translation_engine import gather_ordered, DEFAULT_MAX_IN_FLIGHT
+from ..utils.rate_limiter import get_limiter, parse_retry_after, backoff_delay, is_retryable
+from ..utils.token_budget import BatchBudget, estimate_tokens
+from ..utils.interrupt import InterruptProcessingException, processing_interrupted
+
+# 每个请求翻译的默认字幕条数；1 表示逐条翻译
+DEFAULT_BATCH_SIZE = 10
+
+# 流水线翻译允许积压的批次数（按并发数的倍数计算）
+PIPELINE_QUEUE_FACTOR = 2
+
+# 单个 HTTP 请求的默认超时（秒）；本地 Ollama 生成较慢，单独设置
+DEFAULT_REQUEST_TIMEOUT = 60
+DEFAULT_OLLAMA_TIMEOUT = 300
+
+# Ollama 模型在最后一次请求后保持加载的时间（可为 "30m"、"2h" 或 -1 表示一直保持）
+DEFAULT_OLLAMA_KEEP_ALIVE = "30m"
+# 预热（加载模型）的超时（秒），大模型首次加载可能需要数分钟
+OLLAMA_WARMUP_TIMEOUT = 600
+# 查询已加载模型（/api/ps）的超时（秒）
+OLLAMA_PS_TIMEOUT = 5
+
+# 限流和临时错误的默认重试次数
+DEFAULT_MAX_RETRIES = 5
+
+# 批量结果缺失或解析失败的字幕，先合并重试的轮数，之后再逐条翻译
+BATCH_RETRY_ROUNDS = 1
+
+
+class LLMApiError(RuntimeError):
+    """LLM API 返回错误状态或无法解析的响应"""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMRetryExhaustedError(LLMApiError):
+    """限流或临时错误在重试次数用完后仍未恢复"""
 
 
 def _clean_translation_output(text, original_text=""):
@@ -106,6 +153,63 @@ class LLMApiNode:
                     "multiline": True,
                     "tooltip": "系统提示词（可选，留空使用默认翻译提示）"
                 }),
+                "batch_size": ("INT", {
+                    "default": DEFAULT_BATCH_SIZE,
+                    "min": 1,
+                    "max": 100,
+                    "step": 1,
+                    "tooltip": "每个请求最多翻译的字幕条数，实际按 token 预算装箱；1 表示逐条翻译"
+                }),
+                "context_window": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 2000000,
+                    "step": 1024,
+                    "tooltip": "模型上下文长度（token），用于计算每批的输入预算；0 表示自动（Ollama 2048，其他 32768）"
+                }),
+                "max_concurrency": ("INT", {
+                    "default": DEFAULT_MAX_IN_FLIGHT,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1,
+                    "tooltip": "同时进行的翻译请求数"
+                }),
+                "request_timeout": ("INT", {
+                    "default": DEFAULT_REQUEST_TIMEOUT,
+                    "min": 5,
+                    "max": 1800,
+                    "step": 5,
+                    "tooltip": "单个请求的超时时间（秒）"
+                }),
+                "translation_memory": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "启用翻译记忆：相同的字幕直接使用以前的译文"
+                }),
+                "stream": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "流式接收模型输出，每条译文完成即显示在文本展示框中；接口不支持流式响应时关闭"
+                }),
+                "rpm_limit": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 100000,
+                    "step": 1,
+                    "tooltip": "每分钟请求数上限，0 表示不限制（按服务商账号的限额填写）"
+                }),
+                "tpm_limit": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 100000000,
+                    "step": 1000,
+                    "tooltip": "每分钟 token 数上限（估算值），0 表示不限制"
+                }),
+                "max_retries": ("INT", {
+                    "default": DEFAULT_MAX_RETRIES,
+                    "min": 0,
+                    "max": 20,
+                    "step": 1,
+                    "tooltip": "限流（429）、服务端临时错误和网络错误的最大重试次数"
+                }),
             },
         }
     
@@ -116,7 +220,11 @@ class LLMApiNode:
     OUTPUT_NODE = False
     
     def create_api_config(self, api_type, api_url, model_name, 
-                          api_key="", temperature=0.3, max_tokens=1024, system_prompt=""):
+                          api_key="", temperature=0.3, max_tokens=1024, system_prompt="",
+                          batch_size=DEFAULT_BATCH_SIZE, max_concurrency=DEFAULT_MAX_IN_FLIGHT,
+                          request_timeout=DEFAULT_REQUEST_TIMEOUT, translation_memory=True,
+                          rpm_limit=0, tpm_limit=0, max_retries=DEFAULT_MAX_RETRIES, context_window=0,
+                          stream=True):
         """
         创建 LLM API 配置对象
         """
@@ -128,6 +236,15 @@ class LLMApiNode:
             "temperature": temperature,
             "max_tokens": max_tokens,
             "system_prompt": system_prompt,
+            "batch_size": batch_size,
+            "context_window": context_window,
+            "max_concurrency": max_concurrency,
+            "request_timeout": request_timeout,
+            "translation_memory": translation_memory,
+            "rpm_limit": rpm_limit,
+            "tpm_limit": tpm_limit,
+            "max_retries": max_retries,
+            "stream": stream,
         }
         
         print(f"[FasterWhisper] LLM API 配置: {api_type} - {model_name}")
@@ -135,17 +252,21 @@ class LLMApiNode:
         return (config,)
 
 
-def call_llm_api(config, prompt, target_language):
+def _resolve_system_prompt(config, target_language):
+    """返回替换了目标语言占位符的系统提示词；未配置时返回 None"""
+    system_prompt = config.get("system_prompt", "")
+    if not system_prompt:
+        return None
+    return system_prompt.replace("{target_language}", target_language)
+
+
+async def _send_completion(config, prompt, system_prompt, listener=None):
     """
-    调用 LLM API 进行翻译
-    
-    Args:
-        config: LLM API 配置对象
-        prompt: 要翻译的文本
-        target_language: 目标语言名称
-    
-    Returns:
-        翻译后的文本
+    按 API 类型发送一次请求并返回模型输出的原始文本
+    提供 listener 时以流式方式请求，每收到一段输出调用 listener.feed(文本)，结束时调用 listener.finish()
+
+    Raises:
+        LLMApiError: 接口返回错误状态
     """
     api_type = config.get("api_type", "OpenAI兼容")
     api_url = config.get("api_url", "")
@@ -153,69 +274,790 @@ def call_llm_api(config, prompt, target_language):
     api_key = config.get("api_key", "")
     temperature = config.get("temperature", 0.3)
     max_tokens = config.get("max_tokens", 1024)
-    system_prompt = config.get("system_prompt", "")
-    
+    timeout = config.get("request_timeout")
+
+    if api_type == "Ollama":
+        return await _call_ollama_api(api_url, model_name, prompt, system_prompt, temperature,
+                                      timeout or DEFAULT_OLLAMA_TIMEOUT, listener, _ollama_options(config),
+                                      _ollama_keep_alive(config))
+    timeout = timeout or DEFAULT_REQUEST_TIMEOUT
+    if api_type == "Google Gemini":
+        return await _call_gemini_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens,
+                                      timeout, listener)
+    if api_type == "Claude":
+        return await _call_claude_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens,
+                                      timeout, listener)
+    # OpenAI 兼容 API 或自定义
+    api_format = config.get("api_format", "自动检测")
+    return await _call_openai_compatible_api(
+        api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens, api_format, timeout, listener
+    )
+
+
+def _estimate_request_tokens(config, prompt, system_prompt):
+    """粗略估算一次请求计入 TPM 的 token 数：输入加上与输入相当的输出（不超过 max_tokens）"""
+    input_tokens = estimate_tokens(system_prompt) + estimate_tokens(prompt)
+    return input_tokens + min(int(config.get("max_tokens", 1024)), input_tokens)
+
+
+async def _request_completion(config, prompt, system_prompt, listener=None):
+    """
+    经过限流器发送请求：等待 RPM / TPM 额度和 AIMD 并发名额，
+    限流（429）、服务端临时错误和网络错误按 Retry-After 或随机指数退避重试；
+    提供 listener 时流式请求，每次重试前调用 listener.restart() 丢弃中断的部分输出
+
+    Raises:
+        LLMRetryExhaustedError: 重试次数用完仍失败
+        LLMApiError: 不可重试的错误（如 400 / 401）
+    """
+    limiter = get_limiter(config)
+    max_retries = max(0, int(config.get("max_retries", DEFAULT_MAX_RETRIES)))
+    tokens = _estimate_request_tokens(config, prompt, system_prompt)
+
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(tokens)
+        await limiter.enter()
+        if listener is not None:
+            listener.restart()
+        try:
+            result = await _send_completion(config, prompt, system_prompt, listener)
+            limiter.on_success()
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            error = e
+        finally:
+            await limiter.leave()
+
+        retry_after = getattr(error, "retry_after", None)
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+        throttled = getattr(error, "status_code", None) == 429
+        if throttled:
+            limiter.on_throttle(delay)
+        if attempt < max_retries:
+            reason = "请求被限流 (429)" if throttled else f"请求失败 ({error})"
+            print(f"[FasterWhisper] {reason}，{delay:.1f} 秒后重试 ({attempt + 1}/{max_retries})，"
+                  f"当前并发上限 {int(limiter.limit)}")
+            await asyncio.sleep(delay)
+
+    raise LLMRetryExhaustedError(
+        f"大模型请求重试 {max_retries} 次后仍失败，请降低并发数 / RPM / TPM 或稍后再试: {error}",
+        getattr(error, "status_code", None)
+    )
+
+
+async def translate_single_async(config, text, target_language):
+    """
+    单条翻译（协程）
+
+    Returns:
+        清理后的译文；模型没有输出时返回空字符串
+
+    Raises:
+        LLMApiError: 接口返回错误状态
+    """
     # 默认翻译系统提示
-    if not system_prompt:
+    system_prompt = _resolve_system_prompt(config, target_language)
+    if system_prompt is None:
         system_prompt = f"你是翻译机器。用户输入任何内容，你只输出{target_language}译文，不说任何其他话。"
-    else:
-        # 替换目标语言占位符
-        system_prompt = system_prompt.replace("{target_language}", target_language)
-    
-    # 保存原始文本，用于异常时返回
-    original_text = prompt
     
     # 在用户输入前添加翻译指令，强制模型直接输出译文
-    prompt = f"翻译成{target_language}（只输出译文）：{prompt}"
+    prompt = f"翻译成{target_language}（只输出译文）：{text}"
+    result = await _request_completion(config, prompt, system_prompt)
+    
+    # 后处理：清理解释性内容
+    return _clean_translation_output(result)
+
+
+def translate_single(config, text, target_language):
+    """单条翻译（同步包装，在共享事件循环上执行）"""
+    return run_sync(translate_single_async(config, text, target_language))
+
+
+def call_llm_api(config, prompt, target_language):
+    """
+    调用 LLM API 进行翻译
     
+    Args:
+        config: LLM API 配置对象
+        prompt: 要翻译的文本
+        target_language: 目标语言名称
+    
+    Returns:
+        翻译后的文本（失败时返回原文）
+    """
     try:
-        if api_type == "Ollama":
-            result = _call_ollama_api(api_url, model_name, prompt, system_prompt, temperature)
-        elif api_type == "Google Gemini":
-            result = _call_gemini_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens)
-        elif api_type == "Claude":
-            result = _call_claude_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens)
-        else:
-            # OpenAI 兼容 API 或自定义
-            api_format = config.get("api_format", "自动检测")
-            result = _call_openai_compatible_api(
-                api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens, api_format
-            )
-        
-        # 后处理：清理解释性内容
-        return _clean_translation_output(result)
+        return translate_single(config, prompt, target_language) or prompt
     except Exception as e:
         print(f"[FasterWhisper] LLM API 调用错误: {str(e)}")
-        return original_text  # 返回原文（不带翻译指令）
+        return prompt  # 返回原文（不带翻译指令）
 
 
-def _call_ollama_api(api_url, model_name, prompt, system_prompt, temperature):
-    """调用 Ollama API"""
-    # 构建完整提示
-    full_prompt = f"{system_prompt}\n\n{prompt}"
-    
-    response = requests.post(
-        api_url,
-        json={
+# 编号行："[3] 译文"、"3. 译文"、"3、译文"、"【3】译文"、"(3) 译文" 等
+_NUMBERED_LINE = re.compile(
+    r'^\s*(?:[\[【(（]\s*(\d+)\s*[\]】)）]|(\d+)\s*[.．、:：)）\]])\s*(.*)$'
+)
+
+
+def _build_batch_prompt(texts, target_language):
+    """把多条字幕编成一个带编号的请求；字幕内的换行合并为空格，保证一条一行"""
+    lines = [f"[{i}] {' '.join(text.split())}" for i, text in enumerate(texts, 1)]
+    return (
+        f"把下面 {len(texts)} 条字幕逐条翻译成{target_language}。"
+        f"每条输出一行，格式为“[编号] 译文”，编号与原文一致，"
+        f"不合并、不拆分、不遗漏，不输出任何其他内容：\n" + "\n".join(lines)
+    )
+
+
+def parse_numbered_translation(text, expected_count):
+    """
+    解析带编号的批量翻译结果
+
+    - 兼容 [1] / 1. / 1、/ 【1】/ (1) 等编号写法
+    - 没有编号的行视为上一条的续行
+    - 超出范围的编号和重复编号忽略（重复时保留第一次出现的）
+
+    Returns:
+        长度为 expected_count 的列表，缺失或为空的条目为 None
+    """
+    results = [None] * expected_count
+    if not text:
+        return results
+
+    text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("```"):
+            continue
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            number = int(match.group(1) or match.group(2))
+            current = None
+            if 1 <= number <= expected_count and results[number - 1] is None:
+                current = number - 1
+                results[current] = match.group(3).strip()
+        elif current is not None:
+            results[current] = f"{results[current]} {line}".strip()
+
+    for i, item in enumerate(results):
+        if item is not None:
+            results[i] = _strip_quotes(item) or None
+    return results
+
+
+def _strip_quotes(item):
+    """移除包裹译文的引号"""
+    return re.sub(r'^["\'“\u300c](.+)["\'”\u300d]$', r'\1', item.strip()).strip()
+
+
+class NumberedStreamParser:
+    """
+    流式解析带编号的批量译文：每收到完整的一行立即回调 on_cue(序号, 译文)，序号从 0 开始
+    只用于提前展示，续行等最终结果以完整响应的 parse_numbered_translation 为准
+    """
+
+    def __init__(self, expected_count, on_cue):
+        self.expected_count = expected_count
+        self.on_cue = on_cue
+        self._emitted = set()
+        self.restart()
+
+    def restart(self):
+        """重新开始一次响应（重试时丢弃上次未完成的行，已回调的条目不再重复）"""
+        self._buffer = ""
+        self._in_think = False
+
+    def feed(self, delta):
+        self._buffer += delta
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._parse_line(line)
+
+    def finish(self):
+        if self._buffer:
+            self._parse_line(self._buffer)
+            self._buffer = ""
+
+    def _parse_line(self, line):
+        line = line.strip()
+        # 跳过推理模型的 <think> 内容
+        if "<think>" in line:
+            self._in_think = True
+        if self._in_think:
+            if "</think>" not in line:
+                return
+            self._in_think = False
+            line = line.split("</think>", 1)[1].strip()
+        if not line or line.startswith("```"):
+            return
+        match = _NUMBERED_LINE.match(line)
+        if not match:
+            return
+        index = int(match.group(1) or match.group(2)) - 1
+        text = _strip_quotes(match.group(3))
+        if 0 <= index < self.expected_count and index not in self._emitted and text:
+            self._emitted.add(index)
+            self.on_cue(index, text)
+
+
+async def translate_batch_async(config, texts, target_language, on_cue=None):
+    """
+    在一个请求中翻译多条字幕（协程）
+    提供 on_cue(序号, 译文) 且配置开启 stream 时流式请求，每条译文的行一完成就回调
+
+    Returns:
+        与 texts 等长的列表，未能解析出译文的条目为 None
+
+    Raises:
+        LLMApiError: 接口返回错误状态
+    """
+    system_prompt = _resolve_system_prompt(config, target_language)
+    if system_prompt is None:
+        system_prompt = (
+            f"你是字幕翻译机器。用户给出若干条带编号的字幕，你逐条翻译成{target_language}，"
+            f"每条一行并保留原编号，不说任何其他话。"
+        )
+    listener = None
+    if on_cue is not None and config.get("stream", True):
+        listener = NumberedStreamParser(len(texts), on_cue)
+    result = await _request_completion(config, _build_batch_prompt(texts, target_language), system_prompt, listener)
+    return parse_numbered_translation(result, len(texts))
+
+
+def translate_batch(config, texts, target_language):
+    """在一个请求中翻译多条字幕（同步包装）"""
+    return run_sync(translate_batch_async(config, texts, target_language))
+
+
+def _offset_callback(on_cue, positions):
+    """把子列表中的序号换算为 positions 中对应的序号后回调 on_cue"""
+    if on_cue is None:
+        return None
+    return lambda index, text: on_cue(positions[index], text)
+
+
+async def _translate_chunk(config, texts, target_language, label, on_cue=None):
+    """
+    翻译一批字幕：整批请求，缺失或解析失败的条目重新请求，最后逐条兜底
+    on_cue(序号, 译文) 在每条译文完成时回调（流式请求时逐行回调，同一条可能回调多次）
+
+    Returns:
+        与 texts 等长的译文列表，逐条翻译也失败的条目为 None
+    """
+    results = [None] * len(texts)
+    pending = list(range(len(texts)))
+
+    if len(texts) > 1:
+        for attempt in range(BATCH_RETRY_ROUNDS + 1):
+            try:
+                translated = await translate_batch_async(config, [texts[i] for i in pending], target_language,
+                                                         _offset_callback(on_cue, pending))
+            except LLMRetryExhaustedError:
+                raise
+            except Exception as e:
+                print(f"[FasterWhisper] 批量翻译请求失败 ({label}): {e}")
+                translated = [None] * len(pending)
+            for i, item in zip(pending, translated):
+                results[i] = item
+            pending = [i for i in pending if results[i] is None]
+            if not pending:
+                break
+            retry_mode = "重新请求" if attempt < BATCH_RETRY_ROUNDS else "改为逐条翻译"
+            print(f"[FasterWhisper] {label}: {len(pending)} 条未能解析，{retry_mode}")
+
+    # 批量仍未得到译文的条目逐条翻译
+    for i in pending:
+        try:
+            results[i] = await translate_single_async(config, texts[i], target_language) or None
+        except LLMRetryExhaustedError:
+            raise
+        except Exception as e:
+            print(f"[FasterWhisper] LLM API 调用错误: {str(e)}")
+
+    if on_cue is not None:
+        for i, item in enumerate(results):
+            if item:
+                on_cue(i, item)
+    return results
+
+
+async def _translate_requests(config, texts, target_language, on_cue=None):
+    """
+    按 token 预算装箱分批（每批不超过 batch_size 条）、按 max_concurrency 并发请求翻译
+    on_cue(序号, 译文) 在每条译文完成时回调
+
+    Returns:
+        与 texts 等长、顺序一致的译文列表，失败的条目为 None
+    """
+    if not texts:
+        return []
+    config = await _prepare_endpoint(config)
+    budget = BatchBudget(config)
+    max_in_flight = max(1, int(config.get("max_concurrency", DEFAULT_MAX_IN_FLIGHT) or 1))
+    chunks = budget.pack(texts)
+
+    print(f"[FasterWhisper] 翻译: 共 {len(texts)} 条字幕，分 {len(chunks)} 批（{budget.describe()}），"
+          f"最多 {max_in_flight} 个请求同时进行")
+
+    # 连接池至少容纳全部并发请求，使所有请求复用少量长连接
+    http_pool.reserve(config.get("api_url", ""), max_in_flight)
+    jobs = []
+    offset = 0
+    for number, chunk in enumerate(chunks, 1):
+        jobs.append((number, chunk, list(range(offset, offset + len(chunk)))))
+        offset += len(chunk)
+    translated = await gather_ordered(
+        lambda job: _translate_chunk(config, job[1], target_language, f"批次 {job[0]}",
+                                     _offset_callback(on_cue, job[2])),
+        jobs,
+        max_in_flight=max_in_flight,
+        weights=[len(chunk) for chunk in chunks],
+    )
+    http_pool.log_pool_stats(config.get("api_url", ""))
+    return [text for chunk in translated for text in chunk]
+
+
+async def _blocking(func, *args):
+    """在线程池中执行 SQLite 等阻塞操作，不占用事件循环"""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+
+
+async def _translate_with_memory(config, texts, target_language, request, verbose=True, on_cue=None):
+    """
+    先查翻译记忆，再用协程 request(待翻译文本列表, 回调) 请求剩余条目
+
+    - 翻译记忆命中的条目直接使用本地结果
+    - 同一次调用中重复的字幕只请求一次
+    - 其他任务正在翻译的相同条目等待其结果（single-flight）
+    - 每条译文得到时回调 on_cue(texts 中的序号, 译文)，重复的字幕各自回调
+
+    Returns:
+        与 texts 等长、顺序一致的译文列表（失败的条目保留原文）
+    """
+    use_memory = config.get("translation_memory", True)
+    scope = translation_memory.memory_scope(config, target_language)
+    keys = [translation_memory.memory_key(scope, text) for text in texts]
+
+    translations = await _blocking(translation_memory.lookup, keys) if use_memory else {}
+
+    # 同一次运行中重复的字幕只翻译一次
+    unique = {}
+    for key, text in zip(keys, texts):
+        if key not in translations and key not in unique and text.strip():
+            unique[key] = text
+
+    if use_memory:
+        owned, waiting = translation_memory.claim(unique)
+    else:
+        owned, waiting = list(unique), {}
+
+    indices = {}
+    for i, key in enumerate(keys):
+        indices.setdefault(key, []).append(i)
+
+    def publish(key, text):
+        for i in indices[key]:
+            on_cue(i, text)
+
+    def request_callback(pending_keys):
+        if on_cue is None:
+            return None
+        return lambda index, text: publish(pending_keys[index], text)
+
+    if on_cue is not None:
+        for key, text in translations.items():
+            publish(key, text)
+
+    if verbose:
+        hits = sum(1 for key in keys if key in translations)
+        duplicates = sum(1 for text in texts if text.strip()) - hits - len(unique)
+        print(f"[FasterWhisper] 翻译记忆: 命中 {hits} 条，重复合并 {duplicates} 条，"
+              f"等待其他任务 {len(waiting)} 条，需请求 {len(owned)} 条")
+
+    try:
+        translated = await request([unique[key] for key in owned], request_callback(owned)) if owned else []
+    except BaseException:
+        if use_memory:
+            translation_memory.release(owned)
+        raise
+
+    done = {key: value for key, value in zip(owned, translated) if value}
+    translations.update(done)
+    if use_memory:
+        await _blocking(translation_memory.store, [(key, unique[key], done[key]) for key in done], scope)
+        translation_memory.resolve(done)
+        translation_memory.release([key for key in owned if key not in done])
+
+        shared = await translation_memory.wait_shared(waiting)
+        translations.update(shared)
+        if on_cue is not None:
+            for key, text in shared.items():
+                publish(key, text)
+        # 其他任务未能翻译的条目由本任务补上
+        retry = [key for key in waiting if key not in translations]
+        if retry:
+            retried = await request([unique[key] for key in retry], request_callback(retry))
+            retried = {key: value for key, value in zip(retry, retried) if value}
+            await _blocking(translation_memory.store, [(key, unique[key], retried[key]) for key in retried], scope)
+            translations.update(retried)
+
+    failed = sum(1 for key in unique if key not in translations)
+    if failed:
+        print(f"[FasterWhisper] 警告: {failed} 条字幕翻译失败，保留原文")
+    return [translations.get(key) or text for key, text in zip(keys, texts)]
+
+
+def translate_texts(config, texts, target_language, on_cue=None):
+    """
+    翻译字幕文本：先查翻译记忆，再把剩余条目批量、并发请求
+
+    每批在一个请求中发送；解析失败或缺失的条目只把这些条目重新请求，
+    重试 BATCH_RETRY_ROUNDS 轮后仍缺失的再逐条翻译（逐条翻译失败时保留原文）；
+    on_cue(序号, 译文) 在每条译文完成时回调（在共享事件循环线程中调用）
+
+    Returns:
+        与 texts 等长、顺序一致的译文列表
+    """
+    return run_sync(_translate_with_memory(
+        config, texts, target_language,
+        lambda pending, callback: _translate_requests(config, pending, target_language, callback),
+        on_cue=on_cue
+    ))
+
+
+class TranslationPipeline:
+    """
+    边识别边翻译：识别出的字幕逐条 submit，凑满一批（条数或 token 预算）立即作为协程提交到共享事件循环，
+    识别与翻译同时进行，总耗时接近两者中较长的一个
+
+    用法：
+        pipeline = TranslationPipeline(config, target_language)
+        for text in ...: pipeline.submit(text)
+        translations = pipeline.close()
+
+    on_cue(序号, 译文) 在每条译文完成时回调，序号为 submit 的顺序
+    """
+
+    def __init__(self, config, target_language, on_cue=None):
+        # Ollama 的预热推迟到第一批字幕就绪时，避免与正在加载的 Whisper 模型争用显存
+        self._prepared = None
+        self.config = config
+        self.target_language = target_language
+        self.on_cue = on_cue
+        self.budget = BatchBudget(config)
+        self.workers = max(1, int(config.get("max_concurrency", DEFAULT_MAX_IN_FLIGHT) or 1))
+        # 积压有界：翻译跟不上时识别暂停，避免积压过多待翻译的批次
+        self._backlog = threading.BoundedSemaphore(self.workers * PIPELINE_QUEUE_FACTOR)
+        self._semaphore = run_sync(self._create_semaphore())
+        self._buffer = []
+        self._used = (0, 0)
+        self._count = 0
+        self._done = 0
+        self._futures = []
+        self._started = time.monotonic()
+
+        http_pool.reserve(config.get("api_url", ""), self.workers)
+        print(f"[FasterWhisper] 流水线翻译: {self.budget.describe()}，最多 {self.workers} 个请求同时进行")
+
+    async def _create_semaphore(self):
+        # 在共享事件循环中创建，绑定到该循环
+        return asyncio.Semaphore(self.workers)
+
+    async def _prepare(self):
+        # 只在共享事件循环中调用，第一批创建预热任务，其余批次等待同一个任务
+        if self._prepared is None:
+            self._prepared = asyncio.ensure_future(_prepare_endpoint(self.config))
+        await asyncio.shield(self._prepared)
+
+    async def _run(self, start, texts):
+        label = f"第 {start + 1}-{start + len(texts)} 条"
+        await self._prepare()
+        async with self._semaphore:
+            translated = await _translate_with_memory(
+                self.config, texts, self.target_language,
+                lambda pending, callback: _translate_chunk(self.config, pending, self.target_language, label,
+                                                           callback),
+                verbose=False,
+                on_cue=_offset_callback(self.on_cue, range(start, start + len(texts)))
+            )
+        self._done += len(texts)
+        print(f"[FasterWhisper] 流水线翻译进度: 已翻译 {self._done}/{self._count} 条")
+        return translated
+
+    def _check_failed(self):
+        for _, future in self._futures:
+            if future.done() and not future.cancelled() and future.exception() is not None:
+                self.abort()
+                raise future.exception()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        # 积压已满时等待，同时响应中断
+        while not self._backlog.acquire(timeout=WAIT_INTERVAL):
+            if processing_interrupted():
+                self.abort()
+                raise InterruptProcessingException()
+        start = self._count - len(self._buffer)
+        texts, self._buffer, self._used = self._buffer, [], (0, 0)
+        future = submit(self._run(start, texts))
+        future.add_done_callback(lambda _: self._backlog.release())
+        self._futures.append((start, future))
+
+    def submit(self, text):
+        """加入一条识别出的字幕文本；放不下时先发送已有的一批"""
+        self._check_failed()
+        cost = self.budget.cost(text)
+        if self._buffer and not self.budget.fits(self._used, cost, len(self._buffer)):
+            self._flush()
+        self._buffer.append(text)
+        self._used = (self._used[0] + cost[0], self._used[1] + cost[1])
+        self._count += 1
+        if len(self._buffer) >= self.budget.max_items:
+            self._flush()
+
+    def close(self):
+        """
+        发送剩余字幕并等待全部翻译完成
+
+        Returns:
+            与 submit 顺序一致的译文列表
+        """
+        self._flush()
+        results = []
+        try:
+            for _, future in sorted(self._futures, key=lambda item: item[0]):
+                results.extend(wait_future(future))
+        except BaseException:
+            self.abort()
+            raise
+
+        print(f"[FasterWhisper] 流水线翻译完成: {len(results)} 条, "
+              f"用时 {time.monotonic() - self._started:.1f} 秒（含识别时间）")
+        http_pool.log_pool_stats(self.config.get("api_url", ""))
+        return results
+
+    def abort(self):
+        """取消尚未完成的批次（识别出错或中断时调用）"""
+        self._buffer, self._used = [], (0, 0)
+        for _, future in self._futures:
+            future.cancel()
+
+
+def _stream_error(provider, error):
+    """流式响应中的错误事件转换为 LLMApiError（过载和限流可重试）"""
+    if isinstance(error, dict):
+        kind = str(error.get("type") or error.get("status") or error.get("code") or "")
+        message = error.get("message") or json.dumps(error, ensure_ascii=False)
+    else:
+        kind, message = "", str(error)
+    status_code = None
+    if "overloaded" in kind:
+        status_code = 529
+    elif "rate_limit" in kind or "RESOURCE_EXHAUSTED" in kind:
+        status_code = 429
+    return LLMApiError(f"{provider} API 流式响应错误: {kind} {message}".strip(), status_code)
+
+
+async def _stream_completion(provider, url, headers, payload, timeout, extract, listener, sse=True):
+    """
+    发送流式请求，逐行解析 SSE（data: {...}）或 NDJSON 事件
+
+    Args:
+        extract: extract(事件) 返回本事件的增量文本；遇到错误事件时抛出 LLMApiError
+        listener: 每段增量文本调用 listener.feed，结束时调用 listener.finish
+
+    Returns:
+        完整的输出文本
+    """
+    async with http_pool.stream("POST", url, headers=headers, json=payload, timeout=timeout) as response:
+        if response.status_code != 200:
+            text = await response.read_text()
+            raise LLMApiError(f"{provider} API 错误: {response.status_code} - {text[:500]}",
+                              response.status_code, parse_retry_after(response.headers))
+        parts = []
+        async for line in response.iter_lines():
+            if sse:
+                if not line.startswith("data:"):
+                    continue
+                line = line[5:].strip()
+                if line == "[DONE]":
+                    break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            delta = extract(event)
+            if delta:
+                parts.append(delta)
+                listener.feed(delta)
+    listener.finish()
+    return "".join(parts).strip()
+
+
+def _ollama_base_url(api_url):
+    """Ollama 服务根地址（去掉 /api/chat、/api/generate 等路径）"""
+    api_url = (api_url or "http://localhost:11434").rstrip("/")
+    return api_url.split("/api/", 1)[0]
+
+
+def _ollama_keep_alive(config):
+    """keep_alive 配置；纯数字按秒数发送（-1 表示一直保持加载）"""
+    value = str(config.get("keep_alive") or DEFAULT_OLLAMA_KEEP_ALIVE).strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _ollama_options(config):
+    """
+    Ollama 生成参数：温度、最大生成长度（num_predict）和上下文长度（num_ctx）
+    context_window 为 0 时不发送 num_ctx，使用服务端默认值
+    """
+    options = {
+        "temperature": config.get("temperature", 0.3),
+        "num_predict": int(config.get("max_tokens", 1024)),
+    }
+    context_window = int(config.get("context_window", 0) or 0)
+    if context_window > 0:
+        options["num_ctx"] = context_window
+    return options
+
+
+async def _call_ollama_api(api_url, model_name, prompt, system_prompt, temperature, timeout=DEFAULT_OLLAMA_TIMEOUT,
+                           listener=None, options=None, keep_alive=DEFAULT_OLLAMA_KEEP_ALIVE):
+    """
+    调用 Ollama API
+    地址以 /api/chat 结尾时使用 chat 接口（系统提示词作为 system 消息），否则使用 generate 接口
+    """
+    options = dict(options or {}, temperature=temperature)
+    use_chat = api_url.rstrip("/").endswith("/api/chat")
+    if use_chat:
+        payload = {
             "model": model_name,
-            "prompt": full_prompt,
-            "stream": False,
-            "options": {
-                "temperature": temperature,
-            }
-        },
-        timeout=300
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+        }
+    else:
+        # 构建完整提示
+        payload = {
+            "model": model_name,
+            "prompt": f"{system_prompt}\n\n{prompt}",
+        }
+    payload.update({
+        "stream": listener is not None,
+        "keep_alive": keep_alive,
+        "options": options,
+    })
+
+    def extract_text(result):
+        if use_chat:
+            return (result.get("message") or {}).get("content", "")
+        return result.get("response", "")
+
+    if listener is not None:
+        # 流式响应为 NDJSON：每行一个 {"message": {...}} 或 {"response": "..."}，最后一行 done 为 true
+        def extract(event):
+            if event.get("error"):
+                raise _stream_error("Ollama", event["error"])
+            return extract_text(event)
+        return await _stream_completion("Ollama", api_url, None, payload, timeout, extract, listener, sse=False)
+
+    response = await http_pool.post(
+        api_url,
+        json=payload,
+        timeout=timeout
     )
     
     if response.status_code == 200:
-        result = response.json()
-        return result.get('response', prompt).strip()
+        return extract_text(response.json()).strip()
     else:
-        print(f"[FasterWhisper] Ollama API 错误: {response.status_code}")
-        return prompt
+        raise LLMApiError(f"Ollama API 错误: {response.status_code} - {response.text[:500]}",
+                          response.status_code, parse_retry_after(response.headers))
 
 
-def _call_gemini_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens):
+async def _ollama_model_loaded(config):
+    """
+    通过 /api/ps 查询模型是否已加载（且上下文长度与本次的 num_ctx 一致）；查询失败时返回 False
+    """
+    base_url = _ollama_base_url(config.get("api_url"))
+    model_name = config.get("model_name", "")
+    names = {model_name} if ":" in model_name else {model_name, f"{model_name}:latest"}
+    num_ctx = _ollama_options(config).get("num_ctx")
+    try:
+        response = await http_pool.get(f"{base_url}/api/ps", timeout=OLLAMA_PS_TIMEOUT)
+        if response.status_code != 200:
+            return False
+        running = response.json().get("models") or []
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        return False
+    for entry in running:
+        if entry.get("name") in names or entry.get("model") in names:
+            # 旧版 Ollama 不返回 context_length，按已加载处理
+            return not num_ctx or entry.get("context_length") in (None, num_ctx)
+    return False
+
+
+async def _ollama_warm_up(config):
+    """
+    预热：模型未加载（或加载时的上下文长度不同）时，向配置的接口发送空请求，
+    让 Ollama 按本次的 num_ctx 加载模型并按 keep_alive 保持，避免第一批翻译请求承担加载时间
+    """
+    if await _ollama_model_loaded(config):
+        return
+    api_url = config.get("api_url") or "http://localhost:11434/api/chat"
+    model_name = config.get("model_name", "")
+    started = time.monotonic()
+    payload = {
+        "model": model_name,
+        "keep_alive": _ollama_keep_alive(config),
+    }
+    # 与翻译请求使用同一个接口：chat 发送空消息列表，generate 发送空提示，都只加载模型不生成
+    if api_url.rstrip("/").endswith("/api/chat"):
+        payload["messages"] = []
+    else:
+        payload["prompt"] = ""
+    options = _ollama_options(config)
+    if "num_ctx" in options:
+        payload["options"] = {"num_ctx": options["num_ctx"]}
+    print(f"[FasterWhisper] Ollama 模型未加载，正在预热: {model_name}")
+    try:
+        response = await http_pool.post(api_url, json=payload, timeout=OLLAMA_WARMUP_TIMEOUT)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[FasterWhisper] 警告: Ollama 模型预热失败: {e}")
+        return
+    if response.status_code != 200:
+        print(f"[FasterWhisper] 警告: Ollama 模型预热失败: {response.status_code} - {response.text[:200]}")
+        return
+    print(f"[FasterWhisper] Ollama 模型已加载: {model_name}，用时 {time.monotonic() - started:.1f} 秒")
+
+
+async def _prepare_endpoint(config):
+    """
+    翻译开始前的准备，返回本次翻译使用的配置：Ollama 先预热模型
+    """
+    if config.get("api_type") != "Ollama":
+        return config
+    await _ollama_warm_up(config)
+    return config
+
+
+async def _call_gemini_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens,
+                     timeout=DEFAULT_REQUEST_TIMEOUT, listener=None):
     """调用 Google Gemini API"""
     # Gemini API URL 格式: https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent
     if not api_url:
@@ -246,12 +1088,24 @@ def _call_gemini_api(api_url, model_name, api_key, prompt, system_prompt, temper
     }
     
     print(f"[FasterWhisper] API 模式: Gemini, Model: {model_name}")
-    
-    response = requests.post(
+
+    if listener is not None:
+        # 流式接口为 :streamGenerateContent，alt=sse 时按 SSE 返回，每个事件是一个部分结果
+        stream_url = f"{api_url.replace(':generateContent', ':streamGenerateContent')}?alt=sse&key={api_key}"
+
+        def extract(event):
+            if event.get("error"):
+                raise _stream_error("Gemini", event["error"])
+            candidates = event.get("candidates") or [{}]
+            parts = candidates[0].get("content", {}).get("parts", [])
+            return "".join(part.get("text", "") for part in parts)
+        return await _stream_completion("Gemini", stream_url, headers, payload, timeout, extract, listener)
+
+    response = await http_pool.post(
         url_with_key,
         headers=headers,
         json=payload,
-        timeout=30
+        timeout=timeout
     )
     
     if response.status_code == 200:
@@ -261,14 +1115,15 @@ def _call_gemini_api(api_url, model_name, api_key, prompt, system_prompt, temper
             content = candidates[0].get('content', {})
             parts = content.get('parts', [])
             if parts:
-                return parts[0].get('text', prompt).strip()
-        return prompt
+                return parts[0].get('text', '').strip()
+        return ""
     else:
-        print(f"[FasterWhisper] Gemini API 错误: {response.status_code} - {response.text}")
-        return prompt
+        raise LLMApiError(f"Gemini API 错误: {response.status_code} - {response.text[:500]}",
+                          response.status_code, parse_retry_after(response.headers))
 
 
-def _call_claude_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens):
+async def _call_claude_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens,
+                     timeout=DEFAULT_REQUEST_TIMEOUT, listener=None):
     """调用 Anthropic Claude API"""
     if not api_url:
         api_url = "https://api.anthropic.com/v1/messages"
@@ -290,12 +1145,24 @@ def _call_claude_api(api_url, model_name, api_key, prompt, system_prompt, temper
     }
     
     print(f"[FasterWhisper] API 模式: Claude, Model: {model_name}")
-    
-    response = requests.post(
+
+    if listener is not None:
+        payload["stream"] = True
+
+        def extract(event):
+            event_type = event.get("type")
+            if event_type == "error":
+                raise _stream_error("Claude", event.get("error", {}))
+            if event_type == "content_block_delta" and event.get("delta", {}).get("type") == "text_delta":
+                return event["delta"].get("text", "")
+            return ""
+        return await _stream_completion("Claude", api_url, headers, payload, timeout, extract, listener)
+
+    response = await http_pool.post(
         api_url,
         headers=headers,
         json=payload,
-        timeout=30
+        timeout=timeout
     )
     
     if response.status_code == 200:
@@ -304,14 +1171,15 @@ def _call_claude_api(api_url, model_name, api_key, prompt, system_prompt, temper
         if content:
             for block in content:
                 if block.get('type') == 'text':
-                    return block.get('text', prompt).strip()
-        return prompt
+                    return block.get('text', '').strip()
+        return ""
     else:
-        print(f"[FasterWhisper] Claude API 错误: {response.status_code} - {response.text}")
-        return prompt
+        raise LLMApiError(f"Claude API 错误: {response.status_code} - {response.text[:500]}",
+                          response.status_code, parse_retry_after(response.headers))
 
 
-def _call_openai_compatible_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens, api_format="自动检测"):
+async def _call_openai_compatible_api(api_url, model_name, api_key, prompt, system_prompt, temperature, max_tokens,
+                                api_format="自动检测", timeout=DEFAULT_REQUEST_TIMEOUT, listener=None):
     """调用 OpenAI 兼容 API（支持 chat/completions、completions 和 responses 三种格式）"""
     headers = {
         "Content-Type": "application/json",
@@ -349,7 +1217,7 @@ def _call_openai_compatible_api(api_url, model_name, api_key, prompt, system_pro
             "prompt": full_prompt,
             "temperature": temperature,
             "max_tokens": max_tokens,
-            "stream": False,
+            "stream": listener is not None,
         }
     elif api_mode == "responses":
         # Responses API 格式（火山方舟 doubao-seed 等模型）
@@ -368,6 +1236,8 @@ def _call_openai_compatible_api(api_url, model_name, api_key, prompt, system_pro
             "temperature": temperature,
             "max_output_tokens": max_tokens,
         }
+        if listener is not None:
+            payload["stream"] = True
     else:
         # Chat Completions API 格式（标准 OpenAI）
         payload = {
@@ -378,14 +1248,30 @@ def _call_openai_compatible_api(api_url, model_name, api_key, prompt, system_pro
             ],
             "temperature": temperature,
             "max_tokens": max_tokens,
-            "stream": False,
+            "stream": listener is not None,
         }
-    
-    response = requests.post(
+
+    if listener is not None:
+        def extract(event):
+            if event.get("error"):
+                raise _stream_error("OpenAI", event["error"])
+            if api_mode == "responses":
+                # Responses API 流式事件：response.output_text.delta 携带增量文本
+                event_type = event.get("type", "")
+                if event_type in ("error", "response.failed"):
+                    raise _stream_error("OpenAI", event.get("error") or event.get("response", {}).get("error"))
+                return event.get("delta", "") if event_type == "response.output_text.delta" else ""
+            choices = event.get("choices") or [{}]
+            if api_mode == "completions":
+                return choices[0].get("text") or ""
+            return (choices[0].get("delta") or {}).get("content") or ""
+        return await _stream_completion("OpenAI", api_url, headers, payload, timeout, extract, listener)
+
+    response = await http_pool.post(
         api_url,
         headers=headers,
         json=payload,
-        timeout=30
+        timeout=timeout
     )
     
     if response.status_code == 200:
@@ -400,19 +1286,19 @@ def _call_openai_compatible_api(api_url, model_name, api_key, prompt, system_pro
                         content = item.get('content', [])
                         for c in content:
                             if c.get('type') == 'output_text':
-                                return c.get('text', prompt).strip()
-            return prompt
+                                return c.get('text', '').strip()
+            return ""
         
         choices = result.get('choices', [])
         if choices:
             if api_mode == "completions":
                 # Completions 格式返回 text
-                return choices[0].get('text', prompt).strip()
+                return choices[0].get('text', '').strip()
             else:
                 # Chat 格式返回 message.content
                 message = choices[0].get('message', {})
-                return message.get('content', prompt).strip()
-        return prompt
+                return message.get('content', '').strip()
+        return ""
     else:
-        print(f"[FasterWhisper] OpenAI API 错误: {response.status_code} - {response.text}")
-        return prompt
+        raise LLMApiError(f"OpenAI API 错误: {response.status_code} - {response.text[:500]}",
+                          response.status_code, parse_retry_after(response.headers))
@@ -31,13 +31,62 @@ class LocalOllamaModelLoaderNode:
                     "min": 64,
                     "max": 8192,
                     "step": 64,
-                    "tooltip": "最大生成 token 数（Ollama generate 接口可能忽略）",
+                    "tooltip": "最大生成 token 数（作为 Ollama 的 num_predict）",
                 }),
                 "system_prompt": ("STRING", {
                     "default": "",
                     "multiline": True,
                     "tooltip": "系统提示词（可选，留空使用默认翻译提示）",
                 }),
+                "batch_size": ("INT", {
+                    "default": 10,
+                    "min": 1,
+                    "max": 100,
+                    "step": 1,
+                    "tooltip": "每个请求最多翻译的字幕条数，实际按 token 预算装箱；1 表示逐条翻译",
+                }),
+                "context_window": ("INT", {
+                    "default": 8192,
+                    "min": 0,
+                    "max": 2000000,
+                    "step": 1024,
+                    "tooltip": "上下文长度（作为 Ollama 的 num_ctx），同时用于计算每批的输入预算；0 表示使用服务端默认值（按 2048 分批）",
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1,
+                    "tooltip": "同时进行的翻译请求数，应与启动 Ollama 时设置的 OLLAMA_NUM_PARALLEL（服务端并行槽位数）一致；Ollama 默认逐个处理请求",
+                }),
+                "request_timeout": ("INT", {
+                    "default": 120,
+                    "min": 5,
+                    "max": 1800,
+                    "step": 5,
+                    "tooltip": "单个请求的超时时间（秒）",
+                }),
+                "translation_memory": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "启用翻译记忆：相同的字幕直接使用以前的译文",
+                }),
+                "stream": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "流式接收模型输出，每条译文完成即显示在文本展示框中；接口不支持流式响应时关闭",
+                }),
+                "max_retries": ("INT", {
+                    "default": 2,
+                    "min": 0,
+                    "max": 20,
+                    "step": 1,
+                    "tooltip": "限流（429）、服务端临时错误和网络错误的最大重试次数",
+                }),
+                # 新增的输入追加在末尾，已保存工作流的控件值不会错位
+                "keep_alive": ("STRING", {
+                    "default": "30m",
+                    "multiline": False,
+                    "tooltip": "最后一次请求后模型保持加载的时间（如 30m、2h），-1 表示一直保持",
+                }),
             },
         }
 
@@ -61,9 +110,12 @@ class LocalOllamaModelLoaderNode:
 
         return ["qwen2.5:7b", "llama3.1:8b", "gemma2:9b", "无可用模型"]
 
-    def create_local_model_config(self, ollama_model, ollama_url, temperature=0.3, max_tokens=1024, system_prompt=""):
+    def create_local_model_config(self, ollama_model, ollama_url, temperature=0.3, max_tokens=1024, system_prompt="",
+                                  batch_size=10, max_concurrency=1, request_timeout=120,
+                                  translation_memory=True, max_retries=2, context_window=8192,
+                                  stream=True, keep_alive="30m"):
         base_url = (ollama_url or "").rstrip("/")
-        api_url = f"{base_url}/api/generate" if base_url else "http://localhost:11434/api/generate"
+        api_url = f"{base_url}/api/chat" if base_url else "http://localhost:11434/api/chat"
 
         config = {
             "api_type": "Ollama",
@@ -73,6 +125,15 @@ class LocalOllamaModelLoaderNode:
             "temperature": temperature,
             "max_tokens": max_tokens,
             "system_prompt": system_prompt,
+            "batch_size": batch_size,
+            "context_window": context_window,
+            # 并发数不超过服务端的并行槽位，多出的请求只会在 Ollama 中排队
+            "max_concurrency": max_concurrency,
+            "keep_alive": keep_alive,
+            "request_timeout": request_timeout,
+            "translation_memory": translation_memory,
+            "max_retries": max_retries,
+            "stream": stream,
         }
 
         print(f"[FasterWhisper] 本地大模型配置: Ollama - {ollama_model}")
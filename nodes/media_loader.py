@@ -8,6 +8,8 @@ import tempfile
 import hashlib
 import folder_paths
 from pathlib import Path
+from ..utils.media_probe import probe_media, file_fingerprint
+from ..utils.workspace import atomic_temp_path, finalize_output
 
 # 确保媒体目录存在
 MEDIA_INPUT_DIR = os.path.join(folder_paths.get_input_directory(), "media")
@@ -68,10 +70,8 @@ class MediaLoaderNode:
         if media_file and media_file != "请上传媒体文件":
             file_path = os.path.join(MEDIA_INPUT_DIR, media_file)
             if os.path.exists(file_path):
-                m = hashlib.md5()
-                with open(file_path, 'rb') as f:
-                    m.update(f.read())
-                return m.hexdigest()
+                # 使用文件指纹，避免每次排队都读取整个大文件计算哈希
+                return file_fingerprint(file_path)
         return ""
     
     def load_media(self, media_file, upload_file="", unique_id=None):
@@ -96,8 +96,12 @@ class MediaLoaderNode:
         
         if ext in video_extensions:
             video_path = file_path
+            # 探测一次元数据（结果按文件指纹缓存，供识别和烧录节点复用）
+            info = probe_media(file_path)
+            if info["audio"] is None:
+                raise ValueError(f"视频文件中没有音频轨道: {media_file}")
             # 从视频中提取音频
-            audio_path = self._extract_audio_from_video(file_path)
+            audio_path = self._extract_audio_from_video(file_path, info["fingerprint"])
         elif ext in audio_extensions:
             audio_path = file_path
             video_path = ""  # 音频文件没有视频输出
@@ -106,10 +110,10 @@ class MediaLoaderNode:
         
         return (audio_path, video_path)
     
-    def _extract_audio_from_video(self, video_path):
+    def _extract_audio_from_video(self, video_path, fingerprint):
         """
         从视频中提取音频
-        使用 PyAV 或 moviepy 进行提取
+        使用 PyAV 或 moviepy 进行提取，输出文件按视频指纹命名，源文件替换后不会误用旧音频
         """
         try:
             import av
@@ -118,21 +122,19 @@ class MediaLoaderNode:
             video_name = os.path.splitext(os.path.basename(video_path))[0]
             audio_output_dir = os.path.join(folder_paths.get_temp_directory(), "extracted_audio")
             os.makedirs(audio_output_dir, exist_ok=True)
-            audio_path = os.path.join(audio_output_dir, f"{video_name}_audio.wav")
+            audio_path = os.path.join(audio_output_dir, f"{video_name}_{fingerprint[:12]}_audio.wav")
             
             # 如果已经提取过，直接返回
             if os.path.exists(audio_path):
                 return audio_path
             
-            # 使用 PyAV 提取音频
+            # 使用 PyAV 提取音频（音轨存在性已由探测结果确认）
             container = av.open(video_path)
-            audio_stream = next((s for s in container.streams if s.type == 'audio'), None)
+            audio_stream = container.streams.audio[0]
             
-            if audio_stream is None:
-                raise ValueError("视频文件中没有音频轨道")
-            
-            # 创建输出容器
-            output_container = av.open(audio_path, 'w')
+            # 先写入临时文件，完成后原子替换（并发任务不会读到写了一半的音频）
+            tmp_audio_path = atomic_temp_path(audio_path)
+            output_container = av.open(tmp_audio_path, 'w')
             output_stream = output_container.add_stream('pcm_s16le', rate=16000, layout='mono')
             
             resampler = av.audio.resampler.AudioResampler(
@@ -155,7 +157,7 @@ class MediaLoaderNode:
             output_container.close()
             container.close()
             
-            return audio_path
+            return finalize_output(tmp_audio_path, audio_path)
             
         except ImportError:
             # 如果没有 PyAV，尝试使用 moviepy
@@ -165,16 +167,17 @@ class MediaLoaderNode:
                 video_name = os.path.splitext(os.path.basename(video_path))[0]
                 audio_output_dir = os.path.join(folder_paths.get_temp_directory(), "extracted_audio")
                 os.makedirs(audio_output_dir, exist_ok=True)
-                audio_path = os.path.join(audio_output_dir, f"{video_name}_audio.wav")
+                audio_path = os.path.join(audio_output_dir, f"{video_name}_{fingerprint[:12]}_audio.wav")
                 
                 if os.path.exists(audio_path):
                     return audio_path
                 
+                tmp_audio_path = atomic_temp_path(audio_path)
                 video = VideoFileClip(video_path)
-                video.audio.write_audiofile(audio_path, fps=16000, nbytes=2, codec='pcm_s16le')
+                video.audio.write_audiofile(tmp_audio_path, fps=16000, nbytes=2, codec='pcm_s16le')
                 video.close()
                 
-                return audio_path
+                return finalize_output(tmp_audio_path, audio_path)
                 
             except ImportError:
                 raise ImportError("请安装 av 或 moviepy: pip install av moviepy")
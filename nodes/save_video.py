@@ -8,6 +8,8 @@ import shutil
 import hashlib
 import folder_paths
 from pathlib import Path
+from ..utils.media_preview import schedule_preview
+from ..utils.workspace import atomic_temp_path, finalize_output
 
 # 输出目录
 OUTPUT_DIR = os.path.join(folder_paths.get_output_directory(), "faster_whisper_videos")
@@ -81,13 +83,21 @@ class SaveVideoNode:
                     output_filename = f"{filename_prefix}_{counter:04d}{ext}"
                 
                 output_path = os.path.join(OUTPUT_DIR, output_filename)
-                if not os.path.exists(output_path):
+                # 以独占方式创建占位文件，并发保存不会选中同一个文件名
+                try:
+                    os.close(os.open(output_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
                     break
-                counter += 1
+                except FileExistsError:
+                    counter += 1
         
-        # 复制文件到输出目录
+        # 先复制到同目录临时文件，再原子替换为最终文件名
         print(f"[FasterWhisper] 保存视频: {output_path}")
-        shutil.copy2(video_path, output_path)
+        tmp_path = atomic_temp_path(output_path)
+        shutil.copy2(video_path, tmp_path)
+        finalize_output(tmp_path, output_path)
+        
+        # 后台生成低码率预览代理，节点界面预览不必拉取原始文件
+        schedule_preview(output_path)
         
         # 返回结果，包含预览信息
         results = {
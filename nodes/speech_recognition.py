@@ -10,7 +10,10 @@ from pathlib import Path
 import inspect
 import tempfile
 import numpy as np
-from .llm_api import call_llm_api
+from .llm_api import translate_texts, TranslationPipeline
+from ..utils.media_probe import probe_media, MediaProbeError
+from ..utils.live_preview import LivePreview
+from ..utils.workspace import job_workspace
 
 # 模型存储路径
 MODELS_DIR = os.path.join(folder_paths.models_dir, "faster-whisper")
@@ -151,7 +154,14 @@ class SpeechRecognitionNode:
                     "default": True,
                     "tooltip": "启用 VAD 过滤器过滤无声部分"
                 }),
+                "pipeline_translation": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "边识别边翻译：识别出的字幕凑满一批立即发送翻译，识别与翻译同时进行\n本地 Ollama 与 Whisper 共用显卡且显存紧张时可关闭"
+                }),
             },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            }
         }
     
     RETURN_TYPES = ("SRT_TEXT", "SRT_TEXT")
@@ -205,13 +215,13 @@ class SpeechRecognitionNode:
             return None
         return language_str.split(" ")[0]
     
-    def _segments_to_srt(self, segments):
-        """将识别结果转换为 SRT 格式"""
+    def _segments_to_srt(self, segments, texts=None):
+        """将识别结果转换为 SRT 格式；提供 texts 时用其替换各片段文本（如译文）"""
         srt_content = []
         for i, segment in enumerate(segments, 1):
             start_time = self._format_timestamp(segment.start)
             end_time = self._format_timestamp(segment.end)
-            text = segment.text.strip()
+            text = texts[i - 1] if texts is not None else segment.text.strip()
             srt_content.append(f"{i}\n{start_time} --> {end_time}\n{text}\n")
         return "\n".join(srt_content)
 
@@ -223,11 +233,8 @@ class SpeechRecognitionNode:
         millis = int((seconds % 1) * 1000)
         return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
     
-    def _translate_with_llm_api(self, srt_content, target_language, llm_api_config):
-        """使用外部 LLM API 翻译 SRT 内容（批量翻译优化）"""
-        if target_language == "无翻译" or not srt_content:
-            return ""
-        
+    def _target_language_name(self, target_language):
+        """翻译目标语言选项转换为提示词中使用的语言名称"""
         target_lang = target_language.split(" ")[0]
         lang_names = {
             "zh-CN": "简体中文",
@@ -245,7 +252,14 @@ class SpeechRecognitionNode:
             "th": "泰语",
             "vi": "越南语",
         }
-        target_lang_name = lang_names.get(target_lang, target_lang)
+        return lang_names.get(target_lang, target_lang)
+    
+    def _translate_with_llm_api(self, srt_content, target_language, llm_api_config, preview=None):
+        """使用外部 LLM API 翻译 SRT 内容（批量翻译优化）；提供 preview 时实时推送已完成的译文"""
+        if target_language == "无翻译" or not srt_content:
+            return ""
+        
+        target_lang_name = self._target_language_name(target_language)
         
         # 解析 SRT 块
         blocks = srt_content.strip().split("\n\n")
@@ -262,51 +276,21 @@ class SpeechRecognitionNode:
                     "text": "\n".join(parts[2:])
                 })
         
-        # 批量翻译参数
-        batch_size = 10  # 每批翻译 10 条
-        translated_lines = []
-        total_batches = (len(subtitles) + batch_size - 1) // batch_size
-        
-        print(f"[FasterWhisper] 批量翻译: 共 {len(subtitles)} 条字幕，分 {total_batches} 批处理")
-        
-        for batch_idx in range(0, len(subtitles), batch_size):
-            batch = subtitles[batch_idx:batch_idx + batch_size]
-            current_batch = batch_idx // batch_size + 1
-            
-            # 逐条翻译每个字幕（更可靠）
-            for sub in batch:
-                translated_text = call_llm_api(llm_api_config, sub['text'], target_lang_name)
-                translated_lines.append(f"{sub['index']}\n{sub['timestamp']}\n{translated_text}")
-            
-            print(f"[FasterWhisper] 翻译进度: 批次 {current_batch}/{total_batches} ({current_batch*100//total_batches}%)")
+        # 按大模型配置的 token 预算和 batch_size 把多条字幕合并到一个请求中翻译
+        texts = [sub['text'] for sub in subtitles]
+        on_cue = None
+        if preview is not None:
+            preview.sources[:] = texts
+            on_cue = preview.update
+        translations = translate_texts(llm_api_config, texts, target_lang_name, on_cue)
         
+        translated_lines = [
+            f"{sub['index']}\n{sub['timestamp']}\n{text}"
+            for sub, text in zip(subtitles, translations)
+        ]
         return "\n\n".join(translated_lines)
     
-    def _parse_batch_translation(self, translated_text, expected_count):
-        """解析批量翻译结果"""
-        results = []
-        lines = translated_text.strip().split("\n")
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            # 尝试匹配 [1] xxx 或 1. xxx 或 1、xxx 格式
-            import re
-            match = re.match(r'^\[?\d+[\]\.、:：]\s*(.+)$', line)
-            if match:
-                results.append(match.group(1).strip())
-            elif len(results) < expected_count:
-                # 如果没有编号，直接添加
-                results.append(line)
-        
-        # 如果解析结果不足，用空字符串填充
-        while len(results) < expected_count:
-            results.append("")
-        
-        return results[:expected_count]
-    
-    def _audio_to_file(self, audio):
+    def _audio_to_file(self, audio, workspace):
         """
         将 ComfyUI 原生 AUDIO 类型转换为临时音频文件
         AUDIO 类型格式: {"waveform": tensor, "sample_rate": int}
@@ -336,29 +320,32 @@ class SpeechRecognitionNode:
         waveform = np.clip(waveform, -1.0, 1.0)
         waveform_int16 = (waveform * 32767).astype(np.int16)
         
-        # 保存为临时 wav 文件
-        temp_dir = os.path.join(folder_paths.get_temp_directory(), "audio_input")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, f"audio_input_{id(audio)}.wav")
+        # 保存为工作区内的临时 wav 文件
+        temp_path = os.path.join(workspace, "audio_input.wav")
         
         wavfile.write(temp_path, sample_rate, waveform_int16)
         return temp_path
 
     def transcribe(self, model, compute_type, language, translation_language,
-                   audio_path=None, audio=None, llm_model=None, beam_size=5, batch_size=8, vad_filter=True):
+                   audio_path=None, audio=None, llm_model=None, beam_size=5, batch_size=8, vad_filter=True,
+                   pipeline_translation=True, unique_id=None):
         """
         执行语音识别
         """
-        # 确定音频来源
-        actual_audio_path = None
-        
         if audio is not None:
-            # 使用 ComfyUI 原生 AUDIO 类型
+            # 使用 ComfyUI 原生 AUDIO 类型，临时音频写入本次执行的独立工作区
             print("[FasterWhisper] 使用 ComfyUI 原生音频输入")
-            actual_audio_path = self._audio_to_file(audio)
-        elif audio_path:
-            actual_audio_path = audio_path
+            with job_workspace("transcribe") as workspace:
+                return self._transcribe_file(self._audio_to_file(audio, workspace), model, compute_type,
+                                             language, translation_language, llm_model,
+                                             beam_size, batch_size, vad_filter, pipeline_translation, unique_id)
         
+        return self._transcribe_file(audio_path, model, compute_type, language, translation_language,
+                                     llm_model, beam_size, batch_size, vad_filter, pipeline_translation, unique_id)
+    
+    def _transcribe_file(self, actual_audio_path, model, compute_type, language, translation_language,
+                         llm_model, beam_size, batch_size, vad_filter, pipeline_translation=True, unique_id=None):
+        """识别音频文件并按需翻译"""
         if not actual_audio_path or not os.path.exists(actual_audio_path):
             raise FileNotFoundError(f"音频文件不存在或未提供音频输入。请连接 '音频路径' 或 'audio' 输入。")
         
@@ -405,8 +392,49 @@ class SpeechRecognitionNode:
             else:
                 raise
         
-        # 转换为列表（触发实际识别）
-        segments_list = list(segments)
+        # 进度总量取自媒体探测结果（与加载器共享缓存），探测失败时回退到识别器给出的时长
+        total_duration = None
+        try:
+            total_duration = probe_media(actual_audio_path)["duration"]
+        except MediaProbeError as e:
+            print(f"[FasterWhisper] 警告: {e}")
+        if not total_duration:
+            total_duration = getattr(info, "duration", None)
+
+        pbar = None
+        if total_duration:
+            try:
+                import comfy.utils
+                pbar = comfy.utils.ProgressBar(int(total_duration * 1000))
+            except ImportError:
+                pbar = None
+
+        # 翻译过程中把已完成的译文推送到下游文本展示框
+        preview = None
+        if translation_language != "无翻译" and llm_model is not None:
+            preview = LivePreview(unique_id, [])
+
+        # 流水线模式：识别出的片段立即送入翻译队列，识别与翻译同时进行
+        pipeline = None
+        if preview is not None and pipeline_translation:
+            print(f"[FasterWhisper] 使用大模型: {llm_model.get('api_type', '')} - {llm_model.get('model_name', '')}")
+            pipeline = TranslationPipeline(llm_model, self._target_language_name(translation_language),
+                                           preview.update)
+
+        # 逐段消费生成器（触发实际识别），按已识别到的时间位置更新进度
+        segments_list = []
+        try:
+            for segment in segments:
+                segments_list.append(segment)
+                if pipeline is not None:
+                    preview.sources.append(segment.text.strip())
+                    pipeline.submit(segment.text.strip())
+                if pbar is not None:
+                    pbar.update_absolute(min(int(segment.end * 1000), int(total_duration * 1000)))
+        except BaseException:
+            if pipeline is not None:
+                pipeline.abort()
+            raise
         
         print(f"[FasterWhisper] 检测到语言: {info.language} (概率: {info.language_probability:.2f})")
         print(f"[FasterWhisper] 识别完成，共 {len(segments_list)} 个片段")
@@ -419,11 +447,18 @@ class SpeechRecognitionNode:
         if translation_language != "无翻译":
             print(f"[FasterWhisper] 开始翻译到: {translation_language}")
 
-            if llm_model is not None:
-                print(f"[FasterWhisper] 使用大模型: {llm_model.get('api_type', '')} - {llm_model.get('model_name', '')}")
-                translated_srt = self._translate_with_llm_api(srt_content, translation_language, llm_model)
-            else:
-                print(f"[FasterWhisper] 警告: 未连接大模型配置节点，跳过翻译")
+            try:
+                if pipeline is not None:
+                    translated_srt = self._segments_to_srt(segments_list, pipeline.close())
+                elif llm_model is not None:
+                    print(f"[FasterWhisper] 使用大模型: {llm_model.get('api_type', '')} - {llm_model.get('model_name', '')}")
+                    translated_srt = self._translate_with_llm_api(srt_content, translation_language, llm_model,
+                                                                  preview)
+                else:
+                    print(f"[FasterWhisper] 警告: 未连接大模型配置节点，跳过翻译")
+            finally:
+                if preview is not None:
+                    preview.finish()
             
             if translated_srt:
                 print(f"[FasterWhisper] 翻译完成")
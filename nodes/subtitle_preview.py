@@ -0,0 +1,190 @@
+"""
+字幕样式预览节点 - 只渲染少量画面或一小段视频，快速检查字体、颜色和位置
+与完整烧录使用同一套 ASS 生成逻辑，无需整段重编码
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from .video_burn import VideoBurnNode
+from ..utils.ffmpeg_runner import run_ffmpeg
+from ..utils.workspace import job_workspace, temp_output_path, finalize_output
+from ..utils.encoder_profiles import PROFILE_DRAFT, resolve_profile, build_encoder_args
+
+# 预览不需要的烧录输出/编码设置
+PREVIEW_EXCLUDED_INPUTS = {
+    "output_mode", "burn_workers", "soft_container", "text_language", "trans_language",
+    "encoder_profile", "custom_codec", "custom_preset", "custom_crf", "custom_bitrate",
+    "custom_pix_fmt", "encoder_threads", "filter_threads",
+}
+
+# 同时渲染的预览帧数
+PREVIEW_WORKERS = 4
+
+
+class SubtitlePreviewNode(VideoBurnNode):
+    """
+    字幕样式预览节点
+    - 在选定字幕的中间时刻各渲染一帧，输出 IMAGE
+    - 可选渲染一小段带字幕的视频片段
+    - 样式参数与文本与视频烧录节点一致，调好后可直接套用
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = VideoBurnNode.INPUT_TYPES()
+        optional = {k: v for k, v in inputs["optional"].items() if k not in PREVIEW_EXCLUDED_INPUTS}
+        optional.update({
+            "frame_count": ("INT", {
+                "default": 4,
+                "min": 1,
+                "max": 32,
+                "step": 1,
+                "tooltip": "未指定字幕序号时，在全部字幕中均匀挑选的预览帧数"
+            }),
+            "cue_indices": ("STRING", {
+                "default": "",
+                "multiline": False,
+                "tooltip": "要预览的字幕序号 (从 1 开始，逗号分隔，如 1,5,12)，留空则均匀挑选"
+            }),
+            "clip_start": ("FLOAT", {
+                "default": -1.0,
+                "min": -1.0,
+                "max": 86400.0,
+                "step": 0.1,
+                "tooltip": "预览片段起点 (秒)，-1 表示从第一条预览字幕的开始时间起"
+            }),
+            "clip_duration": ("FLOAT", {
+                "default": 0.0,
+                "min": 0.0,
+                "max": 60.0,
+                "step": 0.5,
+                "tooltip": "预览片段时长 (秒)，0 表示只输出预览帧"
+            }),
+        })
+        return {"required": inputs["required"], "optional": optional}
+
+    RETURN_TYPES = ("IMAGE", "BURNED_VIDEO_PATH")
+    RETURN_NAMES = ("预览帧", "预览片段")
+    FUNCTION = "preview_subtitles"
+    CATEGORY = "FasterWhisper/视频"
+
+    def _select_cues(self, cues, frame_count, cue_indices):
+        """按序号或均匀间隔挑选要预览的字幕"""
+        if cue_indices.strip():
+            selected = []
+            for part in cue_indices.replace("，", ",").split(","):
+                part = part.strip()
+                if not part:
+                    continue
+                if not part.isdigit() or not 1 <= int(part) <= len(cues):
+                    raise ValueError(f"字幕序号无效: {part} (共 {len(cues)} 条)")
+                selected.append(cues[int(part) - 1])
+            return selected
+
+        count = min(frame_count, len(cues))
+        if count == 1:
+            return [cues[len(cues) // 2]]
+        return [cues[round(i * (len(cues) - 1) / (count - 1))] for i in range(count)]
+
+    def _render_frame(self, video_path, ass_path, fontsdir, t, raw_path, width, height):
+        """快速定位到 t 附近的关键帧并渲染一帧带字幕的 RGB 画面"""
+        cmd = [
+            'ffmpeg', '-y',
+            '-ss', f"{t:.3f}",
+            '-i', video_path,
+            '-frames:v', '1', '-an',
+            # 输入端定位后时间戳从 0 开始，平移回 t 使 ASS 按原时间轴显示
+            '-vf', f"setpts=PTS+{t:.3f}/TB,{self._ass_filter(ass_path, fontsdir)}",
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+            raw_path
+        ]
+        run_ffmpeg(cmd, label=f"预览帧 {t:.1f}s", progress=False)
+
+        data = np.fromfile(raw_path, dtype=np.uint8)
+        expected = width * height * 3
+        if data.size < expected:
+            raise RuntimeError(f"预览帧尺寸与视频不符: {t:.1f}s")
+        return data[:expected].reshape(height, width, 3)
+
+    def _render_clip(self, video_path, ass_path, fontsdir, start, duration, workspace):
+        """渲染一小段带字幕的视频（使用 draft 编码配置）"""
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        clip_path = os.path.join(workspace, f"{video_name}_preview.mp4")
+        cmd = [
+            'ffmpeg', '-y',
+            '-ss', f"{start:.3f}",
+            '-i', video_path,
+            '-t', f"{duration:.3f}",
+            '-vf', f"setpts=PTS+{start:.3f}/TB,{self._ass_filter(ass_path, fontsdir)},setpts=PTS-STARTPTS",
+            *build_encoder_args(resolve_profile(PROFILE_DRAFT)),
+            '-c:a', 'aac',
+            clip_path
+        ]
+        run_ffmpeg(cmd, duration=duration, label="预览片段")
+        return finalize_output(clip_path, temp_output_path("subtitle_previews", f"{video_name}_preview", "mp4"))
+
+    def preview_subtitles(self, video_path, srt_text="", translated_srt="",
+                          text_size=24, text_color="white", text_position_x=-1, text_position_y=-1,
+                          text_outline_color="black", text_outline_width=2,
+                          trans_text_size=20, trans_text_color="yellow", trans_position_x=-1, trans_position_y=-2,
+                          trans_outline_color="black", trans_outline_width=2,
+                          text_font_name="Arial", trans_font_name="Arial",
+                          frame_count=4, cue_indices="", clip_start=-1.0, clip_duration=0.0):
+        """
+        渲染字幕样式预览
+        """
+        import torch
+
+        if not video_path or not os.path.exists(video_path):
+            raise FileNotFoundError(f"视频文件不存在: {video_path}")
+
+        prepared = self._prepare_subtitles(
+            video_path, srt_text, translated_srt,
+            text_size, text_color, text_position_x, text_position_y, text_outline_color, text_outline_width,
+            trans_text_size, trans_text_color, trans_position_x, trans_position_y,
+            trans_outline_color, trans_outline_width, text_font_name, trans_font_name
+        )
+        if prepared is None:
+            raise ValueError("没有可预览的字幕，请连接 SRT 字幕或翻译字幕")
+        subtitles, translated_subtitles, video_width, video_height, ass_style = prepared
+
+        cues = self._select_cues(subtitles or translated_subtitles, frame_count, cue_indices)
+        if not cues:
+            raise ValueError("没有选中任何字幕，请检查字幕序号")
+        times = [(cue['start'] + cue['end']) / 2 for cue in cues]
+
+        with job_workspace("preview") as workspace:
+            ass_path = self._create_ass_file(
+                subtitles, translated_subtitles, video_width, video_height, *ass_style,
+                ass_path=os.path.join(workspace, "subtitles.ass")
+            )
+            fontsdir = self._job_fontsdir(workspace, text_font_name, trans_font_name)
+
+            pbar = None
+            try:
+                import comfy.utils
+                pbar = comfy.utils.ProgressBar(len(times))
+            except ImportError:
+                pass
+
+            def render(i):
+                frame = self._render_frame(video_path, ass_path, fontsdir, times[i],
+                                           os.path.join(workspace, f"frame_{i:03d}.rgb"),
+                                           video_width, video_height)
+                if pbar is not None:
+                    pbar.update(1)
+                return frame
+
+            with ThreadPoolExecutor(max_workers=min(PREVIEW_WORKERS, len(times))) as executor:
+                frames = list(executor.map(render, range(len(times))))
+
+            clip_path = ""
+            if clip_duration > 0:
+                start = clip_start if clip_start >= 0 else cues[0]['start']
+                clip_path = self._render_clip(video_path, ass_path, fontsdir, start, clip_duration, workspace)
+
+        print(f"[FasterWhisper] 字幕预览完成: {len(frames)} 帧" + (f", 片段 {clip_path}" if clip_path else ""))
+        images = torch.from_numpy(np.stack(frames).astype(np.float32) / 255.0)
+        return (images, clip_path)
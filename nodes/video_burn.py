@@ -5,11 +5,22 @@
 
 import os
 import re
-import tempfile
+import bisect
 import sys
-import folder_paths
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from functools import lru_cache
+from ..utils.media_probe import probe_media, file_fingerprint, display_size, MediaProbeError
+from ..utils.burn_cache import compute_burn_key, get_cached_burn, store_burn
+from ..utils.workspace import job_workspace, temp_output_path, finalize_output
+from ..utils.encoder_profiles import (
+    PROFILE_NAMES, PROFILE_BALANCED, PROFILE_CUSTOM, CUSTOM_CODECS, PRESETS, PIX_FMTS,
+    resolve_profile, build_encoder_args, build_filter_args,
+)
+from ..utils.ffmpeg_runner import run_ffmpeg, ProgressGroup
+from ..utils.interrupt import InterruptProcessingException
 
 # 颜色名称到十六进制的映射
 COLOR_MAP = {
@@ -31,6 +42,68 @@ COLOR_MAP = {
 
 COLOR_CHOICES = list(COLOR_MAP.keys())
 
+# 输出模式
+OUTPUT_MODE_BURN = "烧录 (硬字幕)"
+OUTPUT_MODE_SOFT = "封装 (软字幕，不重编码)"
+OUTPUT_MODE_PARALLEL = "并行烧录 (按关键帧分段)"
+OUTPUT_MODE_SMART = "智能渲染 (仅重编码含字幕的 GOP)"
+OUTPUT_MODES = [OUTPUT_MODE_BURN, OUTPUT_MODE_SOFT, OUTPUT_MODE_PARALLEL, OUTPUT_MODE_SMART]
+
+# 智能渲染支持的源编码: 编码器, 转 Annex B 的比特流滤镜
+SMART_RENDER_CODECS = {
+    "h264": ("libx264", "h264_mp4toannexb"),
+    "hevc": ("libx265", "hevc_mp4toannexb"),
+}
+# 智能渲染重编码片段的 CRF（视觉无损），与直接复制的原始片段画质一致，不取编码配置的 CRF/码率
+SMART_RENDER_CRF = {"libx264": 16, "libx265": 18}
+# 源档次到编码器 -profile:v 的映射（HEVC 的 Rext 等无法确定具体档次，不做智能渲染）
+H264_PROFILES = [("high 4:4:4", "high444"), ("high 4:2:2", "high422"), ("high 10", "high10"),
+                 ("high", "high"), ("main", "main"), ("baseline", "baseline")]
+HEVC_PROFILES = {"main": "main", "main 10": "main10"}
+
+# 并行烧录每段的最短时长（秒）：每个 FFmpeg 进程都要重新打开输入、初始化编码器和 libass，
+# 分段过短时启动开销超过并行收益，视频不足两段时直接单进程烧录
+MIN_PARALLEL_SEGMENT_SECONDS = 30.0
+
+# 软字幕封装容器
+SOFT_CONTAINERS = ["mkv", "mp4"]
+
+# 字幕轨道语言标签（ISO 639-2/B，MP4 容器只接受三字母代码）
+LANGUAGE_TAGS = {
+    "zh": "chi",
+    "zh-CN": "chi",
+    "zh-TW": "chi",
+    "en": "eng",
+    "ja": "jpn",
+    "ko": "kor",
+    "fr": "fre",
+    "de": "ger",
+    "es": "spa",
+    "ru": "rus",
+    "it": "ita",
+    "pt": "por",
+    "nl": "dut",
+    "pl": "pol",
+    "tr": "tur",
+    "ar": "ara",
+    "th": "tha",
+    "vi": "vie",
+    "id": "ind",
+    "hi": "hin",
+}
+
+
+def normalize_language_tag(language):
+    """将 "zh-CN (简体中文)" / "en" / "eng" 等语言描述转换为三字母语言标签"""
+    code = str(language or "").strip().split(" ")[0]
+    if not code:
+        return "und"
+    if code in LANGUAGE_TAGS:
+        return LANGUAGE_TAGS[code]
+    if len(code) == 3 and code.isalpha():
+        return code.lower()
+    return LANGUAGE_TAGS.get(code.split("-")[0], "und")
+
 
 def _get_font_dirs():
     """获取字体目录列表，系统字体优先，本地字体作为后备"""
@@ -156,6 +229,109 @@ def get_default_fontsdir():
     return ""
 
 
+# 常见字体族名与字体文件名（小写，不含扩展名）的对应关系
+FONT_FILE_ALIASES = {
+    "simhei": ["simhei"],
+    "simsun": ["simsun"],
+    "nsimsun": ["simsun"],
+    "fangsong": ["simfang"],
+    "kaiti": ["simkai", "kaiti"],
+    "microsoft yahei": ["msyh", "microsoftyahei"],
+    "arial": ["arial"],
+    "times new roman": ["times", "timesnewroman"],
+    "courier new": ["cour", "couriernew"],
+    "helvetica": ["helvetica"],
+    "noto sans cjk sc": ["notosanscjksc-regular", "notosanscjk-regular"],
+}
+
+
+def _font_dirs_signature():
+    """
+    字体目录及其直接子目录的修改时间（安装或删除字体会改变所在目录的修改时间），
+    作为字体索引缓存的键，字体变化后自动重新扫描
+    """
+    signature = []
+    for d in _get_font_dirs():
+        try:
+            signature.append((str(d), d.stat().st_mtime_ns))
+            with os.scandir(d) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        signature.append((entry.path, entry.stat().st_mtime_ns))
+        except OSError:
+            continue
+    return tuple(signature)
+
+
+@lru_cache(maxsize=1)
+def _font_file_index(signature):
+    """字体文件名（小写，不含扩展名）到路径的索引，字体目录不变时只扫描一次"""
+    index = {}
+    for d in _get_font_dirs():
+        for ext in ("*.ttf", "*.otf", "*.ttc"):
+            try:
+                for fp in d.rglob(ext):
+                    if fp.is_file():
+                        index.setdefault(fp.stem.lower(), str(fp))
+            except Exception:
+                continue
+    return index
+
+
+def resolve_font_file(font_name):
+    """
+    将字体名解析为字体文件路径：先按文件名和常见别名查找，再询问 fontconfig；找不到时返回 None
+    """
+    return _resolve_font_file(normalize_font_name(font_name), _font_dirs_signature())
+
+
+@lru_cache(maxsize=64)
+def _resolve_font_file(name, signature):
+    index = _font_file_index(signature)
+    key = name.lower()
+    for stem in [key, key.replace(" ", "")] + FONT_FILE_ALIASES.get(key, []):
+        if stem in index:
+            return index[stem]
+
+    if shutil.which("fc-match"):
+        try:
+            result = subprocess.run(["fc-match", "-f", "%{file}", name],
+                                    capture_output=True, text=True, timeout=10)
+            if result.returncode == 0 and os.path.isfile(result.stdout.strip()):
+                return result.stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+    return None
+
+
+@lru_cache(maxsize=1)
+def _available_encoders():
+    """本机 FFmpeg 支持的编码器名称（FFmpeg 不可用时为空）"""
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return frozenset()
+    names = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # 形如 " V....D libx264   libx264 H.264 / AVC ..."
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in "VAS":
+            names.add(parts[1])
+    return frozenset(names)
+
+
+def _link_font(src, dst):
+    """在最小字体目录中放置字体文件：优先符号链接，其次硬链接，最后复制"""
+    for link in (os.symlink, os.link):
+        try:
+            link(src, dst)
+            return
+        except (OSError, NotImplementedError):
+            continue
+    shutil.copy2(src, dst)
+
+
 class VideoBurnNode:
     """
     文本与视频烧录节点
@@ -266,6 +442,75 @@ class VideoBurnNode:
                     "default": "Arial",
                     "tooltip": "翻译字幕字体名称 (需要系统已安装)"
                 }),
+                # 输出设置
+                "output_mode": (OUTPUT_MODES, {
+                    "default": OUTPUT_MODE_BURN,
+                    "tooltip": "烧录: 字幕绘制进画面（需重编码）\n封装: 字幕作为可选字幕轨道写入容器，音视频直接复制，几秒完成"
+                }),
+                "burn_workers": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 64,
+                    "step": 1,
+                    "tooltip": "并行烧录/智能渲染的并发 FFmpeg 进程数 (0 表示按 CPU 核数自动选择)"
+                }),
+                "soft_container": (SOFT_CONTAINERS, {
+                    "default": "mkv",
+                    "tooltip": "软字幕封装容器: mkv 保留 ASS 样式，mp4 使用 mov_text（播放器兼容性更好）"
+                }),
+                "text_language": ("STRING", {
+                    "default": "und",
+                    "multiline": False,
+                    "tooltip": "原文字幕轨道语言 (如 en / zh / jpn，und 表示未指定)"
+                }),
+                "trans_language": ("STRING", {
+                    "default": "und",
+                    "multiline": False,
+                    "tooltip": "翻译字幕轨道语言 (如 zh-CN / en / chi，und 表示未指定)"
+                }),
+                # 编码设置
+                "encoder_profile": (PROFILE_NAMES, {
+                    "default": PROFILE_BALANCED,
+                    "tooltip": "编码配置: draft 最快 / balanced 均衡 / archival 高质量 / auto 使用本机校准结果 / custom 使用下方自定义参数"
+                }),
+                "custom_codec": (CUSTOM_CODECS, {
+                    "default": "libx264",
+                    "tooltip": "自定义配置的编码器"
+                }),
+                "custom_preset": (PRESETS, {
+                    "default": "medium",
+                    "tooltip": "自定义配置的编码速度预设"
+                }),
+                "custom_crf": ("INT", {
+                    "default": 23,
+                    "min": 0,
+                    "max": 51,
+                    "step": 1,
+                    "tooltip": "自定义配置的 CRF (越小质量越高)"
+                }),
+                "custom_bitrate": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "自定义配置的目标码率 (如 8M)，填写后代替 CRF"
+                }),
+                "custom_pix_fmt": (PIX_FMTS, {
+                    "default": "yuv420p",
+                    "tooltip": "自定义配置的像素格式"
+                }),
+                "encoder_threads": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 128,
+                    "step": 1,
+                    "tooltip": "编码线程数 (0 表示由 FFmpeg 自动选择，并行烧录时按分段平均分配)"
+                }),
+                "filter_threads": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 128,
+                    "step": 1,
+                    "tooltip": "字幕渲染滤镜线程数 (0 表示自动)"
+                }),
             },
         }
     
@@ -332,8 +577,8 @@ class VideoBurnNode:
     def _create_ass_file(self, subtitles, translated_subtitles, video_width, video_height,
                          text_size, text_color, text_pos_x, text_pos_y, text_outline_color, text_outline_width,
                          trans_size, trans_color, trans_pos_x, trans_pos_y, trans_outline_color, trans_outline_width,
-                         text_font_name, trans_font_name):
-        """创建 ASS 字幕文件"""
+                         text_font_name, trans_font_name, ass_path):
+        """创建 ASS 字幕文件（ass_path 位于任务工作区内，随工作区一起清理）"""
         
         # 计算Y位置 - Y值直接表示从视频底部算起的边距
         if text_pos_y == -1:
@@ -377,7 +622,7 @@ class VideoBurnNode:
             trans_margin_r = 10
         
         # ASS 文件头
-        ass_content = f"""[Script Info]
+        header = f"""[Script Info]
 Title: FasterWhisper Subtitles
 ScriptType: v4.00+
 PlayResX: {video_width}
@@ -422,57 +667,53 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
             "}"
         )
 
-        # 添加原文字幕（若有对应翻译，则合并为同一个 Dialogue，避免多行翻译与原文重叠）
-        for sub in subtitles:
-            trans_text_raw = None
-            idx = sub.get('index', None)
-            trans_sub = translated_by_index.pop(idx, None) if isinstance(idx, int) else None
-            if trans_sub is None:
-                start_key = (round(sub.get('start', 0.0), 3), round(sub.get('end', 0.0), 3))
-                trans_sub = translated_by_time.pop(start_key, None)
-            if trans_sub is not None:
-                trans_text_raw = trans_sub.get('text', '')
-
-            start_str = self._seconds_to_ass_time(sub['start'])
-            end_str = self._seconds_to_ass_time(sub['end'])
-            orig_text = sub['text'].replace('\n', '\\N')
-
-            if trans_text_raw:
-                trans_text = str(trans_text_raw).replace('\n', '\\N')
-
-                # 底部是哪一行由两者的 MarginV 决定（MarginV 更小更靠近底部）
-                if trans_margin_v < text_margin_v:
-                    style = "Translated"
-                    combined = f"{orig_tags}{orig_text}\\N{trans_tags}{trans_text}"
+        # 逐条写入文件，不在内存中拼接整个脚本
+        with open(ass_path, 'w', encoding='utf-8') as f:
+            f.write(header)
+            
+            # 添加原文字幕（若有对应翻译，则合并为同一个 Dialogue，避免多行翻译与原文重叠）
+            for sub in subtitles:
+                trans_text_raw = None
+                idx = sub.get('index', None)
+                trans_sub = translated_by_index.pop(idx, None) if isinstance(idx, int) else None
+                if trans_sub is None:
+                    start_key = (round(sub.get('start', 0.0), 3), round(sub.get('end', 0.0), 3))
+                    trans_sub = translated_by_time.pop(start_key, None)
+                if trans_sub is not None:
+                    trans_text_raw = trans_sub.get('text', '')
+
+                start_str = self._seconds_to_ass_time(sub['start'])
+                end_str = self._seconds_to_ass_time(sub['end'])
+                orig_text = sub['text'].replace('\n', '\\N')
+
+                if trans_text_raw:
+                    trans_text = str(trans_text_raw).replace('\n', '\\N')
+
+                    # 底部是哪一行由两者的 MarginV 决定（MarginV 更小更靠近底部）
+                    if trans_margin_v < text_margin_v:
+                        style = "Translated"
+                        combined = f"{orig_tags}{orig_text}\\N{trans_tags}{trans_text}"
+                    else:
+                        style = "Original"
+                        combined = f"{trans_tags}{trans_text}\\N{orig_tags}{orig_text}"
+
+                    f.write(f"Dialogue: 0,{start_str},{end_str},{style},,0,0,0,,{combined}\n")
                 else:
-                    style = "Original"
-                    combined = f"{trans_tags}{trans_text}\\N{orig_tags}{orig_text}"
+                    text = orig_text
+                    f.write(f"Dialogue: 0,{start_str},{end_str},Original,,0,0,0,,{text}\n")
 
-                ass_content += f"Dialogue: 0,{start_str},{end_str},{style},,0,0,0,,{combined}\n"
-            else:
-                text = orig_text
-                ass_content += f"Dialogue: 0,{start_str},{end_str},Original,,0,0,0,,{text}\n"
-
-        # 添加未匹配到原文的翻译字幕
-        for sub in translated_by_index.values():
-            start_str = self._seconds_to_ass_time(sub.get('start', 0.0))
-            end_str = self._seconds_to_ass_time(sub.get('end', 0.0))
-            text = str(sub.get('text', '')).replace('\n', '\\N')
-            ass_content += f"Dialogue: 1,{start_str},{end_str},Translated,,0,0,0,,{text}\n"
-
-        for sub in translated_by_time.values():
-            start_str = self._seconds_to_ass_time(sub.get('start', 0.0))
-            end_str = self._seconds_to_ass_time(sub.get('end', 0.0))
-            text = str(sub.get('text', '')).replace('\n', '\\N')
-            ass_content += f"Dialogue: 1,{start_str},{end_str},Translated,,0,0,0,,{text}\n"
-        
-        # 保存 ASS 文件
-        ass_dir = os.path.join(folder_paths.get_temp_directory(), "ass_subtitles")
-        os.makedirs(ass_dir, exist_ok=True)
-        ass_path = os.path.join(ass_dir, "subtitles.ass")
-        
-        with open(ass_path, 'w', encoding='utf-8') as f:
-            f.write(ass_content)
+            # 添加未匹配到原文的翻译字幕
+            for sub in translated_by_index.values():
+                start_str = self._seconds_to_ass_time(sub.get('start', 0.0))
+                end_str = self._seconds_to_ass_time(sub.get('end', 0.0))
+                text = str(sub.get('text', '')).replace('\n', '\\N')
+                f.write(f"Dialogue: 1,{start_str},{end_str},Translated,,0,0,0,,{text}\n")
+
+            for sub in translated_by_time.values():
+                start_str = self._seconds_to_ass_time(sub.get('start', 0.0))
+                end_str = self._seconds_to_ass_time(sub.get('end', 0.0))
+                text = str(sub.get('text', '')).replace('\n', '\\N')
+                f.write(f"Dialogue: 1,{start_str},{end_str},Translated,,0,0,0,,{text}\n")
         
         return ass_path
     
@@ -485,34 +726,32 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         return f"{hours}:{minutes:02d}:{secs:02d}.{centisecs:02d}"
     
     def _get_video_info(self, video_path):
-        """获取视频信息"""
+        """
+        获取视频显示尺寸（复用媒体探测缓存，探测失败时报错而不是猜测分辨率）
+        FFmpeg 滤镜收到的是自动旋转后的画面，ASS 画布和预览帧都按显示尺寸计算
+        """
         try:
-            import av
-            container = av.open(video_path)
-            video_stream = next((s for s in container.streams if s.type == 'video'), None)
-            if video_stream:
-                width = video_stream.width
-                height = video_stream.height
-                container.close()
-                return width, height
-        except:
-            pass
+            info = probe_media(video_path)
+        except MediaProbeError as e:
+            raise RuntimeError(f"无法获取视频分辨率: {e}")
         
-        # 默认值
-        return 1920, 1080
+        video = info.get("video")
+        if not video or not video.get("width") or not video.get("height"):
+            raise RuntimeError(f"文件中没有可用的视频流: {os.path.basename(video_path)}")
+        
+        return display_size(video)
     
-    def burn_subtitles(self, video_path, srt_text="", translated_srt="",
-                       text_size=24, text_color="white", text_position_x=-1, text_position_y=-1,
-                       text_outline_color="black", text_outline_width=2,
-                       trans_text_size=20, trans_text_color="yellow", trans_position_x=-1, trans_position_y=-2,
-                       trans_outline_color="black", trans_outline_width=2,
-                       text_font_name="Arial", trans_font_name="Arial"):
-        """
-        将字幕烧录到视频
+    def _prepare_subtitles(self, video_path, srt_text, translated_srt,
+                           text_size, text_color, text_position_x, text_position_y,
+                           text_outline_color, text_outline_width,
+                           trans_text_size, trans_text_color, trans_position_x, trans_position_y,
+                           trans_outline_color, trans_outline_width, text_font_name, trans_font_name):
         """
-        if not video_path or not os.path.exists(video_path):
-            raise FileNotFoundError(f"视频文件不存在: {video_path}")
+        解析字幕并整理 ASS 样式参数（完整烧录与样式预览共用）
         
+        Returns:
+            (原文字幕, 翻译字幕, 视频宽, 视频高, ASS 样式参数)；没有字幕时返回 None
+        """
         # 将颜色名称转换为十六进制
         text_color = COLOR_MAP.get(text_color, "#FFFFFF")
         text_outline_color = COLOR_MAP.get(text_outline_color, "#000000")
@@ -527,8 +766,7 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         translated_subtitles = self._parse_srt(translated_srt) if translated_srt else []
         
         if not subtitles and not translated_subtitles:
-            print("[FasterWhisper] 没有字幕需要烧录，返回原视频")
-            return (video_path,)
+            return None
         
         # 获取视频尺寸
         video_width, video_height = self._get_video_info(video_path)
@@ -537,89 +775,624 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         print(f"[FasterWhisper] 原文字幕: {len(subtitles)} 条")
         print(f"[FasterWhisper] 翻译字幕: {len(translated_subtitles)} 条")
         
-        # 创建 ASS 字幕文件
-        ass_path = self._create_ass_file(
-            subtitles, translated_subtitles, video_width, video_height,
+        ass_style = (
             text_size, text_color, text_position_x, text_position_y, text_outline_color, text_outline_width,
             trans_text_size, trans_text_color, trans_position_x, trans_position_y, trans_outline_color, trans_outline_width,
-            text_font_name, trans_font_name
+            text_font_name, trans_font_name,
         )
+        return subtitles, translated_subtitles, video_width, video_height, ass_style
+    
+    def burn_subtitles(self, video_path, srt_text="", translated_srt="",
+                       text_size=24, text_color="white", text_position_x=-1, text_position_y=-1,
+                       text_outline_color="black", text_outline_width=2,
+                       trans_text_size=20, trans_text_color="yellow", trans_position_x=-1, trans_position_y=-2,
+                       trans_outline_color="black", trans_outline_width=2,
+                       text_font_name="Arial", trans_font_name="Arial",
+                       output_mode=OUTPUT_MODE_BURN, burn_workers=0, soft_container="mkv",
+                       text_language="und", trans_language="und",
+                       encoder_profile=PROFILE_BALANCED, custom_codec="libx264", custom_preset="medium",
+                       custom_crf=23, custom_bitrate="", custom_pix_fmt="yuv420p",
+                       encoder_threads=0, filter_threads=0):
+        """
+        将字幕烧录到视频，或在封装模式下作为字幕轨道写入容器
+        """
+        if not video_path or not os.path.exists(video_path):
+            raise FileNotFoundError(f"视频文件不存在: {video_path}")
         
-        # 输出视频路径
-        output_dir = os.path.join(folder_paths.get_temp_directory(), "burned_videos")
-        os.makedirs(output_dir, exist_ok=True)
+        prepared = self._prepare_subtitles(
+            video_path, srt_text, translated_srt,
+            text_size, text_color, text_position_x, text_position_y, text_outline_color, text_outline_width,
+            trans_text_size, trans_text_color, trans_position_x, trans_position_y,
+            trans_outline_color, trans_outline_width, text_font_name, trans_font_name
+        )
+        if prepared is None:
+            print("[FasterWhisper] 没有字幕需要烧录，返回原视频")
+            return (video_path,)
+        subtitles, translated_subtitles, video_width, video_height, ass_style = prepared
         
-        video_name = os.path.splitext(os.path.basename(video_path))[0]
-        output_path = os.path.join(output_dir, f"{video_name}_burned.mp4")
+        profile = self._resolve_encoder_profile(
+            encoder_profile, custom_codec, custom_preset, custom_crf, custom_bitrate, custom_pix_fmt,
+            encoder_threads, filter_threads
+        )
         
-        # 使用 FFmpeg 烧录字幕
-        try:
-            import subprocess
+        # 每次执行使用独立工作区，并发任务的中间文件互不覆盖
+        with job_workspace("burn") as workspace:
+            if output_mode == OUTPUT_MODE_SOFT:
+                return self._mux_soft_subtitles(
+                    video_path, srt_text, translated_srt, subtitles, translated_subtitles,
+                    video_width, video_height, ass_style, soft_container, text_language, trans_language,
+                    workspace
+                )
+            
+            # 创建 ASS 字幕文件（完整字幕同时用于计算缓存键）
+            ass_path = self._create_ass_file(
+                subtitles, translated_subtitles, video_width, video_height, *ass_style,
+                ass_path=os.path.join(workspace, "subtitles.ass")
+            )
+            
+            # 相同视频、字幕、样式和编码参数的结果直接复用
+            with open(ass_path, 'rb') as f:
+                ass_bytes = f.read()
+            cache_key = compute_burn_key(
+                file_fingerprint(video_path), ass_bytes, self._encoder_args(profile),
+                self._font_set(text_font_name, trans_font_name), output_mode
+            )
+            video_name = os.path.splitext(os.path.basename(video_path))[0]
+            cached_path = get_cached_burn(cache_key, f"{video_name}_burned")
+            if cached_path:
+                print(f"[FasterWhisper] 命中烧录缓存: {cached_path}")
+                return (cached_path,)
             
-            # 构建 FFmpeg 命令
-            # Windows 路径需要转义
-            ass_path_escaped = _escape_ffmpeg_filter_path(ass_path)
+            fontsdir = self._job_fontsdir(workspace, text_font_name, trans_font_name)
+            
+            # 先输出到工作区，完成后原子移入缓存目录
+            output_path = os.path.join(workspace, f"{video_name}_burned.mp4")
+            
+            if output_mode == OUTPUT_MODE_PARALLEL:
+                result = self._burn_parallel(
+                    video_path, subtitles, translated_subtitles, video_width, video_height,
+                    ass_style, burn_workers, output_path, workspace, fontsdir, profile
+                )
+                if result is not None:
+                    return (store_burn(cache_key, result[0], f"{video_name}_burned"),)
+                print("[FasterWhisper] 视频较短或关键帧不足，分段不足两段，改用单进程烧录")
+            
+            if output_mode == OUTPUT_MODE_SMART:
+                result = self._burn_smart(
+                    video_path, subtitles, translated_subtitles, video_width, video_height,
+                    ass_style, burn_workers, output_path, workspace, fontsdir, profile
+                )
+                if result is not None:
+                    return (store_burn(cache_key, result[0], f"{video_name}_burned"),)
+                print("[FasterWhisper] 源视频不满足智能渲染条件，改用完整烧录")
+            
+            # 使用 FFmpeg 烧录字幕
+            try:
+                # 构建 FFmpeg 命令
+                cmd = [
+                    'ffmpeg', '-y',
+                    *build_filter_args(profile),
+                    '-i', video_path,
+                    '-vf', self._ass_filter(ass_path, fontsdir),
+                    '-c:a', 'copy',
+                    *self._encoder_args(profile),
+                    output_path
+                ]
+            
+                print(f"[FasterWhisper] 执行 FFmpeg 命令...")
+            
+                result = run_ffmpeg(cmd, duration=self._media_duration(video_path),
+                                    label="字幕烧录", check=False)
+            
+                if result.returncode != 0:
+                    print(f"[FasterWhisper] FFmpeg 错误: {result.stderr}")
+                    # 尝试使用 srt 滤镜
+                    return self._burn_with_srt_filter(video_path, srt_text, translated_srt, output_path,
+                                                      text_size, text_color, trans_text_size, trans_text_color,
+                                                      text_font_name, trans_font_name, workspace, profile)
+            
+                print(f"[FasterWhisper] 字幕烧录完成: {output_path}")
+                return (store_burn(cache_key, output_path, f"{video_name}_burned"),)
+            
+            except FileNotFoundError:
+                raise RuntimeError("FFmpeg 未安装或不在 PATH 中，请安装 FFmpeg")
+            except InterruptProcessingException:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"字幕烧录失败: {str(e)}")
+    
+    def _ass_filter(self, ass_path, fontsdir=None):
+        """
+        构建 ass 滤镜参数（Windows 路径需要转义）
+        fontsdir 为 None 时使用第一个系统字体目录，空字符串表示不指定（只用 fontconfig）
+        """
+        ass_path_escaped = _escape_ffmpeg_filter_path(ass_path)
+        if fontsdir is None:
             fontsdir = get_default_fontsdir()
-            fontsdir_escaped = _escape_ffmpeg_filter_path(fontsdir) if fontsdir else ""
+        fontsdir_escaped = _escape_ffmpeg_filter_path(fontsdir) if fontsdir else ""
+        return f"ass='{ass_path_escaped}'" + (f":fontsdir='{fontsdir_escaped}'" if fontsdir_escaped else "")
+    
+    def _job_fontsdir(self, workspace, *font_names):
+        """
+        在工作区中建立只包含本次用到的字体文件的最小字体目录（符号链接），
+        libass 启动时只加载这几个文件，与系统安装的字体数量无关。
+        字体都无法解析时返回空字符串，由 fontconfig 按名称查找
+        """
+        fontsdir = os.path.join(workspace, "fonts")
+        if os.path.isdir(fontsdir):
+            return fontsdir if os.listdir(fontsdir) else ""
+        os.makedirs(fontsdir, exist_ok=True)
+        
+        for font_name in sorted(set(normalize_font_name(name) for name in font_names)):
+            font_file = resolve_font_file(font_name)
+            if font_file is None:
+                print(f"[FasterWhisper] 未找到字体文件: {font_name}，交由 fontconfig 匹配")
+                continue
+            dst = os.path.join(fontsdir, os.path.basename(font_file))
+            if not os.path.exists(dst):
+                _link_font(font_file, dst)
+        return fontsdir if os.listdir(fontsdir) else ""
+    
+    def _font_set(self, *font_names):
+        """字体集合标识：使用的字体名及解析到的字体文件（大小和修改时间反映字体的更新）"""
+        fonts = []
+        for name in sorted(set(font_names)):
+            font_file = resolve_font_file(name)
+            try:
+                st = os.stat(font_file) if font_file else None
+            except OSError:
+                st = None
+            fonts.append([name, font_file, st.st_size if st else None, st.st_mtime_ns if st else None])
+        return fonts
+    
+    def _media_duration(self, video_path):
+        """视频时长（秒），用于进度显示；无法探测时返回 None"""
+        try:
+            return probe_media(video_path).get("duration")
+        except MediaProbeError:
+            return None
+    
+    def _resolve_encoder_profile(self, encoder_profile, custom_codec, custom_preset, custom_crf,
+                                 custom_bitrate, custom_pix_fmt, encoder_threads, filter_threads):
+        """将节点上的编码设置解析为编码配置（线程设置对所有配置生效）"""
+        custom = {
+            "codec": custom_codec, "preset": custom_preset, "crf": custom_crf,
+            "bitrate": custom_bitrate.strip(), "pix_fmt": custom_pix_fmt,
+        } if encoder_profile == PROFILE_CUSTOM else {}
+        profile = resolve_profile(encoder_profile, custom)
+        if encoder_threads:
+            profile["threads"] = encoder_threads
+        if filter_threads:
+            profile["filter_threads"] = filter_threads
+        return profile
+    
+    def _encoder_args(self, profile, include_threads=True):
+        """视频编码参数（由编码配置生成）"""
+        return build_encoder_args(profile, include_threads=include_threads)
+    
+    def _shift_subtitles(self, subtitles, start, end):
+        """截取与 [start, end) 相交的字幕并平移到以 start 为零点的时间轴（保留序号用于原文/翻译匹配）"""
+        shifted = []
+        for sub in subtitles:
+            if sub['end'] <= start or sub['start'] >= end:
+                continue
+            shifted.append({
+                'index': sub.get('index'),
+                'start': round(max(sub['start'], start) - start, 3),
+                'end': round(min(sub['end'], end) - start, 3),
+                'text': sub['text'],
+            })
+        return shifted
+    
+    def _split_at_keyframes(self, keyframes, duration, segments, min_length=0.0):
+        """
+        在关键帧处把视频切成时长尽量均匀的若干段，返回 [(start, end), ...]
+        关键帧稀疏时宁可少分几段，也不切出短于 min_length 的分段
+        """
+        points = [0.0]
+        for k in range(1, segments):
+            target = duration * k / segments
+            candidates = [t for t in keyframes
+                          if points[-1] + min_length <= t <= duration - min_length and t > points[-1]]
+            if not candidates:
+                break
+            point = min(candidates, key=lambda t: abs(t - target))
+            points.append(point)
+        points.append(duration)
+        return [(points[i], points[i + 1]) for i in range(len(points) - 1)]
+    
+    def _burn_parallel(self, video_path, subtitles, translated_subtitles, video_width, video_height,
+                       ass_style, workers, output_path, workspace, fontsdir, profile):
+        """
+        按关键帧把视频切成 GOP 对齐的若干段，并发运行多个 FFmpeg 分别烧录（各段 ASS 时间轴平移到段起点），
+        最后用 concat 分离器无重编码拼接并复制原音轨。分段不足两段时返回 None
+        """
+        info = probe_media(video_path)
+        keyframes = info.get("keyframes") or []
+        duration = info.get("duration")
+        cpu_count = os.cpu_count() or 1
+        if not duration or len(keyframes) < 2:
+            return None
+        # 分段数同时受并发数和视频时长限制，短视频不值得拆分
+        segments = min(self._auto_workers(workers), int(duration // MIN_PARALLEL_SEGMENT_SECONDS))
+        if segments < 2:
+            return None
+        
+        ranges = self._split_at_keyframes(keyframes, duration, segments, MIN_PARALLEL_SEGMENT_SECONDS)
+        if len(ranges) < 2:
+            return None
+        
+        fps = (info.get("video") or {}).get("fps") or 25.0
+        # 分段边界提前半帧，保证关键帧那一帧只落在后一段
+        half_frame = 0.5 / fps
+        # 配置未指定线程数时按分段平均分配 CPU
+        threads = profile.get("threads") or max(1, cpu_count // len(ranges))
+        
+        segment_dir = os.path.join(workspace, "parallel")
+        os.makedirs(segment_dir, exist_ok=True)
+        
+        print(f"[FasterWhisper] 并行烧录: {len(ranges)} 段, 每段 {threads} 线程")
+        progress = ProgressGroup(duration)
+        
+        def burn_segment(i):
+            start, end = ranges[i]
+            seek = max(0.0, start - half_frame) if i > 0 else 0.0
+            stop = end - half_frame if i < len(ranges) - 1 else end
+            ass_path = self._create_ass_file(
+                self._shift_subtitles(subtitles, seek, stop),
+                self._shift_subtitles(translated_subtitles, seek, stop),
+                video_width, video_height, *ass_style,
+                ass_path=os.path.join(segment_dir, f"segment_{i:03d}.ass")
+            )
+            segment_path = os.path.join(segment_dir, f"segment_{i:03d}.mp4")
+            cmd = [
+                'ffmpeg', '-y',
+                *build_filter_args(profile),
+                '-ss', f"{seek:.6f}",
+                '-i', video_path,
+                '-t', f"{stop - seek:.6f}",
+                '-map', '0:v:0', '-an',
+                '-vf', self._ass_filter(ass_path, fontsdir),
+                *self._encoder_args(profile, include_threads=False),
+                '-threads', str(threads),
+                segment_path
+            ]
+            result = run_ffmpeg(cmd, duration=stop - seek, label=f"分段 {i}",
+                                progress=progress.callback(i), check=False)
+            if result.returncode != 0:
+                raise RuntimeError(f"分段 {i} 烧录失败: {result.stderr[-2000:]}")
+            return segment_path
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                segment_paths = list(executor.map(burn_segment, range(len(ranges))))
+            
+            list_path = os.path.join(segment_dir, "segments.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for path in segment_paths:
+                    escaped = path.replace('\\', '/').replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
             
             cmd = [
                 'ffmpeg', '-y',
+                '-f', 'concat', '-safe', '0', '-i', list_path,
                 '-i', video_path,
-                '-vf', f"ass='{ass_path_escaped}'" + (f":fontsdir='{fontsdir_escaped}'" if fontsdir_escaped else ""),
-                '-c:a', 'copy',
-                '-c:v', 'libx264',
-                '-preset', 'medium',
-                '-crf', '23',
+                '-map', '0:v', '-map', '1:a?',
+                '-c', 'copy',
+                '-movflags', '+faststart',
                 output_path
             ]
+            result = run_ffmpeg(cmd, duration=duration, label="分段拼接", progress=False, check=False)
+            if result.returncode != 0:
+                raise RuntimeError(f"分段拼接失败: {result.stderr[-2000:]}")
+        except FileNotFoundError:
+            raise RuntimeError("FFmpeg 未安装或不在 PATH 中，请安装 FFmpeg")
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+        
+        print(f"[FasterWhisper] 并行烧录完成: {output_path}")
+        return (output_path,)
+    
+    def _auto_workers(self, workers):
+        """0 表示按 CPU 核数自动选择并发进程数"""
+        if workers > 0:
+            return workers
+        return max(2, min(16, (os.cpu_count() or 1) // 4))
+    
+    def _matching_encoder_args(self, video_info, profile):
+        """
+        按源视频的编码参数生成重编码参数，使重编码片段能与直接复制的片段无缝拼接：
+        编码器、像素格式、档次与级别、色彩参数、采样宽高比、时间基、参考帧数和 B 帧
+        （速度预设和线程数取自编码配置，质量固定为视觉无损的 CRF）
+        
+        Returns:
+            (编码参数, 附加滤镜列表)；本机缺少对应编码器或源参数无法复现时返回 None
+        """
+        encoder, _ = SMART_RENDER_CODECS[video_info["codec"]]
+        if encoder not in _available_encoders():
+            print(f"[FasterWhisper] FFmpeg 不支持 {encoder} 编码器，无法智能渲染")
+            return None
+        pix_fmt = video_info.get("pix_fmt")
+        if not pix_fmt:
+            print("[FasterWhisper] 无法确定源视频的像素格式，无法智能渲染")
+            return None
+        
+        source_profile = str(video_info.get("profile") or "").lower()
+        codec_profile = ""
+        if source_profile and encoder == "libx264":
+            codec_profile = next((value for name, value in H264_PROFILES
+                                  if source_profile.startswith(name) or source_profile.endswith(name)), None)
+        elif source_profile:
+            codec_profile = HEVC_PROFILES.get(source_profile)
+        if codec_profile is None:
+            print(f"[FasterWhisper] 编码器无法复现源视频档次 {video_info.get('profile')}，无法智能渲染")
+            return None
+        
+        profile = dict(profile, pix_fmt=pix_fmt, bitrate="", crf=SMART_RENDER_CRF[encoder])
+        args = build_encoder_args(profile, codec=encoder)
+        if codec_profile:
+            args += ['-profile:v', codec_profile]
+        
+        params = []
+        level = video_info.get("level")
+        if level:
+            # H.264 的 level 为 10 倍（41 即 4.1，9 为 1b），HEVC 为 30 倍（123 即 4.1）
+            if encoder == "libx264":
+                args += ['-level:v', "1b" if level == 9 else f"{level / 10:g}"]
+            else:
+                params.append(f"level-idc={level / 30:g}")
+        if video_info.get("refs"):
+            params.append(f"ref={min(int(video_info['refs']), 16)}")
+        if video_info.get("has_b_frames") is not None and not video_info["has_b_frames"]:
+            params.append("bframes=0")
+        if params:
+            args += [f'-{encoder[3:]}-params', ":".join(params)]
+        
+        for option, key in (('-color_primaries', "color_primaries"), ('-color_trc', "color_trc"),
+                            ('-colorspace', "colorspace"), ('-color_range', "color_range")):
+            if video_info.get(key) is not None:
+                args += [option, str(video_info[key])]
+        if video_info.get("time_base"):
+            args += ['-enc_time_base', str(video_info["time_base"])]
+        
+        filters = []
+        if video_info.get("sar"):
+            filters.append(f"setsar={video_info['sar'].replace(':', '/')}")
+        return args, filters
+    
+    def _burn_smart(self, video_path, subtitles, translated_subtitles, video_width, video_height,
+                    ass_style, workers, output_path, workspace, fontsdir, profile):
+        """
+        智能渲染：用 IDR 关键帧把视频切成封闭 GOP，只重编码与字幕时间段相交的 GOP，
+        其余 GOP 直接复制，最后无重编码拼接。
+        源编码不支持、没有 IDR 索引、本机缺少对应编码器或编码参数无法复现时返回 None（改用完整烧录）
+        """
+        info = probe_media(video_path)
+        video_info = info.get("video") or {}
+        keyframes = info.get("keyframes") or []
+        duration = info.get("duration")
+        if video_info.get("codec") not in SMART_RENDER_CODECS or not duration or not keyframes:
+            return None
+        # 重编码片段已被自动旋转，直接复制的片段仍靠旋转元数据显示，两者无法拼接
+        if video_info.get("rotation", 0):
+            return None
+        # 只有 IDR 才是安全的切点：CRA/恢复点 I 帧之后的帧可能引用前一个 GOP
+        idr_keyframes = info.get("idr_keyframes")
+        if not idr_keyframes:
+            print("[FasterWhisper] 没有 IDR 关键帧索引（开放 GOP 或探测信息不全），无法智能渲染")
+            return None
+        matched = self._matching_encoder_args(video_info, profile)
+        if matched is None:
+            return None
+        encoder_args, source_filters = matched
+        _, bsf = SMART_RENDER_CODECS[video_info["codec"]]
+        
+        # 文件开头即使不是 IDR 也可以作为切点（之前没有可引用的帧）
+        cut_points = sorted(set([keyframes[0]] + [t for t in idr_keyframes if t > keyframes[0]]))
+        # 每个封闭 GOP 的帧数：合并其中各关键帧 GOP 的帧数
+        gop_frames = [0] * len(cut_points)
+        for t, count in zip(keyframes, info.get("gop_frame_counts") or []):
+            gop_frames[max(0, bisect.bisect_right(cut_points, t) - 1)] += count
+        keyframes = cut_points
+        
+        # 标记与字幕事件相交的 GOP
+        gop_ends = keyframes[1:] + [duration]
+        dirty = [False] * len(keyframes)
+        for sub in subtitles + translated_subtitles:
+            first = max(0, bisect.bisect_right(keyframes, sub['start']) - 1)
+            last = max(0, bisect.bisect_left(keyframes, sub['end']) - 1)
+            for i in range(first, min(last, len(dirty) - 1) + 1):
+                if sub['start'] < gop_ends[i] and sub['end'] > keyframes[i]:
+                    dirty[i] = True
+        
+        # 合并相邻同类 GOP: [start, end, 是否重编码, 帧数]
+        runs = []
+        for i, is_dirty in enumerate(dirty):
+            frames = gop_frames[i] if i < len(gop_frames) else 0
+            if runs and runs[-1][2] == is_dirty:
+                runs[-1][1] = gop_ends[i]
+                runs[-1][3] += frames
+            else:
+                runs.append([keyframes[i], gop_ends[i], is_dirty, frames])
+        
+        total_frames = sum(gop_frames) or 1
+        dirty_frames = sum(r[3] for r in runs if r[2])
+        fps = video_info.get("fps") or 25.0
+        half_frame = 0.5 / fps
+        
+        work_dir = os.path.join(workspace, "smart")
+        os.makedirs(work_dir, exist_ok=True)
+        
+        print(f"[FasterWhisper] 智能渲染: {len(runs)} 段, 其中 {sum(1 for r in runs if r[2])} 段需要重编码")
+        progress = ProgressGroup(sum(r[1] - r[0] for r in runs if r[2]))
+        
+        try:
+            # 1. 一次性在所有分段边界处无重编码切分（边界提前半帧，确保切在目标关键帧上）
+            boundaries = ",".join(f"{max(0.0, r[0] - half_frame):.6f}" for r in runs[1:])
+            cmd = [
+                'ffmpeg', '-y', '-i', video_path,
+                '-map', '0:v:0', '-an', '-c:v', 'copy', '-bsf:v', bsf,
+                '-f', 'segment', '-segment_format', 'mpegts',
+                '-reset_timestamps', '1',
+            ]
+            if boundaries:
+                cmd += ['-segment_times', boundaries]
+            cmd.append(os.path.join(work_dir, "copy_%05d.ts"))
+            result = run_ffmpeg(cmd, duration=duration, label="无重编码切分", progress=False, check=False)
+            if result.returncode != 0:
+                raise RuntimeError(f"无重编码切分失败: {result.stderr[-2000:]}")
             
-            print(f"[FasterWhisper] 执行 FFmpeg 命令...")
+            copied = sorted(f for f in os.listdir(work_dir) if f.startswith("copy_"))
+            if len(copied) != len(runs):
+                print(f"[FasterWhisper] 切分结果与关键帧索引不一致 ({len(copied)}/{len(runs)})")
+                return None
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1小时超时
-            )
+            # 2. 并发重编码含字幕的分段
+            def encode_run(i):
+                start, end, _, _ = runs[i]
+                seek = max(0.0, start - half_frame) if i > 0 else 0.0
+                stop = end - half_frame if i < len(runs) - 1 else end
+                ass_path = self._create_ass_file(
+                    self._shift_subtitles(subtitles, seek, stop),
+                    self._shift_subtitles(translated_subtitles, seek, stop),
+                    video_width, video_height, *ass_style,
+                    ass_path=os.path.join(work_dir, f"render_{i:05d}.ass")
+                )
+                render_path = os.path.join(work_dir, f"render_{i:05d}.ts")
+                cmd = [
+                    'ffmpeg', '-y',
+                    *build_filter_args(profile),
+                    '-ss', f"{seek:.6f}",
+                    '-i', video_path,
+                    '-t', f"{stop - seek:.6f}",
+                    '-map', '0:v:0', '-an',
+                    '-vf', ",".join([self._ass_filter(ass_path, fontsdir), *source_filters]),
+                    *encoder_args,
+                    '-bsf:v', bsf,
+                    '-f', 'mpegts',
+                    render_path
+                ]
+                result = run_ffmpeg(cmd, duration=stop - seek, label=f"分段 {i}",
+                                    progress=progress.callback(i), check=False)
+                if result.returncode != 0:
+                    raise RuntimeError(f"分段 {i} 重编码失败: {result.stderr[-2000:]}")
+                return i, render_path
             
-            if result.returncode != 0:
-                print(f"[FasterWhisper] FFmpeg 错误: {result.stderr}")
-                # 尝试使用 srt 滤镜
-                return self._burn_with_srt_filter(video_path, srt_text, translated_srt, output_path,
-                                                  text_size, text_color, trans_text_size, trans_text_color,
-                                                  text_font_name, trans_font_name)
+            segment_paths = [os.path.join(work_dir, f) for f in copied]
+            dirty_indices = [i for i, r in enumerate(runs) if r[2]]
+            with ThreadPoolExecutor(max_workers=max(1, self._auto_workers(workers))) as executor:
+                for i, render_path in executor.map(encode_run, dirty_indices):
+                    segment_paths[i] = render_path
             
-            print(f"[FasterWhisper] 字幕烧录完成: {output_path}")
-            return (output_path,)
+            # 3. 拼接并复制原音轨
+            list_path = os.path.join(work_dir, "segments.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for path in segment_paths:
+                    escaped = path.replace('\\', '/').replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
             
+            cmd = [
+                'ffmpeg', '-y',
+                '-f', 'concat', '-safe', '0', '-i', list_path,
+                '-i', video_path,
+                '-map', '0:v', '-map', '1:a?',
+                '-c', 'copy',
+                '-movflags', '+faststart',
+                output_path
+            ]
+            result = run_ffmpeg(cmd, duration=duration, label="分段拼接", progress=False, check=False)
+            if result.returncode != 0:
+                raise RuntimeError(f"分段拼接失败: {result.stderr[-2000:]}")
         except FileNotFoundError:
             raise RuntimeError("FFmpeg 未安装或不在 PATH 中，请安装 FFmpeg")
-        except subprocess.TimeoutExpired:
-            raise RuntimeError("FFmpeg 处理超时")
-        except Exception as e:
-            raise RuntimeError(f"字幕烧录失败: {str(e)}")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        print(f"[FasterWhisper] 智能渲染完成: {output_path} "
+              f"(重编码帧比例 {dirty_frames * 100.0 / total_frames:.1f}%, {dirty_frames}/{total_frames})")
+        return (output_path,)
     
-    def _burn_with_srt_filter(self, video_path, srt_text, translated_srt, output_path,
-                               text_size, text_color, trans_size, trans_color,
-                               text_font_name="Arial", trans_font_name="Arial"):
-        """使用 SRT 滤镜作为备选方案"""
-        import subprocess
+    def _mux_soft_subtitles(self, video_path, srt_text, translated_srt, subtitles, translated_subtitles,
+                            video_width, video_height, ass_style, container, text_language, trans_language,
+                            workspace):
+        """
+        将原文和翻译作为独立的带语言标签的字幕轨道封装进容器
+        音视频流直接复制（-c copy），耗时与视频长度基本无关
+        """
+        container = container if container in SOFT_CONTAINERS else "mkv"
+        sub_dir = workspace
         
-        # 保存 SRT 文件
-        srt_dir = os.path.join(folder_paths.get_temp_directory(), "srt_subtitles")
-        os.makedirs(srt_dir, exist_ok=True)
+        # (字幕文件, 语言标签, 轨道标题)
+        tracks = []
+        if subtitles:
+            if container == "mkv":
+                path = self._create_ass_file(subtitles, [], video_width, video_height, *ass_style,
+                                             ass_path=os.path.join(sub_dir, "original.ass"))
+            else:
+                path = os.path.join(sub_dir, "original.srt")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(srt_text)
+            tracks.append((path, normalize_language_tag(text_language), "原文"))
+        if translated_subtitles:
+            if container == "mkv":
+                path = self._create_ass_file([], translated_subtitles, video_width, video_height, *ass_style,
+                                             ass_path=os.path.join(sub_dir, "translated.ass"))
+            else:
+                path = os.path.join(sub_dir, "translated.srt")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(translated_srt)
+            tracks.append((path, normalize_language_tag(trans_language), "翻译"))
         
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        output_path = os.path.join(workspace, f"{video_name}_subs.{container}")
+        
+        cmd = ['ffmpeg', '-y', '-i', video_path]
+        for path, _, _ in tracks:
+            cmd += ['-i', path]
+        cmd += ['-map', '0:v', '-map', '0:a?']
+        for i in range(len(tracks)):
+            cmd += ['-map', f'{i + 1}:0']
+        cmd += ['-c:v', 'copy', '-c:a', 'copy', '-c:s', 'ass' if container == "mkv" else 'mov_text']
+        for i, (_, language, title) in enumerate(tracks):
+            cmd += [
+                f'-metadata:s:s:{i}', f'language={language}',
+                f'-metadata:s:s:{i}', f'title={title}',
+                f'-disposition:s:{i}', 'default' if i == 0 else '0',
+            ]
+        cmd.append(output_path)
+        
+        print(f"[FasterWhisper] 封装软字幕: {len(tracks)} 条字幕轨道 -> {container}")
+        
+        try:
+            result = run_ffmpeg(cmd, duration=self._media_duration(video_path),
+                                label="软字幕封装", check=False)
+        except FileNotFoundError:
+            raise RuntimeError("FFmpeg 未安装或不在 PATH 中，请安装 FFmpeg")
+        
+        if result.returncode != 0:
+            hint = "（源视频编码可能不兼容 MP4，可改用 mkv 容器）" if container == "mp4" else ""
+            raise RuntimeError(f"软字幕封装失败{hint}: {result.stderr[-2000:]}")
+        
+        final_path = finalize_output(output_path, temp_output_path("burned_videos", f"{video_name}_subs", container))
+        print(f"[FasterWhisper] 软字幕封装完成: {final_path}")
+        return (final_path,)
+    
+    def _burn_with_srt_filter(self, video_path, srt_text, translated_srt, output_path,
+                               text_size, text_color, trans_size, trans_color,
+                               text_font_name, trans_font_name, workspace, profile=None):
+        """使用 SRT 滤镜作为备选方案（输出不进入烧录缓存）"""
+        # SRT 文件保存在任务工作区
         filters = []
         
         if srt_text:
-            srt_path = os.path.join(srt_dir, "original.srt")
+            srt_path = os.path.join(workspace, "original.srt")
             with open(srt_path, 'w', encoding='utf-8') as f:
                 f.write(srt_text)
             srt_path_escaped = srt_path.replace('\\', '/').replace(':', '\\:')
             filters.append(f"subtitles='{srt_path_escaped}':force_style='FontName={text_font_name},FontSize={text_size},PrimaryColour={self._hex_to_ffmpeg_color(text_color)}'")
         
         if translated_srt:
-            trans_srt_path = os.path.join(srt_dir, "translated.srt")
+            trans_srt_path = os.path.join(workspace, "translated.srt")
             with open(trans_srt_path, 'w', encoding='utf-8') as f:
                 f.write(translated_srt)
             trans_path_escaped = trans_srt_path.replace('\\', '/').replace(':', '\\:')
@@ -635,18 +1408,19 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
             '-i', video_path,
             '-vf', filter_str,
             '-c:a', 'copy',
-            '-c:v', 'libx264',
-            '-preset', 'medium',
-            '-crf', '23',
+            *self._encoder_args(profile or resolve_profile(PROFILE_BALANCED)),
             output_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
+        result = run_ffmpeg(cmd, duration=self._media_duration(video_path),
+                            label="SRT 滤镜烧录", check=False)
         
         if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg 烧录失败: {result.stderr}")
+            raise RuntimeError(f"FFmpeg 烧录失败: {result.stderr[-2000:]}")
         
-        return (output_path,)
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        final_path = finalize_output(output_path, temp_output_path("burned_videos", f"{video_name}_burned", "mp4"))
+        return (final_path,)
     
     def _hex_to_ffmpeg_color(self, hex_color):
         """将十六进制颜色转换为 FFmpeg 格式"""
@@ -0,0 +1,215 @@
+"""
+多版本烧录节点 - 一次解码同时输出多个字幕版本和分辨率
+用 FFmpeg split 滤镜图把解码后的画面分给各字幕版本的 ASS 叠加和缩放，
+所有输出在同一个进程中编码，总耗时约为一次解码加 N 次编码
+"""
+
+import os
+
+from .video_burn import VideoBurnNode
+from ..utils.media_probe import file_fingerprint
+from ..utils.ffmpeg_runner import run_ffmpeg
+from ..utils.workspace import job_workspace
+from ..utils.burn_cache import compute_burn_key, get_cached_burn, store_burn
+from ..utils.encoder_profiles import PROFILE_BALANCED, build_filter_args
+
+# 多版本输出不需要的单输出设置
+MULTI_EXCLUDED_INPUTS = {"output_mode", "burn_workers", "soft_container", "text_language", "trans_language"}
+
+VARIANT_ORIGINAL = "original"
+VARIANT_BILINGUAL = "bilingual"
+VARIANT_TRANSLATED = "translated"
+
+
+class VideoBurnMultiNode(VideoBurnNode):
+    """
+    多版本烧录节点
+    - 可同时输出仅原文、双语、仅翻译三个字幕版本
+    - 每个版本可输出多个分辨率（如 1080,720）
+    - 源视频只解码一次
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = VideoBurnNode.INPUT_TYPES()
+        optional = {k: v for k, v in inputs["optional"].items() if k not in MULTI_EXCLUDED_INPUTS}
+        optional.update({
+            "variant_original": ("BOOLEAN", {
+                "default": False,
+                "tooltip": "输出仅原文字幕版本"
+            }),
+            "variant_bilingual": ("BOOLEAN", {
+                "default": True,
+                "tooltip": "输出双语字幕版本"
+            }),
+            "variant_translated": ("BOOLEAN", {
+                "default": False,
+                "tooltip": "输出仅翻译字幕版本"
+            }),
+            "resolutions": ("STRING", {
+                "default": "0",
+                "multiline": False,
+                "tooltip": "输出高度列表，逗号分隔 (如 1080,720)，0 表示保持原分辨率；不会放大"
+            }),
+        })
+        return {"required": inputs["required"], "optional": optional}
+
+    RETURN_TYPES = ("BURNED_VIDEO_PATH", "STRING")
+    RETURN_NAMES = ("首个输出", "全部输出")
+    FUNCTION = "burn_multi"
+    CATEGORY = "FasterWhisper/视频"
+
+    def _parse_resolutions(self, resolutions, source_height):
+        """解析输出高度列表；不放大，重复项合并，0 表示原分辨率"""
+        heights = []
+        for part in str(resolutions).replace("，", ",").split(","):
+            part = part.strip().lower().rstrip("p")
+            if not part:
+                continue
+            if not part.isdigit():
+                raise ValueError(f"分辨率无效: {part}")
+            height = int(part)
+            if height <= 0 or height >= source_height:
+                height = source_height
+            # 编码器要求偶数高度
+            height -= height % 2
+            if height not in heights:
+                heights.append(height)
+        return heights or [source_height]
+
+    def _build_filter_graph(self, variants, source_height, fontsdir):
+        """
+        构建 split 滤镜图：解码画面分给各字幕版本，叠加 ASS 后再分给各分辨率缩放
+
+        Args:
+            variants: [(版本名, ASS 路径, 输出高度列表), ...]
+            fontsdir: 本次任务的最小字体目录
+
+        Returns:
+            (滤镜图字符串, [(版本名, 高度, 输出标签), ...])
+        """
+        chains = []
+        outputs = []
+        if len(variants) > 1:
+            chains.append(f"[0:v]split={len(variants)}" + "".join(f"[v{i}]" for i in range(len(variants))))
+        for i, (name, ass_path, heights) in enumerate(variants):
+            source = f"[v{i}]" if len(variants) > 1 else "[0:v]"
+            labels = [f"[o{i}_{j}]" for j in range(len(heights))]
+            if len(heights) > 1:
+                chains.append(f"{source}{self._ass_filter(ass_path, fontsdir)},split={len(heights)}"
+                              + "".join(f"[s{i}_{j}]" for j in range(len(heights))))
+                for j, height in enumerate(heights):
+                    scaler = "null" if height == source_height else f"scale=-2:{height}"
+                    chains.append(f"[s{i}_{j}]{scaler}{labels[j]}")
+            else:
+                scaler = "" if heights[0] == source_height else f",scale=-2:{heights[0]}"
+                chains.append(f"{source}{self._ass_filter(ass_path, fontsdir)}{scaler}{labels[0]}")
+            for j, height in enumerate(heights):
+                outputs.append((name, height, labels[j]))
+        return ";".join(chains), outputs
+
+    def burn_multi(self, video_path, srt_text="", translated_srt="",
+                   text_size=24, text_color="white", text_position_x=-1, text_position_y=-1,
+                   text_outline_color="black", text_outline_width=2,
+                   trans_text_size=20, trans_text_color="yellow", trans_position_x=-1, trans_position_y=-2,
+                   trans_outline_color="black", trans_outline_width=2,
+                   text_font_name="Arial", trans_font_name="Arial",
+                   encoder_profile=PROFILE_BALANCED, custom_codec="libx264", custom_preset="medium",
+                   custom_crf=23, custom_bitrate="", custom_pix_fmt="yuv420p",
+                   encoder_threads=0, filter_threads=0,
+                   variant_original=False, variant_bilingual=True, variant_translated=False,
+                   resolutions="0"):
+        """
+        一次解码输出多个字幕版本和分辨率
+        """
+        if not video_path or not os.path.exists(video_path):
+            raise FileNotFoundError(f"视频文件不存在: {video_path}")
+
+        prepared = self._prepare_subtitles(
+            video_path, srt_text, translated_srt,
+            text_size, text_color, text_position_x, text_position_y, text_outline_color, text_outline_width,
+            trans_text_size, trans_text_color, trans_position_x, trans_position_y,
+            trans_outline_color, trans_outline_width, text_font_name, trans_font_name
+        )
+        if prepared is None:
+            print("[FasterWhisper] 没有字幕需要烧录，返回原视频")
+            return (video_path, video_path)
+        subtitles, translated_subtitles, video_width, video_height, ass_style = prepared
+
+        # 各版本使用的字幕；缺少所需字幕的版本跳过
+        requested = []
+        if variant_original and subtitles:
+            requested.append((VARIANT_ORIGINAL, subtitles, []))
+        if variant_bilingual and subtitles and translated_subtitles:
+            requested.append((VARIANT_BILINGUAL, subtitles, translated_subtitles))
+        if variant_translated and translated_subtitles:
+            requested.append((VARIANT_TRANSLATED, [], translated_subtitles))
+        if not requested:
+            raise ValueError("没有可输出的字幕版本，请检查版本开关和字幕输入")
+
+        heights = self._parse_resolutions(resolutions, video_height)
+
+        profile = self._resolve_encoder_profile(
+            encoder_profile, custom_codec, custom_preset, custom_crf, custom_bitrate, custom_pix_fmt,
+            encoder_threads, filter_threads
+        )
+        encoder_args = self._encoder_args(profile)
+
+        fingerprint = file_fingerprint(video_path)
+        font_set = self._font_set(text_font_name, trans_font_name)
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+
+        with job_workspace("burn_multi") as workspace:
+            results = {}
+            pending_variants = []
+            pending_keys = {}
+            for name, original, translated in requested:
+                ass_path = self._create_ass_file(
+                    original, translated, video_width, video_height, *ass_style,
+                    ass_path=os.path.join(workspace, f"{name}.ass")
+                )
+                with open(ass_path, 'rb') as f:
+                    ass_bytes = f.read()
+
+                missing = []
+                for height in heights:
+                    key = compute_burn_key(fingerprint, ass_bytes, encoder_args, font_set, f"multi:{height}")
+                    cached_path = get_cached_burn(key, f"{video_name}_{name}_{height}p")
+                    if cached_path:
+                        results[(name, height)] = cached_path
+                    else:
+                        pending_keys[(name, height)] = key
+                        missing.append(height)
+                if missing:
+                    pending_variants.append((name, ass_path, missing))
+
+            if pending_variants:
+                # 只输出未命中缓存的版本与分辨率组合
+                fontsdir = self._job_fontsdir(workspace, text_font_name, trans_font_name)
+                filter_graph, outputs = self._build_filter_graph(pending_variants, video_height, fontsdir)
+
+                cmd = ['ffmpeg', '-y', *build_filter_args(profile), '-i', video_path,
+                       '-filter_complex', filter_graph]
+                rendered = []
+                for name, height, label in outputs:
+                    output_path = os.path.join(workspace, f"{video_name}_{name}_{height}p.mp4")
+                    cmd += ['-map', label, '-map', '0:a?', '-c:a', 'copy', *encoder_args, output_path]
+                    rendered.append((name, height, output_path))
+
+                print(f"[FasterWhisper] 多版本烧录: {len(pending_variants)} 个字幕版本, "
+                      f"{len(outputs)} 个输出，单次解码")
+                try:
+                    run_ffmpeg(cmd, duration=self._media_duration(video_path), label="多版本烧录")
+                except FileNotFoundError:
+                    raise RuntimeError("FFmpeg 未安装或不在 PATH 中，请安装 FFmpeg")
+
+                for name, height, output_path in rendered:
+                    results[(name, height)] = store_burn(pending_keys[(name, height)], output_path,
+                                                         f"{video_name}_{name}_{height}p")
+            else:
+                print("[FasterWhisper] 所有版本均命中烧录缓存")
+
+        paths = [results[(name, height)] for name, _, _ in requested for height in heights]
+        for (name, height), path in sorted(results.items()):
+            print(f"[FasterWhisper] {name} {height}p: {path}")
+        return (paths[0], "\n".join(paths))
@@ -4,22 +4,55 @@ ComfyUI-FasterWhisper 服务器 API 扩展
 """
 
 import os
+import re
+import json
+import time
 import shutil
+import asyncio
+import hashlib
 import folder_paths
 from aiohttp import web
+from .utils.media_preview import get_preview_paths, get_preview_status, schedule_preview, mark_preview_used
+from .utils.waveform import get_waveform_path, get_waveform_status, schedule_waveform
+from .utils.cache_quota import touch
+from .utils.media_store import ingest_file, remove_name
+from .utils.encoder_profiles import DEFAULT_TARGET_SSIM, schedule_calibration, get_calibration_status
+from .utils.http_pool import get_pool_stats
+from .utils import translation_memory
 
 # 媒体输入目录
 MEDIA_INPUT_DIR = os.path.join(folder_paths.get_input_directory(), "media")
 os.makedirs(MEDIA_INPUT_DIR, exist_ok=True)
 
+# 分块上传的临时目录（与媒体目录同一文件系统，保证完成时可原子重命名）
+UPLOAD_TMP_DIR = os.path.join(MEDIA_INPUT_DIR, ".uploads")
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg']
+
+# 单个分块允许的最大字节数
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# 未完成的上传会话保留时间（秒）
+UPLOAD_SESSION_TTL = 7 * 24 * 3600
+# 清理过期会话的最短间隔（秒）
+UPLOAD_CLEANUP_INTERVAL = 3600
+
+_upload_locks = {}
+# 上传内容的增量 SHA-256: upload_id -> [hasher, 已计入哈希的分块数, {乱序到达的分块序号: 数据片段列表}]
+_upload_hashers = {}
+# 每个会话在内存中暂存的乱序分块上限（字节），超出时该分块在补齐后从磁盘读取
+MAX_PENDING_HASH_BYTES = 256 * 1024 * 1024
+_last_upload_cleanup = 0.0
+
 
 async def get_media_files(request):
     """获取已上传的媒体文件列表"""
     media_files = []
     
     if os.path.exists(MEDIA_INPUT_DIR):
-        video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
-        audio_extensions = ['.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg']
+        video_extensions = VIDEO_EXTENSIONS
+        audio_extensions = AUDIO_EXTENSIONS
         all_extensions = video_extensions + audio_extensions
         
         for filename in os.listdir(MEDIA_INPUT_DIR):
@@ -50,18 +83,404 @@ async def delete_media_file(request):
     if not filename:
         return web.json_response({'error': '未指定文件名'}, status=400)
     
+    if os.path.basename(filename) != filename:
+        return web.json_response({'error': '无效的文件名'}, status=400)
+    
     file_path = os.path.join(MEDIA_INPUT_DIR, filename)
     
     if not os.path.exists(file_path):
         return web.json_response({'error': '文件不存在'}, status=404)
     
     try:
-        os.remove(file_path)
-        return web.json_response({'success': True, 'message': f'已删除 {filename}'})
+        # 内容寻址存储按引用计数释放，其他文件名仍引用的内容会保留
+        freed = remove_name(filename)
+        return web.json_response({'success': True, 'message': f'已删除 {filename}', 'freed_bytes': freed})
     except Exception as e:
         return web.json_response({'error': str(e)}, status=500)
 
 
+def _upload_lock(upload_id):
+    lock = _upload_locks.get(upload_id)
+    if lock is None:
+        lock = _upload_locks[upload_id] = asyncio.Lock()
+    return lock
+
+
+def _upload_paths(upload_id):
+    """返回上传会话的状态文件和数据文件路径"""
+    return (
+        os.path.join(UPLOAD_TMP_DIR, f"{upload_id}.json"),
+        os.path.join(UPLOAD_TMP_DIR, f"{upload_id}.part"),
+    )
+
+
+def _load_upload_state(upload_id):
+    state_path, _ = _upload_paths(upload_id)
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_upload_state(state):
+    state_path, _ = _upload_paths(state['upload_id'])
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _upload_progress(state):
+    """返回已接收分块列表和连续已接收的字节偏移（断点续传位置）"""
+    received = sorted(state['received'])
+    contiguous = 0
+    for index in received:
+        if index != contiguous:
+            break
+        contiguous += 1
+    offset = min(contiguous * state['chunk_size'], state['size'])
+    return {
+        'upload_id': state['upload_id'],
+        'filename': state['filename'],
+        'size': state['size'],
+        'chunk_size': state['chunk_size'],
+        'total_chunks': state['total_chunks'],
+        'received': received,
+        'offset': offset,
+    }
+
+
+def _advance_content_hash(upload_id, state, index=None, pieces=None):
+    """
+    把已连续到达的分块按顺序计入整体内容哈希
+
+    分块处理器把刚接收的数据（pieces）直接交给这里：正好是下一块时立即计入，
+    乱序到达的暂存在内存中等前面补齐；只有服务重启后或暂存超出上限的分块才从磁盘读取
+    """
+    entry = _upload_hashers.get(upload_id)
+    if entry is None:
+        # 服务重启后从头计算已落盘的部分
+        entry = _upload_hashers[upload_id] = [hashlib.sha256(), 0, {}]
+    hasher, next_index, pending = entry
+    if pieces is not None and index >= next_index and index not in pending:
+        pending_bytes = sum(len(piece) for chunk in pending.values() for piece in chunk)
+        if index == next_index or pending_bytes + sum(len(piece) for piece in pieces) <= MAX_PENDING_HASH_BYTES:
+            pending[index] = pieces
+
+    received = set(state['received'])
+    chunk_size = state['chunk_size']
+    _, part_path = _upload_paths(upload_id)
+    f = None
+    try:
+        while next_index in received:
+            chunk = pending.pop(next_index, None)
+            if chunk is not None:
+                for piece in chunk:
+                    hasher.update(piece)
+            else:
+                if f is None:
+                    f = open(part_path, 'rb')
+                f.seek(next_index * chunk_size)
+                remaining = min(chunk_size, state['size'] - next_index * chunk_size)
+                while remaining > 0:
+                    data = f.read(min(remaining, 1024 * 1024))
+                    if not data:
+                        break
+                    hasher.update(data)
+                    remaining -= len(data)
+            next_index += 1
+    finally:
+        if f is not None:
+            f.close()
+    entry[1] = next_index
+    return entry
+
+
+def _write_chunk_piece(f, digest, data):
+    """写入一段分块数据并计入分块校验哈希（在线程池中执行，不阻塞事件循环）"""
+    digest.update(data)
+    f.write(data)
+
+
+def _cleanup_stale_uploads():
+    """清理超过保留时间的未完成上传，以及已不存在的会话留下的锁和哈希状态（每小时最多一次）"""
+    global _last_upload_cleanup
+    now = time.time()
+    if now - _last_upload_cleanup < UPLOAD_CLEANUP_INTERVAL:
+        return
+    _last_upload_cleanup = now
+
+    for name in os.listdir(UPLOAD_TMP_DIR):
+        path = os.path.join(UPLOAD_TMP_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > UPLOAD_SESSION_TTL:
+                os.remove(path)
+        except OSError:
+            pass
+
+    for upload_id in list(_upload_locks):
+        lock = _upload_locks.get(upload_id)
+        state_path, _ = _upload_paths(upload_id)
+        if lock is not None and not lock.locked() and not os.path.exists(state_path):
+            _upload_locks.pop(upload_id, None)
+            _upload_hashers.pop(upload_id, None)
+
+
+def _unique_media_path(filename):
+    """
+    在媒体目录中为文件选择不冲突的名称：name.ext, name (1).ext, ...
+    以独占方式创建占位文件预留名称，并发上传不会选中同一个文件名；占位文件由调用方原子替换
+    """
+    base, ext = os.path.splitext(filename)
+    candidate = filename
+    counter = 1
+    while True:
+        try:
+            os.close(os.open(os.path.join(MEDIA_INPUT_DIR, candidate), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate
+        except FileExistsError:
+            candidate = f"{base} ({counter}){ext}"
+            counter += 1
+
+
+def _sanitize_filename(filename):
+    name = os.path.basename(str(filename or '').replace('\\', '/'))
+    name = re.sub(r'[\x00-\x1f<>:"/\\|?*]', '_', name).strip().lstrip('.')
+    return name
+
+
+async def upload_init(request):
+    """创建或恢复分块上传会话"""
+    data = await request.json()
+    filename = _sanitize_filename(data.get('filename'))
+    try:
+        size = int(data.get('size', -1))
+        chunk_size = int(data.get('chunk_size', 8 * 1024 * 1024))
+    except (TypeError, ValueError):
+        return web.json_response({'error': '无效的文件大小或分块大小'}, status=400)
+
+    if not filename:
+        return web.json_response({'error': '未指定文件名'}, status=400)
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in VIDEO_EXTENSIONS + AUDIO_EXTENSIONS:
+        return web.json_response({'error': f'不支持的文件格式: {ext}'}, status=400)
+    if size < 0 or chunk_size <= 0 or chunk_size > MAX_CHUNK_SIZE:
+        return web.json_response({'error': '无效的文件大小或分块大小'}, status=400)
+
+    # 同一文件（名称+大小+修改时间）得到相同的会话 ID，页面刷新后也能续传
+    file_key = str(data.get('file_key') or f"{filename}:{size}")
+    upload_id = hashlib.sha1(f"{file_key}|{size}|{chunk_size}".encode('utf-8')).hexdigest()
+
+    async with _upload_lock(upload_id):
+        state = _load_upload_state(upload_id)
+        _, part_path = _upload_paths(upload_id)
+        _cleanup_stale_uploads()
+        if state is None or not os.path.exists(part_path):
+            state = {
+                'upload_id': upload_id,
+                'filename': filename,
+                'size': size,
+                'chunk_size': chunk_size,
+                'total_chunks': (size + chunk_size - 1) // chunk_size,
+                'received': [],
+            }
+            # 预分配（稀疏）文件，各分块可按偏移并行写入
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            _save_upload_state(state)
+        elif state['received']:
+            print(f"[FasterWhisper] 恢复上传 {filename}: 已接收 {len(state['received'])}/{state['total_chunks']} 块")
+
+    return web.json_response(_upload_progress(state))
+
+
+async def upload_chunk(request):
+    """接收单个分块：流式写入对应偏移并校验 SHA-256"""
+    upload_id = request.query.get('upload_id', '')
+    if not re.fullmatch(r'[0-9a-f]{40}', upload_id):
+        return web.json_response({'error': '无效的上传会话'}, status=400)
+    state = _load_upload_state(upload_id)
+    _, part_path = _upload_paths(upload_id)
+    if state is None or not os.path.exists(part_path):
+        return web.json_response({'error': '上传会话不存在或已过期'}, status=404)
+
+    try:
+        index = int(request.query.get('index', -1))
+    except ValueError:
+        index = -1
+    if index < 0 or index >= state['total_chunks']:
+        return web.json_response({'error': '分块序号超出范围'}, status=400)
+
+    offset = index * state['chunk_size']
+    expected_length = min(state['chunk_size'], state['size'] - offset)
+    expected_sha = (request.headers.get('X-Chunk-SHA256') or '').lower()
+
+    loop = asyncio.get_running_loop()
+    digest = hashlib.sha256()
+    written = 0
+    # 保留接收到的数据片段，整体内容哈希直接由它们计算，不再从磁盘读回
+    pieces = []
+    with open(part_path, 'r+b') as f:
+        f.seek(offset)
+        async for data in request.content.iter_chunked(1024 * 1024):
+            written += len(data)
+            if written > expected_length:
+                return web.json_response({'error': '分块数据超出预期长度'}, status=400)
+            pieces.append(data)
+            await loop.run_in_executor(None, _write_chunk_piece, f, digest, data)
+
+    if written != expected_length:
+        return web.json_response({'error': f'分块长度不匹配: {written}/{expected_length}'}, status=400)
+    if expected_sha and digest.hexdigest() != expected_sha:
+        return web.json_response({'error': '分块校验失败，请重传'}, status=422)
+
+    async with _upload_lock(upload_id):
+        state = _load_upload_state(upload_id)
+        if state is None:
+            return web.json_response({'error': '上传会话不存在或已过期'}, status=404)
+        if index not in state['received']:
+            state['received'].append(index)
+            _save_upload_state(state)
+        # 边接收边计算内容哈希，完成时无需再整体读取一遍文件
+        await loop.run_in_executor(None, _advance_content_hash, upload_id, state, index, pieces)
+
+    return web.json_response(_upload_progress(state))
+
+
+async def upload_status(request):
+    """查询上传会话进度"""
+    upload_id = request.query.get('upload_id', '')
+    state = _load_upload_state(upload_id) if re.fullmatch(r'[0-9a-f]{40}', upload_id) else None
+    if state is None:
+        return web.json_response({'error': '上传会话不存在或已过期'}, status=404)
+    return web.json_response(_upload_progress(state))
+
+
+async def upload_finalize(request):
+    """所有分块到齐后按内容哈希存入媒体存储，并原子链接为用户可见文件名"""
+    data = await request.json()
+    upload_id = str(data.get('upload_id', ''))
+    if not re.fullmatch(r'[0-9a-f]{40}', upload_id):
+        return web.json_response({'error': '无效的上传会话'}, status=400)
+
+    async with _upload_lock(upload_id):
+        state = _load_upload_state(upload_id)
+        state_path, part_path = _upload_paths(upload_id)
+        if state is None or not os.path.exists(part_path):
+            return web.json_response({'error': '上传会话不存在或已过期'}, status=404)
+
+        missing = sorted(set(range(state['total_chunks'])) - set(state['received']))
+        if missing:
+            return web.json_response({'error': f'仍有 {len(missing)} 个分块未上传', 'missing': missing}, status=409)
+
+        loop = asyncio.get_running_loop()
+        hasher, hashed_chunks, _ = await loop.run_in_executor(None, _advance_content_hash, upload_id, state)
+        if hashed_chunks < state['total_chunks']:
+            return web.json_response({'error': '内容哈希计算不完整，请重试'}, status=500)
+        sha256 = hasher.hexdigest()
+
+        final_name, duplicate = await loop.run_in_executor(
+            None, ingest_file, part_path, sha256, state['filename'], _unique_media_path)
+        final_path = os.path.join(MEDIA_INPUT_DIR, final_name)
+        os.remove(state_path)
+    _upload_locks.pop(upload_id, None)
+    _upload_hashers.pop(upload_id, None)
+
+    # 上传完成后立即在后台生成预览代理和波形峰值
+    if os.path.splitext(final_name)[1].lower() in VIDEO_EXTENSIONS:
+        schedule_preview(final_path)
+    schedule_waveform(final_path)
+
+    print(f"[FasterWhisper] 上传完成: {final_name}")
+    return web.json_response({
+        'name': final_name,
+        'subfolder': 'media',
+        'type': 'input',
+        'sha256': sha256,
+        'duplicate': duplicate,
+    })
+
+
+def _resolve_view_path(query):
+    """按 /view 的参数约定 (filename, subfolder, type) 解析文件路径，禁止越出基础目录"""
+    base_dirs = {
+        'input': folder_paths.get_input_directory(),
+        'output': folder_paths.get_output_directory(),
+        'temp': folder_paths.get_temp_directory(),
+    }
+    base_dir = base_dirs.get(query.get('type', 'input'))
+    filename = query.get('filename', '')
+    if base_dir is None or not filename:
+        return None
+    base_dir = os.path.abspath(base_dir)
+    file_path = os.path.abspath(os.path.join(base_dir, query.get('subfolder', ''), filename))
+    if os.path.commonpath([base_dir, file_path]) != base_dir or not os.path.isfile(file_path):
+        return None
+    return file_path
+
+
+async def get_media_preview(request):
+    """
+    返回媒体预览：kind=proxy 返回低码率代理（未就绪时回退到原始文件），kind=poster 返回封面
+    FileResponse 自带 HTTP Range 支持，浏览器可按需拖动进度
+    """
+    file_path = _resolve_view_path(request.query)
+    if file_path is None:
+        return web.json_response({'error': '文件不存在'}, status=404)
+
+    kind = request.query.get('kind', 'proxy')
+    paths = get_preview_paths(file_path)
+    preview_path = paths.get(kind)
+    if preview_path is None:
+        return web.json_response({'error': f'未知的预览类型: {kind}'}, status=400)
+
+    if os.path.exists(preview_path):
+        mark_preview_used(file_path)
+        return web.FileResponse(preview_path, headers={
+            'Cache-Control': 'public, max-age=86400',
+            'X-FW-Preview': kind,
+        })
+
+    if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+        schedule_preview(file_path)
+    if kind == 'poster':
+        return web.json_response({'error': '封面生成中'}, status=404)
+    return web.FileResponse(file_path, headers={'X-FW-Preview': 'original'})
+
+
+async def get_media_preview_status(request):
+    """查询预览代理生成状态"""
+    file_path = _resolve_view_path(request.query)
+    if file_path is None:
+        return web.json_response({'error': '文件不存在'}, status=404)
+    status, error = get_preview_status(file_path)
+    if status == 'none' and os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+        schedule_preview(file_path)
+        status = 'pending'
+    return web.json_response({'status': status, 'error': error})
+
+
+async def get_media_waveform(request):
+    """返回预计算的波形峰值二进制数据；尚未生成时排队计算并返回 202"""
+    file_path = _resolve_view_path(request.query)
+    if file_path is None:
+        return web.json_response({'error': '文件不存在'}, status=404)
+
+    peaks_path = get_waveform_path(file_path)
+    if os.path.exists(peaks_path):
+        touch(peaks_path)
+        return web.FileResponse(peaks_path, headers={
+            'Content-Type': 'application/octet-stream',
+            'Cache-Control': 'public, max-age=86400',
+        })
+
+    status, error = get_waveform_status(file_path)
+    if status == 'error':
+        return web.json_response({'status': status, 'error': error}, status=500)
+    schedule_waveform(file_path)
+    return web.json_response({'status': 'pending'}, status=202)
+
+
 async def get_ollama_models(request):
     """获取本地 Ollama 可用模型"""
     import aiohttp
@@ -69,7 +488,7 @@ async def get_ollama_models(request):
     url = request.query.get('url', 'http://localhost:11434')
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trust_env=True) as session:
             async with session.get(f'{url}/api/tags', timeout=5) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -81,13 +500,66 @@ async def get_ollama_models(request):
         return web.json_response({'models': [], 'error': str(e)})
 
 
-def register_routes(app):
-    """注册 API 路由"""
-    app.router.add_get('/faster_whisper/media_files', get_media_files)
-    app.router.add_post('/faster_whisper/delete_media', delete_media_file)
-    app.router.add_get('/faster_whisper/ollama_models', get_ollama_models)
+async def start_encoder_calibration(request):
+    """在后台启动编码配置校准，可在请求体中指定目标 SSIM"""
+    try:
+        data = await request.json() if request.can_read_body else {}
+        target_ssim = float(data.get('target_ssim', DEFAULT_TARGET_SSIM))
+    except (ValueError, TypeError, json.JSONDecodeError):
+        return web.json_response({'error': '无效的 target_ssim'}, status=400)
+    if not 0 < target_ssim <= 1:
+        return web.json_response({'error': 'target_ssim 必须在 (0, 1] 范围内'}, status=400)
+
+    schedule_calibration(target_ssim)
+    return web.json_response({'status': 'pending'}, status=202)
+
+
+async def get_encoder_calibration(request):
+    """查询编码校准状态和最近一次结果"""
+    status, error, calibration = get_calibration_status()
+    return web.json_response({'status': status, 'error': error, 'calibration': calibration})
+
+
+async def get_llm_http_stats(request):
+    """查询 LLM 请求的连接复用统计"""
+    return web.json_response({'hosts': get_pool_stats()})
+
+
+async def get_translation_memory_stats(request):
+    """查询翻译记忆的条目数、大小和命中率"""
+    loop = asyncio.get_running_loop()
+    stats = await loop.run_in_executor(None, translation_memory.get_stats)
+    return web.json_response(stats)
+
+
+async def clear_translation_memory(request):
+    """清空翻译记忆"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, translation_memory.clear)
+    return web.json_response({'success': True})
+
+
+def register_routes(routes):
+    """注册 API 路由（routes 为 aiohttp RouteTableDef，例如 PromptServer.instance.routes）"""
+    routes.get('/faster_whisper/media_files')(get_media_files)
+    routes.post('/faster_whisper/delete_media')(delete_media_file)
+    routes.get('/faster_whisper/ollama_models')(get_ollama_models)
+    routes.post('/faster_whisper/upload/init')(upload_init)
+    routes.put('/faster_whisper/upload/chunk')(upload_chunk)
+    routes.get('/faster_whisper/upload/status')(upload_status)
+    routes.post('/faster_whisper/upload/finalize')(upload_finalize)
+    routes.get('/faster_whisper/preview')(get_media_preview)
+    routes.get('/faster_whisper/preview/status')(get_media_preview_status)
+    routes.get('/faster_whisper/waveform')(get_media_waveform)
+    routes.post('/faster_whisper/encoder/calibrate')(start_encoder_calibration)
+    routes.get('/faster_whisper/encoder/calibration')(get_encoder_calibration)
+    routes.get('/faster_whisper/llm/http_stats')(get_llm_http_stats)
+    routes.get('/faster_whisper/llm/translation_memory')(get_translation_memory_stats)
+    routes.post('/faster_whisper/llm/translation_memory/clear')(clear_translation_memory)
 
 
-# ComfyUI 会自动调用这个函数
 def setup_routes(app):
-    register_routes(app)
+    """在独立的 aiohttp 应用上注册路由"""
+    routes = web.RouteTableDef()
+    register_routes(routes)
+    app.router.add_routes(routes)
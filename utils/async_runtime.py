@@ -0,0 +1,66 @@
+"""
+异步运行时模块 - 插件共享的后台事件循环线程
+大模型请求以协程形式在同一个事件循环上并发执行，数百个在途请求不需要对应数量的线程；
+同步代码（节点执行线程）通过 run_sync 提交协程并等待结果，等待期间响应中断按钮
+"""
+
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from .interrupt import InterruptProcessingException, processing_interrupted
+
+# 等待协程结果时检查中断的间隔（秒）
+WAIT_INTERVAL = 0.5
+
+_lock = threading.Lock()
+_loop = None
+
+
+def _run_loop(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_loop():
+    """返回（必要时启动）共享事件循环"""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_run_loop, args=(_loop,), name="fw-async-loop", daemon=True).start()
+        return _loop
+
+
+def in_loop_thread():
+    """当前是否运行在共享事件循环线程中（此时不能调用 run_sync，否则会死锁）"""
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def submit(coro):
+    """把协程提交到共享事件循环，返回 concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def wait_future(future, interruptible=True):
+    """
+    等待 submit 返回的 Future；用户点击中断时取消协程并抛出 InterruptProcessingException
+    """
+    while True:
+        try:
+            return future.result(timeout=WAIT_INTERVAL)
+        except FutureTimeoutError:
+            if interruptible and processing_interrupted():
+                future.cancel()
+                raise InterruptProcessingException()
+
+
+def run_sync(coro, interruptible=True):
+    """在共享事件循环上运行协程并同步等待结果"""
+    if in_loop_thread():
+        coro.close()
+        raise RuntimeError("不能在共享事件循环线程中同步等待协程")
+    return wait_future(submit(coro), interruptible)
@@ -0,0 +1,77 @@
+"""
+后台任务模块 - 在独立线程池中执行预览代理、波形等非阻塞任务
+同一任务键同时只会排队一次，重复提交返回进行中的任务；已结束的任务状态保留一段时间后移除
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 后台任务只占用少量线程，避免与识别、烧录争抢 CPU
+MAX_BACKGROUND_WORKERS = 2
+# 已结束任务的状态保留时间（秒），供前端轮询读取结果或错误信息
+FINISHED_JOB_TTL = 600
+
+_executor = None
+# key -> Future；_finished_at 记录已结束任务的结束时间
+_jobs = {}
+_finished_at = {}
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_BACKGROUND_WORKERS, thread_name_prefix="fw-background")
+    return _executor
+
+
+def _prune_finished(now):
+    """移除结束时间超过保留期限的任务（调用方持有 _lock）"""
+    for key in [k for k, t in _finished_at.items() if now - t > FINISHED_JOB_TTL]:
+        del _finished_at[key]
+        _jobs.pop(key, None)
+
+
+def submit_job(key, func, *args, **kwargs):
+    """提交后台任务；同一 key 的任务尚未结束时直接返回已有 Future（结果是否已缓存由调用方判断）"""
+    with _lock:
+        _prune_finished(time.monotonic())
+        future = _jobs.get(key)
+        if future is not None and not future.done():
+            return future
+
+        def _run():
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                print(f"[FasterWhisper] 后台任务失败 {key}: {e}")
+                raise
+
+        future = _get_executor().submit(_run)
+        _jobs[key] = future
+        _finished_at.pop(key, None)
+
+    def _on_done(done_future):
+        with _lock:
+            # 同一 key 可能已被重新提交，只记录仍在登记中的任务
+            if _jobs.get(key) is done_future:
+                _finished_at[key] = time.monotonic()
+
+    future.add_done_callback(_on_done)
+    return future
+
+
+def get_job_status(key):
+    """返回任务状态: none / pending / done / error，以及错误信息"""
+    with _lock:
+        _prune_finished(time.monotonic())
+        future = _jobs.get(key)
+    if future is None:
+        return "none", None
+    if not future.done():
+        return "pending", None
+    error = future.exception()
+    if error is not None:
+        return "error", str(error)
+    return "done", None
@@ -0,0 +1,84 @@
+"""
+烧录结果缓存模块 - 相同视频、字幕、样式和编码参数的烧录结果只生成一次
+缓存键由源文件指纹、生成的 ASS 内容、编码参数和字体集合计算，
+缓存目录有容量上限，超出时按最近使用时间淘汰最旧的结果；
+返回给下游节点的是缓存文件的硬链接或副本，缓存淘汰不影响尚未保存的结果
+"""
+
+import os
+import json
+import shutil
+import hashlib
+
+from .paths import get_cache_dir
+from .workspace import temp_output_path, atomic_temp_path, finalize_output
+from .cache_quota import quota_from_env, evict_lru, touch, directory_lock
+
+# 缓存容量上限（字节），可通过环境变量 FASTER_WHISPER_BURN_CACHE_GB 调整
+BURN_CACHE_QUOTA_BYTES = quota_from_env("FASTER_WHISPER_BURN_CACHE_GB", "20")
+
+
+def _cache_dir():
+    return get_cache_dir("burned_videos")
+
+
+def compute_burn_key(fingerprint, ass_bytes, encoder_args, font_set, mode):
+    """根据源文件指纹、ASS 内容、编码参数、字体集合和输出模式计算缓存键"""
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        "fingerprint": fingerprint,
+        "ass": hashlib.sha256(ass_bytes).hexdigest(),
+        "encoder": list(encoder_args),
+        "fonts": font_set,
+        "mode": mode,
+    }, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _checkout(cached_path, stem, ext):
+    """
+    把缓存结果硬链接（跨文件系统时复制）到临时输出目录
+    下游节点拿到的是独立的目录项，缓存随后被淘汰也不影响读取
+    """
+    output_path = temp_output_path("burned_videos", stem, ext)
+    try:
+        os.link(cached_path, output_path)
+    except OSError:
+        tmp_path = atomic_temp_path(output_path)
+        shutil.copy2(cached_path, tmp_path)
+        finalize_output(tmp_path, output_path)
+    return output_path
+
+
+def get_cached_burn(key, stem, ext="mp4"):
+    """
+    命中缓存时刷新其最近使用时间，并返回交给下游节点的输出路径；未命中返回 None
+    查找和链接在缓存目录锁内完成，期间不会被并发任务淘汰
+    """
+    path = os.path.join(_cache_dir(), f"{key}.{ext}")
+    with directory_lock(_cache_dir()):
+        if not os.path.exists(path):
+            return None
+        touch(path)
+        return _checkout(path, stem, ext)
+
+
+def store_burn(key, output_path, stem, ext="mp4"):
+    """
+    将烧录结果移入缓存目录并按容量上限淘汰旧结果
+
+    Returns:
+        交给下游节点的输出路径（与缓存中的文件相互独立）
+    """
+    cached_path = os.path.join(_cache_dir(), f"{key}.{ext}")
+    with directory_lock(_cache_dir()):
+        finalize_output(output_path, cached_path)
+        result_path = _checkout(cached_path, stem, ext)
+
+    _evict(keep=cached_path)
+    return result_path
+
+
+def _evict(keep=None):
+    """按最近使用时间淘汰缓存，直到总大小不超过上限（刚写入的结果不淘汰）"""
+    evict_lru(_cache_dir(), BURN_CACHE_QUOTA_BYTES, keep=[keep], label="烧录缓存")
@@ -0,0 +1,100 @@
+"""
+缓存容量模块 - 按容量上限和最近使用时间淘汰缓存目录中的条目
+条目是缓存目录下的一个文件或子目录（如按文件指纹划分的预览目录），
+最近使用时间取条目内最新的修改时间，读取缓存时通过 touch 刷新
+"""
+
+import os
+import shutil
+import threading
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def quota_from_env(name, default, unit=1024 ** 3):
+    """从环境变量读取容量上限（以 unit 为单位，可为小数），返回字节数"""
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        value = float(default)
+    return int(value * unit)
+
+
+def touch(path):
+    """刷新缓存条目的最近使用时间"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def directory_lock(directory):
+    """返回缓存目录的锁；持有期间该目录不会执行淘汰"""
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(directory), threading.Lock())
+
+
+def _entry_usage(path):
+    """返回条目的 (最近修改时间, 总大小)"""
+    st = os.stat(path)
+    if not os.path.isdir(path):
+        return st.st_mtime, st.st_size
+    mtime, size = st.st_mtime, 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                fst = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            mtime = max(mtime, fst.st_mtime)
+            size += fst.st_size
+    return mtime, size
+
+
+def evict_lru(directory, quota_bytes, keep=(), label="缓存"):
+    """
+    按最近使用时间淘汰条目，直到目录总大小不超过上限
+
+    Args:
+        directory: 缓存目录
+        quota_bytes: 容量上限（字节），不大于 0 时不限制
+        keep: 不淘汰的条目路径（如刚生成的结果）
+        label: 日志中的缓存名称
+    """
+    if quota_bytes <= 0 or not os.path.isdir(directory):
+        return
+    keep = {os.path.abspath(path) for path in keep if path}
+
+    with directory_lock(directory):
+        entries = []
+        total = 0
+        for name in os.listdir(directory):
+            # 跳过隐藏文件和正在写入的临时文件
+            if name.startswith(".") or ".tmp" in name:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                mtime, size = _entry_usage(path)
+            except OSError:
+                continue
+            entries.append((mtime, size, path))
+            total += size
+
+        if total <= quota_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total <= quota_bytes:
+                break
+            if os.path.abspath(path) in keep:
+                continue
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+                total -= size
+                print(f"[FasterWhisper] {label}超出上限，已淘汰: {os.path.basename(path)}")
+            except OSError:
+                pass
@@ -0,0 +1,210 @@
+"""
+编码配置模块 - 命名的速度/质量预设和本机自动校准
+每个配置包含编码器、preset、CRF 或码率、编码线程数、滤镜线程数和像素格式；
+校准在合成测试片段上对每个配置计时并测量 SSIM，选出满足目标质量的最快配置
+"""
+
+import os
+import json
+import time
+import platform
+
+from .paths import get_cache_dir
+from .workspace import job_workspace
+from .ffmpeg_runner import run_ffmpeg
+from .background_jobs import submit_job, get_job_status
+
+PROFILE_DRAFT = "draft"
+PROFILE_BALANCED = "balanced"
+PROFILE_ARCHIVAL = "archival"
+PROFILE_AUTO = "auto"
+PROFILE_CUSTOM = "custom"
+
+ENCODER_PROFILES = {
+    PROFILE_DRAFT: {
+        "codec": "libx264", "preset": "veryfast", "crf": 28, "bitrate": "",
+        "threads": 0, "filter_threads": 0, "pix_fmt": "yuv420p",
+    },
+    PROFILE_BALANCED: {
+        "codec": "libx264", "preset": "medium", "crf": 23, "bitrate": "",
+        "threads": 0, "filter_threads": 0, "pix_fmt": "yuv420p",
+    },
+    PROFILE_ARCHIVAL: {
+        "codec": "libx264", "preset": "slow", "crf": 18, "bitrate": "",
+        "threads": 0, "filter_threads": 0, "pix_fmt": "yuv420p",
+    },
+}
+
+PROFILE_NAMES = [PROFILE_BALANCED, PROFILE_DRAFT, PROFILE_ARCHIVAL, PROFILE_AUTO, PROFILE_CUSTOM]
+CUSTOM_CODECS = ["libx264", "libx265"]
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+PIX_FMTS = ["yuv420p", "yuv420p10le", "yuv422p", "yuv444p"]
+
+# 校准默认参数：合成片段时长（秒）、分辨率和目标 SSIM
+CALIBRATION_SECONDS = 5
+CALIBRATION_SIZE = "1280x720"
+CALIBRATION_RATE = 30
+DEFAULT_TARGET_SSIM = 0.97
+CALIBRATION_JOB_KEY = ("encoder_calibration",)
+
+
+def _calibration_path():
+    return os.path.join(get_cache_dir("encoder_calibration"), "calibration.json")
+
+
+def load_calibration():
+    """读取本机的校准结果；尚未校准时返回 None"""
+    path = _calibration_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[FasterWhisper] 读取编码校准结果失败: {e}")
+        return None
+
+
+def resolve_profile(name, custom=None):
+    """
+    将配置名解析为具体参数
+
+    Args:
+        name: draft / balanced / archival / auto / custom
+        custom: custom 配置的参数（缺省字段取 balanced 的值）
+    """
+    if name == PROFILE_CUSTOM:
+        profile = dict(ENCODER_PROFILES[PROFILE_BALANCED])
+        profile.update({k: v for k, v in (custom or {}).items() if v is not None})
+        return profile
+
+    if name == PROFILE_AUTO:
+        calibration = load_calibration()
+        best = (calibration or {}).get("best")
+        if best in ENCODER_PROFILES:
+            return dict(ENCODER_PROFILES[best])
+        print("[FasterWhisper] 尚未进行编码校准，auto 配置使用 balanced")
+        return dict(ENCODER_PROFILES[PROFILE_BALANCED])
+
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"未知的编码配置: {name}")
+    return dict(ENCODER_PROFILES[name])
+
+
+def build_encoder_args(profile, codec=None, include_threads=True):
+    """
+    生成 FFmpeg 输出端的视频编码参数
+
+    Args:
+        profile: resolve_profile 返回的参数
+        codec: 覆盖编码器（智能渲染需要与源视频一致）
+        include_threads: 为 False 时不输出 -threads，由调用方自行分配
+    """
+    args = ['-c:v', codec or profile["codec"], '-preset', profile["preset"]]
+    if profile.get("bitrate"):
+        args += ['-b:v', str(profile["bitrate"])]
+    else:
+        args += ['-crf', str(profile["crf"])]
+    if profile.get("pix_fmt"):
+        args += ['-pix_fmt', profile["pix_fmt"]]
+    if include_threads and profile.get("threads"):
+        args += ['-threads', str(profile["threads"])]
+    return args
+
+
+def build_filter_args(profile):
+    """滤镜图线程数（全局参数，放在输入之前）"""
+    if profile.get("filter_threads"):
+        return ['-filter_threads', str(profile["filter_threads"])]
+    return []
+
+
+def _parse_ssim(stderr):
+    """从 ssim 滤镜日志中解析总体 SSIM（"... All:0.987654 (19.1)"）"""
+    for line in reversed(stderr.splitlines()):
+        if "SSIM" in line and "All:" in line:
+            try:
+                return float(line.split("All:", 1)[1].split()[0])
+            except (IndexError, ValueError):
+                return None
+    return None
+
+
+def calibrate_profiles(target_ssim=DEFAULT_TARGET_SSIM):
+    """
+    在合成测试片段上对每个内置配置计时并测量 SSIM，
+    选择满足目标质量的最快配置（都不满足时选质量最高的），结果保存供 auto 配置使用
+    """
+    frames = CALIBRATION_SECONDS * CALIBRATION_RATE
+    results = {}
+
+    with job_workspace("calibrate") as workspace:
+        # 无损参考片段，各配置都从它编码，解码开销与实际烧录相近
+        reference = os.path.join(workspace, "reference.mkv")
+        run_ffmpeg([
+            'ffmpeg', '-y',
+            '-f', 'lavfi', '-i', f"testsrc2=size={CALIBRATION_SIZE}:rate={CALIBRATION_RATE}",
+            '-t', str(CALIBRATION_SECONDS),
+            '-c:v', 'ffv1', '-pix_fmt', 'yuv420p',
+            reference
+        ], label="生成校准片段", progress=False, interruptible=False)
+
+        for name, profile in ENCODER_PROFILES.items():
+            encoded = os.path.join(workspace, f"{name}.mp4")
+            started = time.monotonic()
+            run_ffmpeg([
+                'ffmpeg', '-y',
+                *build_filter_args(profile),
+                '-i', reference,
+                *build_encoder_args(profile),
+                encoded
+            ], label=f"校准 {name}", progress=False, interruptible=False)
+            elapsed = time.monotonic() - started
+
+            result = run_ffmpeg([
+                'ffmpeg', '-i', encoded, '-i', reference,
+                '-lavfi', 'ssim', '-f', 'null', '-'
+            ], label=f"测量 {name} SSIM", progress=False, interruptible=False)
+
+            results[name] = {
+                "seconds": round(elapsed, 3),
+                "fps": round(frames / elapsed, 1) if elapsed > 0 else None,
+                "ssim": _parse_ssim(result.stderr),
+                "size": os.path.getsize(encoded),
+            }
+            print(f"[FasterWhisper] 编码校准 {name}: {results[name]['fps']} fps, SSIM {results[name]['ssim']}")
+
+    passing = [n for n, r in results.items() if r["ssim"] is not None and r["ssim"] >= target_ssim]
+    if passing:
+        best = min(passing, key=lambda n: results[n]["seconds"])
+    else:
+        best = max(results, key=lambda n: results[n]["ssim"] or 0)
+        print(f"[FasterWhisper] 没有配置达到目标 SSIM {target_ssim}，选择质量最高的 {best}")
+
+    calibration = {
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "target_ssim": target_ssim,
+        "created": time.time(),
+        "results": results,
+        "best": best,
+    }
+    path = _calibration_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+    print(f"[FasterWhisper] 编码校准完成，auto 配置将使用: {best}")
+    return calibration
+
+
+def schedule_calibration(target_ssim=DEFAULT_TARGET_SSIM):
+    """在后台运行编码校准（同时只运行一次）"""
+    return submit_job(CALIBRATION_JOB_KEY, calibrate_profiles, target_ssim)
+
+
+def get_calibration_status():
+    """返回校准任务状态和最近一次的校准结果"""
+    status, error = get_job_status(CALIBRATION_JOB_KEY)
+    return status, error, load_calibration()
@@ -0,0 +1,255 @@
+"""
+FFmpeg 运行模块 - 托管 FFmpeg 子进程
+读取 -progress 输出驱动 ComfyUI 进度条并打印帧率、速度和剩余时间，
+轮询中断按钮并干净地结束进程，只保留有限行数的 stderr，用卡死检测代替固定超时
+"""
+
+import time
+import threading
+import subprocess
+from collections import deque
+
+from .interrupt import InterruptProcessingException, processing_interrupted
+
+# 保留的 stderr 末尾行数
+STDERR_TAIL_LINES = 200
+# 超过该秒数既没有进度也没有 stderr 输出，视为卡死
+DEFAULT_STALL_TIMEOUT = 300
+# 进度日志打印间隔（秒）
+PROGRESS_LOG_INTERVAL = 10
+# 主循环轮询间隔（秒）
+POLL_INTERVAL = 0.25
+# 发送 "q" 后等待 FFmpeg 自行退出的时间（秒）
+GRACEFUL_EXIT_TIMEOUT = 5
+
+
+class FFmpegError(RuntimeError):
+    """FFmpeg 返回非零退出码"""
+
+    def __init__(self, message, returncode=None, stderr=""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+class FFmpegStalledError(FFmpegError):
+    """FFmpeg 长时间没有任何输出"""
+
+
+class FFmpegResult:
+    """FFmpeg 运行结果：退出码和 stderr 末尾"""
+
+    def __init__(self, returncode, stderr):
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+class ProgressGroup:
+    """
+    多个并发 FFmpeg 进程共享一个进度条（如并行分段烧录）
+    每个进程通过 callback(key) 上报自己已处理的秒数，进度条显示总和
+    """
+
+    def __init__(self, total_seconds):
+        self.total_seconds = total_seconds
+        self._done = {}
+        self._lock = threading.Lock()
+        self._pbar = _create_progress_bar()
+
+    def callback(self, key):
+        def _update(seconds):
+            with self._lock:
+                self._done[key] = seconds
+                done = sum(self._done.values())
+            if self._pbar is not None and self.total_seconds:
+                self._pbar.update_absolute(min(int(done * 1000 / self.total_seconds), 1000))
+        return _update
+
+
+def _create_progress_bar():
+    try:
+        import comfy.utils
+        return comfy.utils.ProgressBar(1000)
+    except ImportError:
+        return None
+
+
+def _format_seconds(seconds):
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _parse_out_time(fields):
+    """-progress 输出中 out_time_us / out_time_ms 单位均为微秒"""
+    for key in ("out_time_us", "out_time_ms"):
+        value = fields.get(key)
+        if value and value != "N/A":
+            try:
+                return max(0.0, int(value) / 1_000_000)
+            except ValueError:
+                pass
+    return None
+
+
+def _terminate(process):
+    """先发送 "q" 让 FFmpeg 正常收尾，超时后 terminate，最后 kill"""
+    if process.poll() is not None:
+        return
+    try:
+        process.stdin.write(b"q")
+        process.stdin.flush()
+    except (OSError, ValueError):
+        pass
+    try:
+        process.wait(timeout=GRACEFUL_EXIT_TIMEOUT)
+        return
+    except subprocess.TimeoutExpired:
+        pass
+    process.terminate()
+    try:
+        process.wait(timeout=GRACEFUL_EXIT_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_ffmpeg(cmd, duration=None, label="FFmpeg", progress=True, interruptible=True,
+               stall_timeout=DEFAULT_STALL_TIMEOUT, check=True):
+    """
+    运行 FFmpeg 命令并跟踪进度
+
+    Args:
+        cmd: 以 'ffmpeg' 开头的命令列表（会自动加入 -progress pipe:1 -nostats）
+        duration: 输出的预期时长（秒），用于计算百分比和剩余时间
+        label: 日志中显示的任务名称
+        progress: True 创建独立进度条；False 不显示；可调用对象则以已处理秒数回调
+        interruptible: 是否响应 ComfyUI 的中断按钮（后台任务应设为 False）
+        stall_timeout: 卡死判定秒数，None 表示不检测
+        check: 非零退出码时抛出 FFmpegError
+
+    Returns:
+        FFmpegResult
+
+    Raises:
+        FileNotFoundError: FFmpeg 不在 PATH 中
+        FFmpegStalledError: 超过 stall_timeout 没有任何输出
+        InterruptProcessingException: 用户中断
+    """
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+
+    pbar = None
+    callback = None
+    if callable(progress):
+        callback = progress
+    elif progress and duration:
+        pbar = _create_progress_bar()
+
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    state = {"out_time": 0.0, "fps": None, "speed": None, "last_activity": time.monotonic()}
+    state_lock = threading.Lock()
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def read_progress():
+        fields = {}
+        for raw in process.stdout:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            fields[key] = value
+            if key != "progress":
+                continue
+            # 一个进度块以 progress=continue/end 结束
+            out_time = _parse_out_time(fields)
+            with state_lock:
+                if out_time is not None:
+                    state["out_time"] = out_time
+                state["fps"] = fields.get("fps")
+                state["speed"] = fields.get("speed")
+                state["last_activity"] = time.monotonic()
+            fields = {}
+
+    def read_stderr():
+        for raw in process.stderr:
+            stderr_tail.append(raw.decode("utf-8", errors="replace").rstrip())
+            with state_lock:
+                state["last_activity"] = time.monotonic()
+
+    readers = [
+        threading.Thread(target=read_progress, daemon=True),
+        threading.Thread(target=read_stderr, daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    started = time.monotonic()
+    last_log = started
+    last_reported = None
+    try:
+        while True:
+            try:
+                process.wait(timeout=POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+
+            if interruptible and processing_interrupted():
+                print(f"[FasterWhisper] {label}: 用户中断，正在停止 FFmpeg")
+                _terminate(process)
+                raise InterruptProcessingException()
+
+            now = time.monotonic()
+            with state_lock:
+                out_time = state["out_time"]
+                fps = state["fps"]
+                speed = state["speed"]
+                idle = now - state["last_activity"]
+
+            if stall_timeout and idle > stall_timeout:
+                _terminate(process)
+                raise FFmpegStalledError(
+                    f"{label}: FFmpeg 已 {int(idle)} 秒没有任何输出，判定为卡死",
+                    stderr="\n".join(stderr_tail),
+                )
+
+            if out_time != last_reported:
+                last_reported = out_time
+                if callback is not None:
+                    callback(out_time)
+                elif pbar is not None:
+                    pbar.update_absolute(min(int(out_time * 1000 / duration), 1000))
+
+            if now - last_log >= PROGRESS_LOG_INTERVAL:
+                last_log = now
+                message = f"[FasterWhisper] {label}: {_format_seconds(out_time)}"
+                if duration:
+                    ratio = min(out_time / duration, 1.0)
+                    message += f" / {_format_seconds(duration)} ({ratio * 100:.1f}%)"
+                    if ratio > 0:
+                        elapsed = now - started
+                        message += f", 剩余约 {_format_seconds(elapsed / ratio - elapsed)}"
+                if fps:
+                    message += f", {fps} fps"
+                if speed and speed != "N/A":
+                    message += f", {speed.strip()}"
+                print(message)
+    except BaseException:
+        _terminate(process)
+        raise
+    finally:
+        for reader in readers:
+            reader.join(timeout=GRACEFUL_EXIT_TIMEOUT)
+        if process.stdin:
+            process.stdin.close()
+
+    stderr = "\n".join(stderr_tail)
+    if process.returncode == 0:
+        if callback is not None and duration:
+            callback(duration)
+        elif pbar is not None:
+            pbar.update_absolute(1000)
+    elif check:
+        raise FFmpegError(f"{label}失败 (退出码 {process.returncode}): {stderr[-2000:]}",
+                          returncode=process.returncode, stderr=stderr)
+    return FFmpegResult(process.returncode, stderr)
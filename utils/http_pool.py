@@ -0,0 +1,274 @@
+"""
+HTTP 连接池模块 - 按端点主机共享长连接会话
+所有 LLM 请求在共享事件循环上经由同一主机的异步会话发送，TCP/TLS 连接保持复用，避免每条字幕都重新握手；
+默认使用 aiohttp（仅 HTTP/1.1，并发请求数即所需连接数）；安装了 httpx 和 h2 时 HTTPS 端点改用
+HTTP/2，一个连接即可承载全部并发请求
+"""
+
+import os
+import json
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+# 每个主机保持的最大连接数，可通过环境变量 FASTER_WHISPER_HTTP_POOL_SIZE 调整
+DEFAULT_POOL_SIZE = int(os.environ.get("FASTER_WHISPER_HTTP_POOL_SIZE", "32"))
+# 设置 FASTER_WHISPER_HTTP2=0 可禁用 HTTP/2
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.environ.get("FASTER_WHISPER_HTTP2", "1") != "0"
+# 空闲长连接保持时间（秒）
+KEEPALIVE_TIMEOUT = 60
+
+_lock = threading.Lock()
+_pools = {}
+_requested_sizes = {}
+
+
+class HttpResponse:
+    """已读取完毕的响应（与 requests.Response 的常用接口一致）"""
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class StreamResponse:
+    """流式响应：状态码和响应头已就绪，响应体按行异步读取"""
+
+    def __init__(self, status_code, headers, lines, read_text):
+        self.status_code = status_code
+        self.headers = headers
+        self._lines = lines
+        self._read_text = read_text
+
+    def iter_lines(self):
+        """逐行读取响应体（异步迭代器，返回去掉换行符的 str）"""
+        return self._lines()
+
+    async def read_text(self):
+        """读取完整响应体（用于错误状态码）"""
+        return await self._read_text()
+
+
+class _HostPool:
+    """单个主机的异步会话和请求计数（只能在共享事件循环中创建和使用）"""
+
+    def __init__(self, host_key, pool_size, use_http2):
+        self.host_key = host_key
+        self.pool_size = pool_size
+        self.use_http2 = use_http2
+        self.requests = 0
+        self.errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.active = 0
+        self.retired = False
+        # 两种客户端都按环境变量 HTTP(S)_PROXY / NO_PROXY 使用代理（httpx 默认 trust_env=True，
+        # aiohttp 默认忽略，需显式开启），与此前基于 requests 的实现一致
+        if use_http2:
+            self.client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                    keepalive_expiry=KEEPALIVE_TIMEOUT),
+            )
+        else:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_created)
+            trace.on_connection_reuseconn.append(self._on_connection_reused)
+            self.client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=pool_size, limit_per_host=pool_size,
+                                               keepalive_timeout=KEEPALIVE_TIMEOUT),
+                trace_configs=[trace],
+                trust_env=True,
+            )
+
+    async def _on_connection_created(self, session, context, params):
+        self.connections_created += 1
+
+    async def _on_connection_reused(self, session, context, params):
+        self.connections_reused += 1
+
+    async def request(self, method, url, headers=None, json=None, timeout=None):
+        if self.use_http2:
+            response = await self.client.request(method, url, headers=headers, json=json, timeout=timeout)
+            return HttpResponse(response.status_code, response.text, response.headers)
+        async with self.client.request(method, url, headers=headers, json=json,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            text = await response.text(errors="replace")
+            return HttpResponse(response.status, text, response.headers)
+
+    @asynccontextmanager
+    async def stream(self, method, url, headers=None, json=None, timeout=None):
+        # 流式响应持续时间不定，timeout 作为两次收到数据之间的最长间隔
+        if self.use_http2:
+            async with self.client.stream(method, url, headers=headers, json=json, timeout=timeout) as response:
+                async def lines():
+                    async for line in response.aiter_lines():
+                        yield line
+
+                async def read_text():
+                    await response.aread()
+                    return response.text
+
+                yield StreamResponse(response.status_code, response.headers, lines, read_text)
+            return
+        async with self.client.request(method, url, headers=headers, json=json,
+                                       timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout,
+                                                                     sock_read=timeout)) as response:
+            async def lines():
+                async for line in response.content:
+                    yield line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+            async def read_text():
+                return await response.text(errors="replace")
+
+            yield StreamResponse(response.status, response.headers, lines, read_text)
+
+    def connections(self):
+        """已建立的连接数（HTTP/2 无法统计时返回 None）"""
+        if self.use_http2:
+            pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+            connections = getattr(pool, "connections", None)
+            return len(connections) if connections is not None else None
+        return self.connections_created
+
+    async def close(self):
+        try:
+            if self.use_http2:
+                await self.client.aclose()
+            else:
+                await self.client.close()
+        except Exception:
+            pass
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _get_pool(url):
+    """取得（或创建）端点主机的连接池；需要更大的连接数时换新，旧池在其在途请求结束后关闭"""
+    host_key = _host_key(url)
+    with _lock:
+        pool_size = max(DEFAULT_POOL_SIZE, _requested_sizes.get(host_key, 0))
+        pool = _pools.get(host_key)
+        if pool is None or pool.pool_size < pool_size:
+            if pool is not None:
+                pool.retired = True
+                if pool.active == 0:
+                    asyncio.get_running_loop().create_task(pool.close())
+            pool = _HostPool(host_key, pool_size, HTTP2_ENABLED and host_key.startswith("https://"))
+            _pools[host_key] = pool
+        return pool
+
+
+def reserve(url, pool_size):
+    """声明端点主机至少需要 pool_size 个连接（在并发翻译开始前调用，下次请求时生效）"""
+    host_key = _host_key(url)
+    with _lock:
+        _requested_sizes[host_key] = max(_requested_sizes.get(host_key, 0), int(pool_size or 0))
+
+
+async def request(method, url, headers=None, json=None, timeout=None):
+    """
+    经由主机连接池发送请求（须在共享事件循环中调用）
+
+    Returns:
+        HttpResponse（响应体已完整读取）
+    """
+    pool = _get_pool(url)
+    pool.active += 1
+    pool.requests += 1
+    try:
+        return await pool.request(method, url, headers=headers, json=json, timeout=timeout)
+    except Exception:
+        pool.errors += 1
+        raise
+    finally:
+        pool.active -= 1
+        if pool.retired and pool.active == 0:
+            await pool.close()
+
+
+@asynccontextmanager
+async def stream(method, url, headers=None, json=None, timeout=None):
+    """
+    经由主机连接池发送流式请求（须在共享事件循环中调用），用法：
+
+        async with http_pool.stream("POST", url, json=payload) as response:
+            async for line in response.iter_lines(): ...
+
+    timeout 为两次收到数据之间的最长间隔（秒）
+    """
+    pool = _get_pool(url)
+    pool.active += 1
+    pool.requests += 1
+    try:
+        async with pool.stream(method, url, headers=headers, json=json, timeout=timeout) as response:
+            yield response
+    except Exception:
+        pool.errors += 1
+        raise
+    finally:
+        pool.active -= 1
+        if pool.retired and pool.active == 0:
+            await pool.close()
+
+
+async def post(url, headers=None, json=None, timeout=None):
+    """经由主机连接池发送 POST 请求"""
+    return await request("POST", url, headers=headers, json=json, timeout=timeout)
+
+
+async def get(url, headers=None, timeout=None):
+    """经由主机连接池发送 GET 请求"""
+    return await request("GET", url, headers=headers, timeout=timeout)
+
+
+def get_pool_stats():
+    """
+    各主机的连接复用统计
+
+    Returns:
+        {主机: {"protocol", "requests", "errors", "connections", "reused", "reuse_ratio", "pool_size"}}
+    """
+    with _lock:
+        pools = list(_pools.values())
+    stats = {}
+    for pool in pools:
+        connections = pool.connections()
+        stats[pool.host_key] = {
+            "protocol": "HTTP/2" if pool.use_http2 else "HTTP/1.1",
+            "requests": pool.requests,
+            "errors": pool.errors,
+            "connections": connections,
+            "reused": None if pool.use_http2 else pool.connections_reused,
+            "reuse_ratio": round(pool.requests / connections, 1) if connections else None,
+            "pool_size": pool.pool_size,
+        }
+    return stats
+
+
+def log_pool_stats(url):
+    """打印某个端点主机的连接复用情况"""
+    stats = get_pool_stats().get(_host_key(url))
+    if not stats:
+        return
+    connections = stats["connections"] if stats["connections"] is not None else "?"
+    print(f"[FasterWhisper] HTTP 连接复用 {_host_key(url)} ({stats['protocol']}): "
+          f"{stats['requests']} 个请求 / {connections} 个连接")
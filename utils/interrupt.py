@@ -0,0 +1,13 @@
+"""
+中断模块 - 对接 ComfyUI 的中断按钮
+在 ComfyUI 之外运行（如单独调试工具函数）时退化为从不中断
+"""
+
+try:
+    from comfy.model_management import InterruptProcessingException, processing_interrupted
+except ImportError:
+    class InterruptProcessingException(Exception):
+        """ComfyUI 之外运行时的中断异常占位"""
+
+    def processing_interrupted():
+        return False
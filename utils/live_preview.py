@@ -0,0 +1,79 @@
+"""
+实时预览模块 - 翻译过程中把已完成的字幕推送到前端
+流式响应中每条字幕的译文一完成就通过 ComfyUI 的 WebSocket 发给前端，
+文本展示框在整段翻译结束前即可显示进度和部分结果；推送按时间间隔合并，避免消息过多
+"""
+
+import time
+import threading
+
+# 前端监听的事件名
+PREVIEW_EVENT = "faster_whisper.translation_preview"
+# 两次推送的最短间隔（秒）
+PREVIEW_INTERVAL = 0.3
+
+
+def _broadcast(data):
+    """发给当前执行任务的客户端（ComfyUI 未运行时忽略）"""
+    try:
+        from server import PromptServer
+        server = PromptServer.instance
+        server.send_sync(PREVIEW_EVENT, data, getattr(server, "client_id", None))
+    except Exception:
+        pass
+
+
+class LivePreview:
+    """
+    单个节点执行的翻译预览
+
+    Args:
+        node_id: 发起翻译的节点 ID（前端据此找到下游的文本展示框）；为空时不推送
+        sources: 原文列表；流水线模式下识别过程中持续追加
+    """
+
+    def __init__(self, node_id, sources):
+        self.node_id = str(node_id) if node_id is not None else None
+        self.sources = sources
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._translated = set()
+        self._last_sent = 0.0
+        self._send({}, reset=True)
+
+    def update(self, index, text):
+        """第 index 条字幕的译文已完成（可在任意线程调用，同一条可多次更新）"""
+        if self.node_id is None or not text:
+            return
+        with self._lock:
+            self._pending[index] = text
+            self._translated.add(index)
+            if time.monotonic() - self._last_sent < PREVIEW_INTERVAL:
+                return
+            pending, self._pending = self._pending, {}
+        self._send(pending)
+
+    def finish(self):
+        """推送剩余的更新并标记翻译结束"""
+        if self.node_id is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        self._send(pending, done=True)
+
+    def _send(self, pending, reset=False, done=False):
+        if self.node_id is None:
+            return
+        self._last_sent = time.monotonic()
+        total = len(self.sources)
+        _broadcast({
+            "node": self.node_id,
+            "reset": reset,
+            "done": done,
+            "total": total,
+            "translated": len(self._translated),
+            "cues": [
+                [index, self.sources[index] if index < total else "", text]
+                for index, text in sorted(pending.items())
+            ],
+        })
@@ -0,0 +1,105 @@
+"""
+媒体预览模块 - 为视频生成低码率预览代理和封面缩略图
+代理按文件指纹缓存，在后台生成，供节点界面预览时替代原始文件；
+缓存目录有容量上限，超出时按最近使用时间淘汰最旧的预览
+"""
+
+import os
+
+from .paths import get_cache_dir
+from .media_probe import probe_media, file_fingerprint
+from .background_jobs import submit_job, get_job_status
+from .ffmpeg_runner import run_ffmpeg
+from .cache_quota import quota_from_env, evict_lru, touch
+
+# 预览代理的最大高度（像素）
+PREVIEW_HEIGHT = 480
+# 预览缓存容量上限（字节），可通过环境变量 FASTER_WHISPER_PREVIEW_CACHE_GB 调整
+PREVIEW_CACHE_QUOTA_BYTES = quota_from_env("FASTER_WHISPER_PREVIEW_CACHE_GB", "5")
+
+
+def _preview_dir(fingerprint):
+    return get_cache_dir("previews", fingerprint)
+
+
+def get_preview_paths(source_path):
+    """返回预览代理和封面缩略图的缓存路径（文件可能尚未生成）"""
+    preview_dir = _preview_dir(file_fingerprint(source_path))
+    return {
+        "proxy": os.path.join(preview_dir, "proxy.mp4"),
+        "poster": os.path.join(preview_dir, "poster.jpg"),
+    }
+
+
+def _run_ffmpeg(cmd, output_path):
+    """运行 FFmpeg，输出先写入临时文件，成功后再原子替换"""
+    tmp_path = f"{output_path}.tmp{os.path.splitext(output_path)[1]}"
+    # 后台任务不响应节点中断，也不占用当前节点的进度条
+    result = run_ffmpeg(cmd + [tmp_path], label="预览生成", progress=False,
+                        interruptible=False, check=False)
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"FFmpeg 生成预览失败: {result.stderr[-2000:]}")
+    os.replace(tmp_path, output_path)
+
+
+def generate_preview(source_path):
+    """生成预览代理（H.264 480p）和封面缩略图，已存在时跳过"""
+    info = probe_media(source_path)
+    if info["video"] is None:
+        return None
+
+    paths = get_preview_paths(source_path)
+    scale = f"scale=-2:'min({PREVIEW_HEIGHT},ih)'"
+
+    if not os.path.exists(paths["poster"]):
+        poster_time = (info["duration"] or 0) * 0.1
+        _run_ffmpeg([
+            'ffmpeg', '-y', '-v', 'error',
+            '-ss', f"{poster_time:.3f}",
+            '-i', source_path,
+            '-frames:v', '1',
+            '-vf', scale,
+            '-q:v', '4',
+        ], paths["poster"])
+
+    if not os.path.exists(paths["proxy"]):
+        _run_ffmpeg([
+            'ffmpeg', '-y', '-v', 'error',
+            '-i', source_path,
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-vf', scale,
+            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '28',
+            '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', '96k', '-ac', '2',
+            '-movflags', '+faststart',
+        ], paths["proxy"])
+
+    print(f"[FasterWhisper] 预览代理已生成: {os.path.basename(source_path)}")
+    evict_lru(get_cache_dir("previews"), PREVIEW_CACHE_QUOTA_BYTES,
+              keep=[os.path.dirname(paths["proxy"])], label="预览缓存")
+    return paths
+
+
+def mark_preview_used(source_path):
+    """刷新预览的最近使用时间，避免正在使用的预览被优先淘汰"""
+    touch(os.path.dirname(get_preview_paths(source_path)["proxy"]))
+
+
+def schedule_preview(source_path):
+    """在后台排队生成预览（同一文件只生成一次）"""
+    return submit_job(("preview", file_fingerprint(source_path)), generate_preview, source_path)
+
+
+def get_preview_status(source_path):
+    """返回预览生成状态: ready / pending / error / none"""
+    paths = get_preview_paths(source_path)
+    if os.path.exists(paths["proxy"]) and os.path.exists(paths["poster"]):
+        mark_preview_used(source_path)
+        return "ready", None
+    status, error = get_job_status(("preview", file_fingerprint(source_path)))
+    if status == "done":
+        # 任务完成但没有代理文件：纯音频或缓存已被清理
+        return "none", None
+    return status, error
@@ -0,0 +1,460 @@
+"""
+媒体探测模块 - 按文件指纹提取并缓存媒体元数据
+时长、流、编码参数、分辨率、帧率、关键帧索引（含 IDR 标记）和音频布局每个文件只探测一次，
+供媒体加载器、语音识别和视频烧录节点共享，避免重复打开容器
+"""
+
+import os
+import json
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+
+from .paths import get_cache_dir
+
+# 缓存格式版本，结构变化时递增以使旧缓存失效
+PROBE_CACHE_VERSION = 3
+
+# 内存缓存只保留最近使用的条目，其余从磁盘缓存读取
+_MEMORY_CACHE_SIZE = 256
+
+_memory_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_probe_locks = {}
+
+
+class MediaProbeError(RuntimeError):
+    """媒体文件探测失败"""
+
+
+def file_fingerprint(path):
+    """
+    计算文件指纹：内容寻址存储中的文件直接使用内容哈希（同内容不同名共享缓存），
+    其他文件根据真实路径、大小和修改时间计算（不读取文件内容）
+    """
+    from .media_store import get_content_hash
+    content_hash = get_content_hash(path)
+    if content_hash:
+        return content_hash
+
+    st = os.stat(path)
+    raw = f"{os.path.realpath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _fraction_to_float(value):
+    """将 Fraction / "30000/1001" 等帧率表示转换为浮点数"""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, str):
+            if "/" in value:
+                num, den = value.split("/", 1)
+                den = float(den)
+                return float(num) / den if den else None
+            return float(value)
+        return float(value)
+    except (ValueError, ZeroDivisionError, TypeError):
+        return None
+
+
+# FFmpeg 中表示“未指定”的色彩参数取值（PyAV 返回整数，ffprobe 返回名称）
+_UNSPECIFIED_COLORS = {None, 2, "unknown", "unspecified", "reserved"}
+_UNSPECIFIED_RANGES = {None, 0, "unknown", "unspecified"}
+
+
+def _color_value(value, unspecified=_UNSPECIFIED_COLORS):
+    return None if value in unspecified else value
+
+
+def _sar_value(value):
+    """采样宽高比规整为 "num:den"，未知或 0:1 时返回 None"""
+    if value is None:
+        return None
+    text = str(value).replace("/", ":")
+    if ":" not in text:
+        return None
+    num, den = text.split(":", 1)
+    try:
+        if int(num) <= 0 or int(den) <= 0:
+            return None
+    except ValueError:
+        return None
+    return f"{int(num)}:{int(den)}"
+
+
+def _nal_headers(data):
+    """依次返回访问单元中每个 NAL 的首字节，支持 Annex B 起始码和 4 字节长度前缀两种封装"""
+    if data[:3] == b"\x00\x00\x01" or data[:4] == b"\x00\x00\x00\x01":
+        pos = 0
+        while True:
+            pos = data.find(b"\x00\x00\x01", pos)
+            if pos < 0 or pos + 3 >= len(data):
+                return
+            yield data[pos + 3]
+            pos += 3
+    else:
+        pos = 0
+        while pos + 4 < len(data):
+            size = int.from_bytes(data[pos:pos + 4], "big")
+            if size <= 0:
+                return
+            yield data[pos + 4]
+            pos += 4 + size
+
+
+def is_idr_packet(codec, data):
+    """
+    关键帧包是否为 IDR（封闭 GOP 的起点，之后的帧不引用之前的帧）
+    H.264 的恢复点 I 帧和 HEVC 的 CRA/BLA 同样被标记为关键帧，但其后的帧可能引用前一个 GOP
+    """
+    if codec == "h264":
+        return any(header & 0x1F == 5 for header in _nal_headers(data))
+    if codec == "hevc":
+        return any((header >> 1) & 0x3F in (19, 20) for header in _nal_headers(data))
+    return False
+
+
+def _normalize_rotation(value):
+    """将旋转角度（元数据或 display matrix，可能为负数或小数）规整为 0/90/180/270"""
+    try:
+        degrees = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return int(round(degrees / 90.0)) % 4 * 90
+
+
+def display_size(video):
+    """
+    返回视频的显示尺寸 (宽, 高)
+    FFmpeg 默认按旋转元数据自动旋转画面，旋转 90/270 度的视频（如竖拍手机视频）宽高互换
+    """
+    if video.get("rotation", 0) in (90, 270):
+        return video["height"], video["width"]
+    return video["width"], video["height"]
+
+
+def _av_rotation(container, stream):
+    """读取视频流的旋转角度：旧版 FFmpeg 写在 rotate 标签中，新版只在 display matrix 边数据中"""
+    rotate = stream.metadata.get("rotate") if stream.metadata else None
+    if rotate is not None:
+        return _normalize_rotation(rotate)
+    try:
+        container.seek(0, stream=stream)
+        for frame in container.decode(stream):
+            return _normalize_rotation(getattr(frame, "rotation", 0))
+    except Exception:
+        pass
+    return 0
+
+
+def _probe_with_av(path):
+    """使用 PyAV 探测媒体信息，并扫描视频包建立关键帧索引（只解复用，不解码）"""
+    import av
+
+    container = av.open(path)
+    try:
+        start_time = container.start_time / av.time_base if container.start_time else 0.0
+        duration = container.duration / av.time_base if container.duration else None
+
+        info = {
+            "format": container.format.name if container.format else None,
+            "duration": duration,
+            "bit_rate": container.bit_rate or None,
+            "start_time": start_time,
+            "streams": [],
+            "video": None,
+            "audio": None,
+            "keyframes": [],
+            "gop_frame_counts": [],
+            # 可作为无重编码切点的 IDR 关键帧；None 表示未知（不支持的编码或 ffprobe 探测）
+            "idr_keyframes": None,
+        }
+
+        video_stream = None
+        for stream in container.streams:
+            cc = stream.codec_context
+            entry = {
+                "index": stream.index,
+                "type": stream.type,
+                "codec": cc.name if cc is not None else None,
+                "language": stream.metadata.get("language") if stream.metadata else None,
+                "duration": float(stream.duration * stream.time_base) if stream.duration and stream.time_base else None,
+            }
+            if stream.type == "video":
+                rate = stream.average_rate or stream.guessed_rate
+                entry.update({
+                    "width": cc.width,
+                    "height": cc.height,
+                    "fps": _fraction_to_float(rate),
+                    "pix_fmt": getattr(cc, "pix_fmt", None),
+                    "profile": getattr(cc, "profile", None),
+                    "level": getattr(cc, "level", None) if (getattr(cc, "level", None) or 0) > 0 else None,
+                    "color_primaries": _color_value(getattr(cc, "color_primaries", None)),
+                    "color_trc": _color_value(getattr(cc, "color_trc", None)),
+                    "colorspace": _color_value(getattr(cc, "colorspace", None)),
+                    "color_range": _color_value(getattr(cc, "color_range", None), _UNSPECIFIED_RANGES),
+                    "sar": _sar_value(getattr(cc, "sample_aspect_ratio", None)),
+                    "time_base": str(stream.time_base) if stream.time_base else None,
+                    "refs": getattr(cc, "refs", None) or None,
+                    "has_b_frames": getattr(cc, "has_b_frames", None),
+                    "frames": stream.frames or None,
+                })
+                if video_stream is None:
+                    video_stream = stream
+                    info["video"] = entry
+            elif stream.type == "audio":
+                layout = getattr(cc, "layout", None)
+                channels = getattr(layout, "nb_channels", None) or getattr(cc, "channels", None)
+                entry.update({
+                    "sample_rate": cc.sample_rate,
+                    "channels": channels,
+                    "layout": layout.name if layout is not None else None,
+                })
+                if info["audio"] is None:
+                    info["audio"] = entry
+            info["streams"].append(entry)
+
+        if video_stream is not None:
+            stream_start = float(video_stream.start_time * video_stream.time_base) if video_stream.start_time is not None else start_time
+            codec = info["video"]["codec"]
+            keyframes = []
+            gop_counts = []
+            idr_flags = []
+            for packet in container.demux(video_stream):
+                # flush 包没有时间戳
+                if packet.pts is None:
+                    continue
+                if packet.is_keyframe:
+                    keyframes.append(round(float(packet.pts * packet.time_base) - stream_start, 6))
+                    gop_counts.append(0)
+                    idr_flags.append(is_idr_packet(codec, bytes(packet)))
+                if gop_counts:
+                    gop_counts[-1] += 1
+            # 解复用顺序可能与显示顺序不一致，关键帧按时间排序
+            order = sorted(range(len(keyframes)), key=lambda i: keyframes[i])
+            info["keyframes"] = [keyframes[i] for i in order]
+            info["gop_frame_counts"] = [gop_counts[i] for i in order]
+            if codec in ("h264", "hevc"):
+                info["idr_keyframes"] = [keyframes[i] for i in order if idr_flags[i]]
+            info["video"]["rotation"] = _av_rotation(container, video_stream)
+
+        if info["duration"] is None:
+            durations = [s["duration"] for s in info["streams"] if s.get("duration")]
+            info["duration"] = max(durations) if durations else None
+
+        return info
+    finally:
+        container.close()
+
+
+def _ffprobe_rotation(stream):
+    rotate = (stream.get("tags") or {}).get("rotate")
+    if rotate is not None:
+        return _normalize_rotation(rotate)
+    for side_data in stream.get("side_data_list") or []:
+        if "rotation" in side_data:
+            return _normalize_rotation(side_data["rotation"])
+    return 0
+
+
+def _probe_with_ffprobe(path):
+    """PyAV 不可用时使用 ffprobe 探测媒体信息"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_format", "-show_streams",
+        "-of", "json", path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise MediaProbeError(result.stderr.strip() or "ffprobe 返回错误")
+    data = json.loads(result.stdout or "{}")
+    fmt = data.get("format", {})
+    start_time = _fraction_to_float(fmt.get("start_time")) or 0.0
+
+    info = {
+        "format": fmt.get("format_name"),
+        "duration": _fraction_to_float(fmt.get("duration")),
+        "bit_rate": int(fmt["bit_rate"]) if fmt.get("bit_rate") else None,
+        "start_time": start_time,
+        "streams": [],
+        "video": None,
+        "audio": None,
+        "keyframes": [],
+        "gop_frame_counts": [],
+        "idr_keyframes": None,
+    }
+
+    for s in data.get("streams", []):
+        entry = {
+            "index": s.get("index"),
+            "type": s.get("codec_type"),
+            "codec": s.get("codec_name"),
+            "language": (s.get("tags") or {}).get("language"),
+            "duration": _fraction_to_float(s.get("duration")),
+        }
+        if entry["type"] == "video":
+            entry.update({
+                "width": s.get("width"),
+                "height": s.get("height"),
+                "fps": _fraction_to_float(s.get("avg_frame_rate")) or _fraction_to_float(s.get("r_frame_rate")),
+                "pix_fmt": s.get("pix_fmt"),
+                "profile": s.get("profile"),
+                "level": s.get("level") if (s.get("level") or 0) > 0 else None,
+                "color_primaries": _color_value(s.get("color_primaries")),
+                "color_trc": _color_value(s.get("color_transfer")),
+                "colorspace": _color_value(s.get("color_space")),
+                "color_range": _color_value(s.get("color_range"), _UNSPECIFIED_RANGES),
+                "sar": _sar_value(s.get("sample_aspect_ratio")),
+                "time_base": s.get("time_base"),
+                "refs": s.get("refs") or None,
+                "has_b_frames": s.get("has_b_frames"),
+                "frames": int(s["nb_frames"]) if s.get("nb_frames") else None,
+                "rotation": _ffprobe_rotation(s),
+            })
+            if info["video"] is None:
+                info["video"] = entry
+        elif entry["type"] == "audio":
+            entry.update({
+                "sample_rate": int(s["sample_rate"]) if s.get("sample_rate") else None,
+                "channels": s.get("channels"),
+                "layout": s.get("channel_layout"),
+            })
+            if info["audio"] is None:
+                info["audio"] = entry
+        info["streams"].append(entry)
+
+    if info["video"] is not None:
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0", path,
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+        if result.returncode == 0:
+            keyframes = []
+            gop_counts = []
+            for line in result.stdout.splitlines():
+                parts = line.strip().split(",")
+                pts_time = _fraction_to_float(parts[0]) if parts and parts[0] != "N/A" else None
+                if pts_time is None:
+                    continue
+                if len(parts) > 1 and "K" in parts[1]:
+                    keyframes.append(round(pts_time - start_time, 6))
+                    gop_counts.append(0)
+                if gop_counts:
+                    gop_counts[-1] += 1
+            order = sorted(range(len(keyframes)), key=lambda i: keyframes[i])
+            info["keyframes"] = [keyframes[i] for i in order]
+            info["gop_frame_counts"] = [gop_counts[i] for i in order]
+
+    return info
+
+
+def _probe_cache_path(fingerprint):
+    return os.path.join(get_cache_dir("media_probe"), f"{fingerprint}.json")
+
+
+def _remember(fingerprint, info):
+    """写入内存缓存，超出上限时淘汰最久未使用的条目（调用方持有 _cache_lock）"""
+    _memory_cache[fingerprint] = info
+    _memory_cache.move_to_end(fingerprint)
+    while len(_memory_cache) > _MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+def _load_cached(fingerprint):
+    with _cache_lock:
+        info = _memory_cache.get(fingerprint)
+        if info is not None:
+            _memory_cache.move_to_end(fingerprint)
+            return info
+
+    cache_path = _probe_cache_path(fingerprint)
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            if info.get("cache_version") == PROBE_CACHE_VERSION:
+                with _cache_lock:
+                    _remember(fingerprint, info)
+                return info
+        except Exception:
+            pass
+    return None
+
+
+def _store_cached(fingerprint, info):
+    with _cache_lock:
+        _remember(fingerprint, info)
+
+    cache_path = _probe_cache_path(fingerprint)
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"[FasterWhisper] 写入媒体探测缓存失败: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def probe_media(path):
+    """
+    探测媒体文件元数据（按文件指纹缓存）
+
+    Returns:
+        dict: duration、streams、video（编码宽高/旋转角度/帧率/编码）、audio（采样率/声道布局）、
+              keyframes（相对文件起点的关键帧时间，秒）、gop_frame_counts（每个 GOP 的帧数）、
+              idr_keyframes（其中的 IDR 关键帧，未知时为 None）
+
+    Raises:
+        MediaProbeError: 文件不存在或无法解析
+    """
+    if not path or not os.path.exists(path):
+        raise MediaProbeError(f"媒体文件不存在: {path}")
+
+    fingerprint = file_fingerprint(path)
+    info = _load_cached(fingerprint)
+    if info is not None:
+        return info
+
+    # 同一文件的并发探测只执行一次
+    with _cache_lock:
+        lock = _probe_locks.setdefault(fingerprint, threading.Lock())
+
+    try:
+        with lock:
+            info = _load_cached(fingerprint)
+            if info is not None:
+                return info
+
+            try:
+                try:
+                    info = _probe_with_av(path)
+                except ImportError:
+                    info = _probe_with_ffprobe(path)
+            except MediaProbeError:
+                raise
+            except FileNotFoundError:
+                raise MediaProbeError("无法探测媒体文件: 未安装 PyAV，且 ffprobe 不在 PATH 中")
+            except Exception as e:
+                raise MediaProbeError(f"无法探测媒体文件 {os.path.basename(path)}: {e}")
+
+            if info["video"] is None and info["audio"] is None:
+                raise MediaProbeError(f"媒体文件中没有可用的音视频流: {os.path.basename(path)}")
+
+            info["fingerprint"] = fingerprint
+            info["cache_version"] = PROBE_CACHE_VERSION
+            _store_cached(fingerprint, info)
+    finally:
+        # 探测失败时也移除锁，避免坏文件的锁永久留在字典中
+        with _cache_lock:
+            _probe_locks.pop(fingerprint, None)
+
+    print(f"[FasterWhisper] 媒体探测完成: {os.path.basename(path)} "
+          f"(时长 {info['duration'] or 0:.1f}s, 关键帧 {len(info['keyframes'])} 个)")
+    return info
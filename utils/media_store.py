@@ -0,0 +1,202 @@
+"""
+内容寻址媒体存储 - 上传内容按 SHA-256 只存储一份
+用户可见的文件名是指向 blob 的硬链接（不支持时使用符号链接，两者都不支持才复制），索引记录名称与内容哈希的对应关系，
+删除文件名时按引用计数决定是否释放 blob
+"""
+
+import os
+import json
+import shutil
+import threading
+
+from .paths import get_media_input_dir
+
+_store_lock = threading.RLock()
+# 索引文件内容缓存: ((修改时间, 大小, inode), 名称映射)
+_index_cache = (None, {})
+
+
+def _blob_root():
+    return os.path.join(get_media_input_dir(), ".blobs")
+
+
+def _index_path():
+    return os.path.join(_blob_root(), "index.json")
+
+
+def get_blob_path(sha256):
+    """返回内容哈希对应的 blob 路径（两级目录分散存放）"""
+    return os.path.join(_blob_root(), sha256[:2], sha256)
+
+
+def _index_signature(st):
+    # 每次保存都 os.replace 为新文件，inode 随之变化；时间戳精度较粗时也能识别
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _load_index():
+    """读取名称索引（按索引文件的修改时间、大小和 inode 缓存，返回可修改的副本）"""
+    global _index_cache
+    path = _index_path()
+    try:
+        signature = _index_signature(os.stat(path))
+    except OSError:
+        return {}
+    if _index_cache[0] != signature:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                _index_cache = (signature, json.load(f).get("names", {}))
+        except Exception as e:
+            print(f"[FasterWhisper] 读取媒体索引失败: {e}")
+            return {}
+    return dict(_index_cache[1])
+
+
+def _save_index(names):
+    global _index_cache
+    path = _index_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"names": names}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    # 直接以保存的内容更新缓存，不依赖文件时间戳判断是否变化
+    _index_cache = (_index_signature(os.stat(path)), dict(names))
+
+
+def _link_blob(blob_path, target_path):
+    """
+    为 blob 创建用户可见文件名：优先硬链接，不支持时用符号链接指向 blob，两者都失败才复制
+    先写到同目录临时名再原子替换，目标可以是已预留的占位文件
+
+    Returns:
+        "hardlink" / "symlink" / "copy"
+    """
+    tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(blob_path, tmp_path)
+        mode = "hardlink"
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(blob_path), tmp_path)
+            mode = "symlink"
+        except OSError:
+            shutil.copy2(blob_path, tmp_path)
+            mode = "copy"
+            print(f"[FasterWhisper] 警告: 文件系统不支持硬链接和符号链接，"
+                  f"{os.path.basename(target_path)} 将占用独立的存储空间")
+    os.replace(tmp_path, target_path)
+    return mode
+
+
+def _stat_entry(path, sha256):
+    st = os.stat(path)
+    return {"sha256": sha256, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def ingest_file(tmp_path, sha256, filename, unique_name):
+    """
+    将已完整写入并计算过哈希的临时文件存入内容寻址存储
+
+    Args:
+        tmp_path: 临时文件（与媒体目录同一文件系统）
+        sha256: 文件内容的 SHA-256
+        filename: 期望的用户可见文件名
+        unique_name: 名称冲突时生成不重复名称的函数
+
+    Returns:
+        (最终文件名, 是否与已有内容重复)
+    """
+    media_dir = get_media_input_dir()
+    blob_path = get_blob_path(sha256)
+
+    with _store_lock:
+        names = _load_index()
+
+        # 同名且内容相同：直接复用已有文件
+        existing = names.get(filename)
+        if existing and existing["sha256"] == sha256 and os.path.exists(os.path.join(media_dir, filename)):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return filename, True
+
+        duplicate = os.path.exists(blob_path)
+        if duplicate:
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(tmp_path, blob_path)
+
+        final_name = unique_name(filename)
+        final_path = os.path.join(media_dir, final_name)
+        try:
+            _link_blob(blob_path, final_path)
+        except BaseException:
+            # 链接失败时移除预留的占位文件
+            if os.path.exists(final_path) and os.path.getsize(final_path) == 0:
+                os.remove(final_path)
+            raise
+
+        names[final_name] = _stat_entry(final_path, sha256)
+        _save_index(names)
+
+    if duplicate:
+        print(f"[FasterWhisper] 内容已存在，复用存储: {final_name} -> {sha256[:12]}")
+    return final_name, duplicate
+
+
+def remove_name(filename):
+    """
+    删除用户可见文件名；仅当没有其他名称引用同一内容时才删除 blob
+
+    Returns:
+        释放的字节数（仍被引用时为 0）
+    """
+    media_dir = get_media_input_dir()
+    file_path = os.path.join(media_dir, filename)
+
+    with _store_lock:
+        names = _load_index()
+        entry = names.pop(filename, None)
+
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+        if entry is None:
+            return 0
+
+        _save_index(names)
+        sha256 = entry["sha256"]
+        if any(e["sha256"] == sha256 for e in names.values()):
+            return 0
+
+        blob_path = get_blob_path(sha256)
+        if os.path.exists(blob_path):
+            size = os.path.getsize(blob_path)
+            os.remove(blob_path)
+            return size
+    return 0
+
+
+def get_content_hash(path):
+    """
+    返回存储中文件的内容哈希；文件不在存储中或已被外部修改时返回 None
+    （大小和修改时间与索引记录一致才认为有效）
+    """
+    media_dir = os.path.abspath(get_media_input_dir())
+    abs_path = os.path.abspath(path)
+    if os.path.dirname(abs_path) != media_dir:
+        return None
+
+    with _store_lock:
+        entry = _load_index().get(os.path.basename(abs_path))
+    if entry is None:
+        return None
+
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        return None
+    if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+        return None
+    return entry["sha256"]
@@ -80,3 +80,13 @@ def get_media_input_dir():
     media_dir = os.path.join(input_dir, "media")
     ensure_dir(media_dir)
     return media_dir
+
+
+def get_cache_dir(*parts):
+    """获取插件持久缓存目录（位于 ComfyUI 用户目录下，重启后保留）"""
+    try:
+        import folder_paths
+        base_dir = folder_paths.get_user_directory()
+    except (ImportError, AttributeError):
+        base_dir = os.path.join(get_comfyui_path(), "user")
+    return ensure_dir(os.path.join(base_dir, "faster_whisper_cache", *parts))
@@ -0,0 +1,176 @@
+"""
+限流模块 - 按提供商限制大模型请求速率，并根据限流响应自适应调整并发
+每个端点（主机 + 密钥 + 模型）一个限流器：令牌桶限制每分钟请求数（RPM）和每分钟 token 数（TPM），
+并发上限按 AIMD 调整（成功时缓慢增加，收到 429 时减半并按 Retry-After 暂停所有请求）；
+所有状态只在共享事件循环中访问
+"""
+
+import time
+import random
+import asyncio
+import hashlib
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# 按 Retry-After 或退避等待后可以重试的 HTTP 状态码
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+# 指数退避的基数和上限（秒），实际等待时间在 [0, 上限] 内随机（full jitter）
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# Retry-After 超过该秒数时按该值等待
+RETRY_AFTER_MAX = 300.0
+
+_limiters = {}
+
+
+def parse_retry_after(headers):
+    """
+    解析 Retry-After（秒数或 HTTP 日期）和 retry-after-ms 响应头
+
+    Returns:
+        等待秒数；没有该响应头时返回 None
+    """
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return min(float(value) / 1000, RETRY_AFTER_MAX)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return min(max(float(value), 0.0), RETRY_AFTER_MAX)
+    except ValueError:
+        pass
+    try:
+        return min(max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0), RETRY_AFTER_MAX)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """第 attempt 次重试（从 0 开始）的随机退避时间"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def is_retryable(exc):
+    """网络错误、超时和 RETRYABLE_STATUS 中的状态码可以重试"""
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    # aiohttp / httpx 的网络异常
+    module = type(exc).__module__ or ""
+    return module.startswith(("aiohttp", "httpx", "httpcore"))
+
+
+class RateLimiter:
+    """
+    单个端点的限流器
+
+    - RPM / TPM 两个令牌桶（0 表示不限制），容量为一分钟的额度
+    - 并发上限 AIMD：每完成约 limit 个请求加 1，收到限流时减半
+    """
+
+    def __init__(self, rpm=0, tpm=0, max_concurrency=1):
+        self.rpm = 0
+        self.tpm = 0
+        self.max_concurrency = 1
+        self.limit = 1.0
+        self.request_bucket = 0.0
+        self.token_bucket = 0.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.active = 0
+        self.throttled = 0
+        self._condition = asyncio.Condition()
+        self.configure(rpm, tpm, max_concurrency)
+
+    def configure(self, rpm, tpm, max_concurrency):
+        """更新限额（同一端点被不同配置使用时以最新配置为准）"""
+        rpm, tpm, max_concurrency = int(rpm or 0), int(tpm or 0), max(1, int(max_concurrency or 1))
+        if rpm != self.rpm:
+            self.rpm = rpm
+            self.request_bucket = float(rpm)
+        if tpm != self.tpm:
+            self.tpm = tpm
+            self.token_bucket = float(tpm)
+        if max_concurrency != self.max_concurrency:
+            self.max_concurrency = max_concurrency
+            self.limit = float(max_concurrency)
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.request_bucket = min(self.rpm, self.request_bucket + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.token_bucket = min(self.tpm, self.token_bucket + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens):
+        """等待 RPM / TPM 额度和限流暂停结束，然后扣除本次请求的额度"""
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill(now)
+            # 单个请求超过整分钟额度时按桶满放行，避免永远等待
+            need = min(tokens, self.tpm) if self.tpm else 0
+            wait = 0.0
+            if self.rpm and self.request_bucket < 1:
+                wait = (1 - self.request_bucket) * 60 / self.rpm
+            if self.tpm and self.token_bucket < need:
+                wait = max(wait, (need - self.token_bucket) * 60 / self.tpm)
+            if wait <= 0:
+                if self.rpm:
+                    self.request_bucket -= 1
+                if self.tpm:
+                    self.token_bucket -= need
+                return
+            await asyncio.sleep(wait)
+
+    async def enter(self):
+        """占用一个并发名额（超过当前 AIMD 上限时等待）"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < max(1, int(self.limit)))
+            self.active += 1
+
+    async def leave(self):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        """加性增：每完成约 limit 个请求，并发上限加 1"""
+        if self.limit < self.max_concurrency:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def on_throttle(self, delay):
+        """乘性减：并发上限减半，并让该端点的所有请求暂停 delay 秒"""
+        self.throttled += 1
+        self.limit = max(1.0, self.limit / 2)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+
+def get_limiter(config):
+    """
+    取得配置对应端点的限流器（须在共享事件循环中调用）
+    端点由 API 主机、密钥哈希和模型名确定，同一账号下的并发任务共享额度
+    """
+    api_key = config.get("api_key", "") or ""
+    key = (
+        urlsplit(config.get("api_url", "") or "").netloc.lower(),
+        hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12],
+        config.get("model_name", ""),
+    )
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = RateLimiter()
+        _limiters[key] = limiter
+    limiter.configure(config.get("rpm_limit", 0), config.get("tpm_limit", 0), config.get("max_concurrency", 1))
+    return limiter
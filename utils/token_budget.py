@@ -0,0 +1,102 @@
+"""
+Token 预算模块 - 按模型的上下文和输出上限把字幕装箱成批量请求
+固定条数分批在两头都不合适：短句浪费请求次数，长句容易超出 max_tokens 导致译文被截断；
+这里用字符数快速估算 token（不依赖具体模型的分词器），按输入和输出预算尽量装满每个请求
+"""
+
+import math
+
+# 未设置 context_window 时按 API 类型采用的上下文长度（Ollama 未指定 num_ctx 时默认 2048）
+DEFAULT_CONTEXT_WINDOWS = {
+    "Ollama": 2048,
+}
+DEFAULT_CONTEXT_WINDOW = 32768
+# 系统提示词和批量指令预留的 token 数
+PROMPT_OVERHEAD_TOKENS = 256
+# 每条字幕的编号（“[12] ”）和换行占用的 token 数
+CUE_OVERHEAD_TOKENS = 4
+# 译文 token 数相对原文的估算倍数（译成中日韩文或从中日韩文译出时差异较大，按偏大估计）
+OUTPUT_EXPANSION = 2.0
+# 输出只用到 max_tokens 的该比例，给估算误差留出余量
+OUTPUT_SAFETY_RATIO = 0.8
+# 输入预算的下限，避免上下文设置过小时每批只能放一条
+MIN_INPUT_BUDGET = 256
+
+
+def _is_cjk(ch):
+    code = ord(ch)
+    return (
+        0x2E80 <= code <= 0x9FFF        # 中日韩部首、假名、汉字
+        or 0xAC00 <= code <= 0xD7AF     # 韩文音节
+        or 0xF900 <= code <= 0xFAFF     # 兼容汉字
+        or 0xFF00 <= code <= 0xFFEF     # 全角字符
+        or 0x20000 <= code <= 0x2FFFF   # 扩展汉字
+    )
+
+
+def estimate_tokens(text):
+    """
+    快速估算文本的 token 数：中日韩字符约 1 token/字，其余约 4 字符/token
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+class BatchBudget:
+    """
+    按 LLM 配置计算每个请求的预算并装箱
+
+    - 输入预算 = 上下文长度 - max_tokens - 提示词预留
+    - 输出预算 = max_tokens × OUTPUT_SAFETY_RATIO
+    - 每批条数不超过 batch_size
+    """
+
+    def __init__(self, config):
+        self.max_items = max(1, int(config.get("batch_size", 10) or 1))
+        max_tokens = max(1, int(config.get("max_tokens", 1024) or 1024))
+        context_window = int(config.get("context_window", 0) or 0)
+        if context_window <= 0:
+            context_window = DEFAULT_CONTEXT_WINDOWS.get(config.get("api_type"), DEFAULT_CONTEXT_WINDOW)
+        self.context_window = context_window
+        self.input_budget = max(MIN_INPUT_BUDGET, context_window - max_tokens - PROMPT_OVERHEAD_TOKENS)
+        self.output_budget = max(1, int(max_tokens * OUTPUT_SAFETY_RATIO))
+
+    def cost(self, text):
+        """单条字幕估算占用的 (输入, 输出) token 数"""
+        tokens = estimate_tokens(text)
+        return tokens + CUE_OVERHEAD_TOKENS, math.ceil(tokens * OUTPUT_EXPANSION) + CUE_OVERHEAD_TOKENS
+
+    def fits(self, used, cost, count):
+        """已有 count 条、占用 used 的批次能否再放入一条 cost 的字幕"""
+        return (
+            count < self.max_items
+            and used[0] + cost[0] <= self.input_budget
+            and used[1] + cost[1] <= self.output_budget
+        )
+
+    def pack(self, texts):
+        """
+        按顺序把字幕装箱
+
+        Returns:
+            批次列表（每批是 texts 中连续的一段）；单条超出预算的字幕单独成批
+        """
+        batches = []
+        current = []
+        used = (0, 0)
+        for text in texts:
+            cost = self.cost(text)
+            if current and not self.fits(used, cost, len(current)):
+                batches.append(current)
+                current, used = [], (0, 0)
+            current.append(text)
+            used = (used[0] + cost[0], used[1] + cost[1])
+        if current:
+            batches.append(current)
+        return batches
+
+    def describe(self):
+        return (f"每批最多 {self.max_items} 条，输入预算 {self.input_budget} / "
+                f"输出预算 {self.output_budget} tokens")
@@ -0,0 +1,74 @@
+"""
+并发翻译执行模块 - 在共享事件循环上以有限并发执行翻译请求
+翻译主要耗时在网络往返上，多个请求同时在途即可成倍缩短总时长；
+所有请求以协程形式复用一个事件循环线程，结果按提交顺序重新排列，进度汇总到同一个进度条
+"""
+
+import time
+import asyncio
+
+# 未配置时同时在途的请求数
+DEFAULT_MAX_IN_FLIGHT = 4
+# 进度日志打印间隔（秒）
+PROGRESS_LOG_INTERVAL = 5
+
+
+async def gather_ordered(func, items, max_in_flight=DEFAULT_MAX_IN_FLIGHT, label="翻译", weights=None, unit="条"):
+    """
+    以最多 max_in_flight 个并发执行协程函数 func(item)，按 items 的顺序返回结果
+
+    Args:
+        func: 处理单个任务的协程函数；抛出异常时取消其余任务并向上抛出
+        items: 任务列表
+        max_in_flight: 同时在途的任务数上限
+        label: 日志前缀
+        weights: 每个任务在进度中所占的量（如每批的字幕条数），默认每个任务为 1
+        unit: 进度日志中的单位
+
+    外层 Future 被取消（如用户点击中断）时，所有在途请求随之取消
+    """
+    items = list(items)
+    if not items:
+        return []
+    weights = list(weights) if weights is not None else [1] * len(items)
+    total = sum(weights)
+    limit = max(1, min(int(max_in_flight or 1), len(items)))
+    semaphore = asyncio.Semaphore(limit)
+
+    pbar = None
+    try:
+        import comfy.utils
+        pbar = comfy.utils.ProgressBar(total)
+    except ImportError:
+        pass
+
+    progress = {"done": 0, "last_log": time.monotonic()}
+    started = time.monotonic()
+
+    async def run(i):
+        async with semaphore:
+            result = await func(items[i])
+        progress["done"] += weights[i]
+        done = progress["done"]
+        if pbar is not None:
+            pbar.update_absolute(done, total)
+        now = time.monotonic()
+        if now - progress["last_log"] >= PROGRESS_LOG_INTERVAL or done == total:
+            progress["last_log"] = now
+            elapsed = now - started
+            rate = done / elapsed if elapsed > 0 else 0
+            print(f"[FasterWhisper] {label}进度: {done}/{total} {unit} "
+                  f"({done * 100 // total}%), {rate:.1f} {unit}/秒")
+        return result
+
+    tasks = [asyncio.ensure_future(run(i)) for i in range(len(items))]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    print(f"[FasterWhisper] {label}完成: {total} {unit}, 并发 {limit}, "
+          f"用时 {time.monotonic() - started:.1f} 秒")
+    return results
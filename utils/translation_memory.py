@@ -0,0 +1,258 @@
+"""
+翻译记忆模块 - 用 SQLite 持久保存已翻译的字幕
+键由规范化的原文、目标语言、提供商、模型、系统提示词哈希和温度计算，
+完全相同的请求直接使用本地结果；并发任务中相同的条目只请求一次，其余等待其结果；
+数据库有容量上限，超出时按最近使用时间淘汰
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from concurrent.futures import Future
+
+from .paths import get_cache_dir
+
+# 翻译记忆容量上限（字节，按原文和译文的 UTF-8 长度计），可通过环境变量 FASTER_WHISPER_TM_MB 调整
+TM_QUOTA_BYTES = int(float(os.environ.get("FASTER_WHISPER_TM_MB", "200")) * 1024 ** 2)
+# 超出上限时淘汰到上限的该比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+# 等待其他任务翻译同一条目的最长时间（秒）
+SINGLE_FLIGHT_TIMEOUT = 600
+
+_db_lock = threading.Lock()
+_connection = None
+
+_inflight_lock = threading.Lock()
+_inflight = {}
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "shared": 0, "stored": 0, "evicted": 0}
+
+
+def _db_path():
+    return os.path.join(get_cache_dir("translation_memory"), "memory.sqlite3")
+
+
+def _get_connection():
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(_db_path(), check_same_thread=False, timeout=30)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+        _connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                target_language TEXT,
+                model TEXT,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        _connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        _connection.commit()
+    return _connection
+
+
+def normalize_text(text):
+    """规范化原文：Unicode NFKC、合并空白，作为缓存键的一部分"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def memory_scope(config, target_language):
+    """
+    与原文无关的键部分：目标语言、提供商、模型、系统提示词哈希和温度
+    """
+    system_prompt = config.get("system_prompt", "") or ""
+    return {
+        "target_language": target_language,
+        "provider": config.get("provider") or config.get("api_type", ""),
+        "model": config.get("model_name", ""),
+        "system_prompt": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16],
+        "temperature": round(float(config.get("temperature", 0.3)), 3),
+    }
+
+
+def memory_key(scope, text):
+    """计算单条字幕的翻译记忆键"""
+    payload = dict(scope, text=normalize_text(text))
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def lookup(keys):
+    """
+    批量查询翻译记忆，命中的条目刷新最近使用时间
+
+    Returns:
+        {键: 译文}（只包含命中的键）
+    """
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    with _db_lock:
+        conn = _get_connection()
+        # SQLite 单条语句的参数个数有限，分组查询
+        for start in range(0, len(keys), 500):
+            group = keys[start:start + 500]
+            placeholders = ",".join("?" * len(group))
+            rows = conn.execute(
+                f"SELECT key, translation FROM entries WHERE key IN ({placeholders})", group
+            ).fetchall()
+            found.update(rows)
+        if found:
+            now = time.time()
+            conn.executemany(
+                "UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            conn.commit()
+    with _stats_lock:
+        _stats["hits"] += len(found)
+        _stats["misses"] += len(keys) - len(found)
+    return found
+
+
+def store(entries, scope):
+    """
+    写入翻译结果并按容量上限淘汰
+
+    Args:
+        entries: [(键, 原文, 译文), ...]
+        scope: memory_scope 返回的键信息（记录语言和模型便于查看）
+    """
+    if not entries:
+        return
+    now = time.time()
+    rows = [
+        (key, source, translation, scope["target_language"], scope["model"],
+         len(source.encode("utf-8")) + len(translation.encode("utf-8")), now, now)
+        for key, source, translation in entries
+    ]
+    with _db_lock:
+        conn = _get_connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO entries (key, source, translation, target_language, model, size, created, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        evicted = _evict(conn)
+    with _stats_lock:
+        _stats["stored"] += len(rows)
+        _stats["evicted"] += evicted
+
+
+def _evict(conn):
+    """总大小超过上限时删除最久未使用的条目，返回删除的条数"""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= TM_QUOTA_BYTES:
+        return 0
+
+    target = int(TM_QUOTA_BYTES * EVICT_TARGET_RATIO)
+    removed = []
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+        if total <= target:
+            break
+        removed.append((key,))
+        total -= size
+    conn.executemany("DELETE FROM entries WHERE key = ?", removed)
+    conn.commit()
+    print(f"[FasterWhisper] 翻译记忆超出上限，已淘汰 {len(removed)} 条")
+    return len(removed)
+
+
+def claim(keys):
+    """
+    单飞（single-flight）：为尚未有人在翻译的键登记本任务为负责人
+
+    Returns:
+        (owned, waiting)
+        owned: 本任务负责翻译的键列表，完成后必须调用 resolve / release
+        waiting: {键: Future}，其他任务正在翻译的键，等待其结果即可
+    """
+    owned = []
+    waiting = {}
+    with _inflight_lock:
+        for key in dict.fromkeys(keys):
+            future = _inflight.get(key)
+            if future is None:
+                _inflight[key] = Future()
+                owned.append(key)
+            else:
+                waiting[key] = future
+    if waiting:
+        with _stats_lock:
+            _stats["shared"] += len(waiting)
+    return owned, waiting
+
+
+def resolve(results):
+    """发布本任务负责的键的译文（{键: 译文}），唤醒等待的任务"""
+    with _inflight_lock:
+        futures = [(_inflight.pop(key, None), value) for key, value in results.items()]
+    for future, value in futures:
+        if future is not None and not future.done():
+            future.set_result(value)
+
+
+def release(keys):
+    """放弃本任务负责但未能翻译的键，等待的任务将自行请求"""
+    with _inflight_lock:
+        futures = [_inflight.pop(key, None) for key in keys]
+    for future in futures:
+        if future is not None and not future.done():
+            future.set_result(None)
+
+
+async def wait_shared(waiting):
+    """
+    等待其他任务翻译的键（协程）
+
+    Returns:
+        {键: 译文}；对方失败或超时的键不包含在内
+    """
+    results = {}
+    for key, future in waiting.items():
+        try:
+            # shield：超时只放弃等待，不取消其他任务共享的 Future
+            value = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), SINGLE_FLIGHT_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            value = None
+        if value is not None:
+            results[key] = value
+    return results
+
+
+def get_stats():
+    """翻译记忆统计：条目数、占用大小、本进程的命中率等"""
+    with _db_lock:
+        conn = _get_connection()
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats.update({
+        "entries": entries,
+        "size": size,
+        "quota": TM_QUOTA_BYTES,
+        "hit_rate": round(stats["hits"] / lookups, 3) if lookups else None,
+    })
+    return stats
+
+
+def clear():
+    """清空翻译记忆"""
+    with _db_lock:
+        conn = _get_connection()
+        conn.execute("DELETE FROM entries")
+        conn.commit()
+        conn.execute("VACUUM")
@@ -0,0 +1,151 @@
+"""
+波形峰值模块 - 为音频预览预计算多分辨率 min/max 峰值
+在 16 kHz 单声道 PCM 上做 NumPy 向量化归约，按文件指纹缓存为紧凑二进制；
+缓存目录有容量上限，超出时按最近使用时间淘汰最旧的峰值文件
+
+二进制格式（小端）:
+    头部:   b"FWPK" | uint16 版本 | uint16 保留 | uint32 采样率 | uint64 总采样数 | uint32 层数
+    层索引: 每层 uint32 每峰值采样数 | uint32 峰值个数
+    数据:   按层依次存放 int8 [min, max] 交错数组
+"""
+
+import os
+import struct
+
+import numpy as np
+
+from .paths import get_cache_dir
+from .media_probe import file_fingerprint
+from .background_jobs import submit_job, get_job_status
+from .cache_quota import quota_from_env, evict_lru, touch
+
+WAVEFORM_MAGIC = b"FWPK"
+WAVEFORM_VERSION = 1
+WAVEFORM_SAMPLE_RATE = 16000
+# 最细层每个峰值覆盖 64 个采样（4 ms），逐层 4 倍合并
+BASE_SAMPLES_PER_PEAK = 64
+LEVEL_FACTOR = 4
+LEVEL_COUNT = 5
+# 波形缓存容量上限（字节），可通过环境变量 FASTER_WHISPER_WAVEFORM_CACHE_MB 调整
+WAVEFORM_CACHE_QUOTA_BYTES = quota_from_env("FASTER_WHISPER_WAVEFORM_CACHE_MB", "500", unit=1024 ** 2)
+
+
+def get_waveform_path(source_path):
+    """返回波形峰值缓存文件路径（文件可能尚未生成）"""
+    return os.path.join(get_cache_dir("waveforms"), f"{file_fingerprint(source_path)}.peaks")
+
+
+def _iter_pcm_blocks(source_path):
+    """以 int16 数组块的形式流式解码 16 kHz 单声道 PCM"""
+    import av
+
+    container = av.open(source_path)
+    try:
+        if not container.streams.audio:
+            raise ValueError("文件中没有音频轨道")
+        audio_stream = container.streams.audio[0]
+        resampler = av.audio.resampler.AudioResampler(format='s16', layout='mono', rate=WAVEFORM_SAMPLE_RATE)
+        for frame in container.decode(audio_stream):
+            frame.pts = None
+            for resampled in resampler.resample(frame):
+                yield resampled.to_ndarray().reshape(-1)
+        for resampled in resampler.resample(None):
+            yield resampled.to_ndarray().reshape(-1)
+    finally:
+        container.close()
+
+
+def _reduce_level(mins, maxs, factor):
+    """将上一层峰值按 factor 合并为更粗的一层，末尾不足一组的部分单独归约"""
+    full = len(mins) // factor * factor
+    level_min = mins[:full].reshape(-1, factor).min(axis=1)
+    level_max = maxs[:full].reshape(-1, factor).max(axis=1)
+    if full < len(mins):
+        level_min = np.append(level_min, mins[full:].min())
+        level_max = np.append(level_max, maxs[full:].max())
+    return level_min, level_max
+
+
+def compute_peaks(source_path):
+    """计算多分辨率峰值，返回 (总采样数, [(每峰值采样数, mins, maxs), ...])"""
+    spp = BASE_SAMPLES_PER_PEAK
+    min_parts = []
+    max_parts = []
+    remainder = np.empty(0, dtype=np.int16)
+    total_samples = 0
+
+    for block in _iter_pcm_blocks(source_path):
+        total_samples += len(block)
+        data = np.concatenate((remainder, block)) if len(remainder) else block
+        full = len(data) // spp * spp
+        if full:
+            frames = data[:full].reshape(-1, spp)
+            min_parts.append(frames.min(axis=1))
+            max_parts.append(frames.max(axis=1))
+        remainder = data[full:]
+
+    if len(remainder):
+        min_parts.append(np.array([remainder.min()], dtype=np.int16))
+        max_parts.append(np.array([remainder.max()], dtype=np.int16))
+
+    mins = np.concatenate(min_parts) if min_parts else np.zeros(0, dtype=np.int16)
+    maxs = np.concatenate(max_parts) if max_parts else np.zeros(0, dtype=np.int16)
+
+    levels = [(spp, mins, maxs)]
+    for _ in range(LEVEL_COUNT - 1):
+        if len(mins) <= 1:
+            break
+        spp *= LEVEL_FACTOR
+        mins, maxs = _reduce_level(mins, maxs, LEVEL_FACTOR)
+        levels.append((spp, mins, maxs))
+    return total_samples, levels
+
+
+def _encode_peaks(total_samples, levels):
+    header = struct.pack("<4sHHIQI", WAVEFORM_MAGIC, WAVEFORM_VERSION, 0,
+                         WAVEFORM_SAMPLE_RATE, total_samples, len(levels))
+    index = b"".join(struct.pack("<II", spp, len(mins)) for spp, mins, _ in levels)
+    data = []
+    for _, mins, maxs in levels:
+        # int16 -> int8，交错存放 min/max
+        pairs = np.empty(len(mins) * 2, dtype=np.int8)
+        pairs[0::2] = (mins >> 8).astype(np.int8)
+        pairs[1::2] = (maxs >> 8).astype(np.int8)
+        data.append(pairs.tobytes())
+    return header + index + b"".join(data)
+
+
+def generate_waveform(source_path):
+    """计算并缓存波形峰值文件，已存在时跳过"""
+    output_path = get_waveform_path(source_path)
+    if os.path.exists(output_path):
+        touch(output_path)
+        return output_path
+
+    total_samples, levels = compute_peaks(source_path)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_encode_peaks(total_samples, levels))
+    os.replace(tmp_path, output_path)
+
+    print(f"[FasterWhisper] 波形峰值已生成: {os.path.basename(source_path)} "
+          f"({total_samples / WAVEFORM_SAMPLE_RATE:.1f}s, {len(levels)} 层)")
+    evict_lru(get_cache_dir("waveforms"), WAVEFORM_CACHE_QUOTA_BYTES, keep=[output_path], label="波形缓存")
+    return output_path
+
+
+def schedule_waveform(source_path):
+    """在后台排队计算波形峰值（同一文件只计算一次）"""
+    return submit_job(("waveform", file_fingerprint(source_path)), generate_waveform, source_path)
+
+
+def get_waveform_status(source_path):
+    """返回波形生成状态: ready / pending / error / none"""
+    peaks_path = get_waveform_path(source_path)
+    if os.path.exists(peaks_path):
+        touch(peaks_path)
+        return "ready", None
+    status, error = get_job_status(("waveform", file_fingerprint(source_path)))
+    if status == "done":
+        return "none", None
+    return status, error
@@ -0,0 +1,151 @@
+"""
+任务工作区模块 - 每次执行使用独立的临时目录，结束后自动清理
+中间文件（ASS/SRT 字幕、分段视频、临时音频）互不覆盖，多个任务可以在同一台机器上并发运行；
+输出文件先写入同目录的临时名，完成后原子替换为最终文件名；
+交给下游节点的结果写在临时目录的固定子目录中，与异常退出遗留的工作区一起按时间清理
+"""
+
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import folder_paths
+
+# 超过该时间仍未清理的工作区视为异常退出遗留，创建新工作区时顺带删除
+STALE_WORKSPACE_SECONDS = 24 * 3600
+# 运行中的工作区定期刷新存活标记，长任务（或同一临时目录下的其他进程）的工作区不会被误删
+HEARTBEAT_SECONDS = 3600
+ALIVE_MARKER = ".alive"
+# 交给下游节点的结果所在的临时子目录，超过 STALE_WORKSPACE_SECONDS 未修改的文件会被清理
+TEMP_OUTPUT_SUBDIRS = ("burned_videos", "subtitle_previews")
+
+_active = set()
+_active_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+def get_jobs_root():
+    """所有任务工作区的父目录"""
+    root = os.path.join(folder_paths.get_temp_directory(), "faster_whisper_jobs")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def _touch_alive(workspace):
+    marker = os.path.join(workspace, ALIVE_MARKER)
+    try:
+        with open(marker, "a"):
+            pass
+        os.utime(marker, None)
+    except OSError:
+        pass
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        with _active_lock:
+            workspaces = list(_active)
+        for workspace in workspaces:
+            _touch_alive(workspace)
+
+
+def _start_heartbeat():
+    global _heartbeat_thread
+    with _active_lock:
+        if _heartbeat_thread is None:
+            _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name="FasterWhisperWorkspace",
+                                                 daemon=True)
+            _heartbeat_thread.start()
+
+
+def _last_alive(path):
+    """工作区最近一次存活的时间：优先取存活标记，旧版本遗留的工作区取目录修改时间"""
+    try:
+        return os.stat(os.path.join(path, ALIVE_MARKER)).st_mtime
+    except OSError:
+        return os.stat(path).st_mtime
+
+
+def _cleanup_stale(root):
+    now = time.time()
+    with _active_lock:
+        active = set(_active)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if (os.path.isdir(path) and path not in active
+                    and now - _last_alive(path) > STALE_WORKSPACE_SECONDS):
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+    for subdir in TEMP_OUTPUT_SUBDIRS:
+        directory = os.path.join(folder_paths.get_temp_directory(), subdir)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.isfile(path) and now - os.stat(path).st_mtime > STALE_WORKSPACE_SECONDS:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+@contextmanager
+def job_workspace(prefix="job"):
+    """
+    创建本次执行专用的工作目录，退出时（包括异常和中断）删除
+
+    Yields:
+        工作目录路径
+    """
+    root = get_jobs_root()
+    _cleanup_stale(root)
+    workspace = tempfile.mkdtemp(prefix=f"{prefix}_", dir=root)
+    _touch_alive(workspace)
+    with _active_lock:
+        _active.add(workspace)
+    _start_heartbeat()
+    try:
+        yield workspace
+    finally:
+        with _active_lock:
+            _active.discard(workspace)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def unique_output_path(directory, stem, ext):
+    """在输出目录中生成不会与其他任务冲突的文件名"""
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{stem}_{uuid.uuid4().hex[:8]}.{ext}")
+
+
+def temp_output_path(subdir, stem, ext):
+    """在 ComfyUI 临时目录的 subdir（须在 TEMP_OUTPUT_SUBDIRS 中）下生成交给下游节点的结果路径"""
+    return unique_output_path(os.path.join(folder_paths.get_temp_directory(), subdir), stem, ext)
+
+
+def atomic_temp_path(final_path):
+    """返回与最终文件同目录、扩展名相同的临时路径（FFmpeg 等按扩展名判断格式）"""
+    directory, name = os.path.split(final_path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.{uuid.uuid4().hex[:8]}.tmp{ext}")
+
+
+def finalize_output(tmp_path, final_path):
+    """将已完整写入的临时文件原子替换为最终文件；跨文件系统时先复制到同目录再替换"""
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    try:
+        os.replace(tmp_path, final_path)
+    except OSError:
+        staging = atomic_temp_path(final_path)
+        shutil.copy2(tmp_path, staging)
+        os.replace(staging, final_path)
+        os.remove(tmp_path)
+    return final_path
@@ -10,26 +10,101 @@ import { api } from "../../../scripts/api.js";
 const VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.webm'];
 const AUDIO_EXTENSIONS = ['.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg'];
 
+// 分块上传参数
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_PARALLEL = 4;
+const UPLOAD_MAX_RETRIES = 5;
+
+/**
+ * 计算分块的 SHA-256（非安全上下文中 crypto.subtle 不可用时返回 null，服务端跳过校验）
+ */
+async function sha256Hex(buffer) {
+    if (!window.crypto?.subtle) return null;
+    const digest = await window.crypto.subtle.digest('SHA-256', buffer);
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
 /**
- * 上传文件到服务器
+ * 上传单个分块，失败时指数退避重试
  */
-async function uploadMediaFile(file) {
-    const formData = new FormData();
-    formData.append('image', file);
-    formData.append('subfolder', 'media');
-    formData.append('type', 'input');
+async function uploadChunk(file, session, index) {
+    const start = index * session.chunk_size;
+    const blob = file.slice(start, Math.min(start + session.chunk_size, file.size));
+    const buffer = await blob.arrayBuffer();
+    const checksum = await sha256Hex(buffer);
+    const headers = { 'Content-Type': 'application/octet-stream' };
+    if (checksum) headers['X-Chunk-SHA256'] = checksum;
     
+    let lastError = null;
+    for (let attempt = 0; attempt < UPLOAD_MAX_RETRIES; attempt++) {
+        try {
+            const response = await api.fetchApi(
+                `/faster_whisper/upload/chunk?upload_id=${session.upload_id}&index=${index}`,
+                { method: 'PUT', headers, body: buffer }
+            );
+            if (response.ok) return;
+            lastError = new Error(`分块 ${index} 上传失败: ${response.status}`);
+            // 会话不存在时重试无意义
+            if (response.status === 404 || response.status === 400) break;
+        } catch (error) {
+            lastError = error;
+        }
+        await new Promise(resolve => setTimeout(resolve, Math.min(1000 * 2 ** attempt, 15000)));
+    }
+    throw lastError;
+}
+
+/**
+ * 上传文件到服务器（分块、并行、可断点续传）
+ */
+async function uploadMediaFile(file, onProgress) {
     try {
-        const response = await api.fetchApi('/upload/image', {
+        const initResponse = await api.fetchApi('/faster_whisper/upload/init', {
             method: 'POST',
-            body: formData
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                filename: file.name,
+                size: file.size,
+                chunk_size: UPLOAD_CHUNK_SIZE,
+                file_key: `${file.name}:${file.size}:${file.lastModified}`
+            })
         });
+        if (!initResponse.ok) {
+            console.error('[FasterWhisper] 上传失败:', initResponse.statusText);
+            return null;
+        }
+        const session = await initResponse.json();
+        
+        // 只上传服务端尚未收到的分块
+        const received = new Set(session.received);
+        const pending = [];
+        for (let i = 0; i < session.total_chunks; i++) {
+            if (!received.has(i)) pending.push(i);
+        }
+        let done = session.total_chunks - pending.length;
+        onProgress?.(session.total_chunks ? done / session.total_chunks : 1);
+        
+        const worker = async () => {
+            while (pending.length > 0) {
+                const index = pending.shift();
+                await uploadChunk(file, session, index);
+                done++;
+                onProgress?.(done / session.total_chunks);
+            }
+        };
+        const workerCount = Math.min(UPLOAD_PARALLEL, pending.length);
+        await Promise.all(Array.from({ length: workerCount }, worker));
         
-        if (response.status === 200) {
-            const result = await response.json();
+        const finalizeResponse = await api.fetchApi('/faster_whisper/upload/finalize', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ upload_id: session.upload_id })
+        });
+        if (finalizeResponse.status === 200) {
+            const result = await finalizeResponse.json();
             return result.name;
         } else {
-            console.error('[FasterWhisper] 上传失败:', response.statusText);
+            console.error('[FasterWhisper] 上传失败:', finalizeResponse.statusText);
             return null;
         }
     } catch (error) {
@@ -118,6 +193,14 @@ function addStyles() {
             margin-top: 10px;
         }
         
+        .fw-waveform {
+            width: 100%;
+            height: 80px;
+            display: block;
+            background: #151521;
+            border-radius: 6px;
+        }
+        
         .fw-text-display {
             width: 100%;
             max-height: 350px;
@@ -261,7 +344,9 @@ app.registerExtension({
                     uploadBtn.innerHTML = '⏳ <span>上传中...</span>';
                     uploadBtn.disabled = true;
                     
-                    const filename = await uploadMediaFile(file);
+                    const filename = await uploadMediaFile(file, (ratio) => {
+                        uploadBtn.innerHTML = `⏳ <span>上传中... ${Math.floor(ratio * 100)}%</span>`;
+                    });
                     
                     if (filename) {
                         // 更新节点的 media_file widget
@@ -314,6 +399,142 @@ app.registerExtension({
     }
 });
 
+/**
+ * 构建预览接口地址（低码率代理 / 封面）
+ */
+function previewUrl(filename, subfolder, type, kind) {
+    return `/faster_whisper/preview?filename=${encodeURIComponent(filename)}&subfolder=${encodeURIComponent(subfolder)}&type=${type}&kind=${kind}`;
+}
+
+/**
+ * 为 video 元素设置预览源：先播放可用的源，代理生成完成后无缝切换到低码率代理
+ */
+function attachVideoPreview(video, filename, subfolder, type) {
+    const token = Symbol('preview');
+    video._fwPreviewToken = token;
+    video.poster = previewUrl(filename, subfolder, type, 'poster');
+    video.src = previewUrl(filename, subfolder, type, 'proxy');
+    
+    const statusUrl = `/faster_whisper/preview/status?filename=${encodeURIComponent(filename)}&subfolder=${encodeURIComponent(subfolder)}&type=${type}`;
+    let attempts = 0;
+    const poll = async () => {
+        if (video._fwPreviewToken !== token || attempts++ > 120) return;
+        try {
+            const response = await api.fetchApi(statusUrl);
+            const data = await response.json();
+            if (data.status === 'ready') {
+                if (video._fwPreviewToken !== token) return;
+                const position = video.currentTime;
+                const wasPlaying = !video.paused;
+                video.poster = previewUrl(filename, subfolder, type, 'poster') + `&t=${Date.now()}`;
+                video.src = previewUrl(filename, subfolder, type, 'proxy') + `&t=${Date.now()}`;
+                video.currentTime = position;
+                if (wasPlaying) video.play().catch(() => {});
+                return;
+            }
+            if (data.status === 'error' || data.status === 'none') return;
+        } catch (e) {
+            return;
+        }
+        setTimeout(poll, 3000);
+    };
+    // 代理已生成时首个请求即命中，仅在生成中时轮询
+    api.fetchApi(statusUrl).then(r => r.json()).then(data => {
+        if (data.status === 'pending') setTimeout(poll, 3000);
+    }).catch(() => {});
+}
+
+/**
+ * 解析波形峰值二进制数据（格式见 utils/waveform.py）
+ */
+function parseWaveformPeaks(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'FWPK') return null;
+    
+    const sampleRate = view.getUint32(8, true);
+    const totalSamples = Number(view.getBigUint64(12, true));
+    const levelCount = view.getUint32(20, true);
+    
+    let offset = 24;
+    const levels = [];
+    for (let i = 0; i < levelCount; i++) {
+        levels.push({ samplesPerPeak: view.getUint32(offset, true), count: view.getUint32(offset + 4, true) });
+        offset += 8;
+    }
+    for (const level of levels) {
+        level.data = new Int8Array(buffer, offset, level.count * 2);
+        offset += level.count * 2;
+    }
+    return { duration: totalSamples / sampleRate, levels };
+}
+
+/**
+ * 绘制波形：选择分辨率刚好覆盖画布宽度的层级，已播放部分高亮
+ */
+function drawWaveform(canvas, peaks, progress) {
+    const ctx = canvas.getContext('2d');
+    const { width, height } = canvas;
+    ctx.clearRect(0, 0, width, height);
+    if (!peaks || peaks.levels.length === 0) return;
+    
+    let level = peaks.levels[0];
+    for (const candidate of peaks.levels) {
+        if (candidate.count >= width) level = candidate;
+    }
+    
+    const mid = height / 2;
+    const playedX = progress * width;
+    for (let x = 0; x < width; x++) {
+        const start = Math.floor(x * level.count / width);
+        const end = Math.max(start + 1, Math.floor((x + 1) * level.count / width));
+        let min = 0, max = 0;
+        for (let i = start; i < end && i < level.count; i++) {
+            min = Math.min(min, level.data[i * 2]);
+            max = Math.max(max, level.data[i * 2 + 1]);
+        }
+        ctx.fillStyle = x < playedX ? '#a78bfa' : '#667eea';
+        const top = mid - (max / 128) * mid;
+        const bottom = mid - (min / 128) * mid;
+        ctx.fillRect(x, top, 1, Math.max(1, bottom - top));
+    }
+}
+
+/**
+ * 加载波形峰值并绑定点击跳转（峰值在后台生成，未就绪时轮询）
+ */
+async function loadWaveform(filename, subfolder, type, canvas, audio) {
+    const url = `/faster_whisper/waveform?filename=${encodeURIComponent(filename)}&subfolder=${encodeURIComponent(subfolder)}&type=${type}`;
+    let peaks = null;
+    
+    for (let attempt = 0; attempt < 90 && canvas.isConnected !== false; attempt++) {
+        try {
+            const response = await api.fetchApi(url);
+            if (response.status === 200) {
+                peaks = parseWaveformPeaks(await response.arrayBuffer());
+                break;
+            }
+            if (response.status !== 202) return;
+        } catch (e) {
+            return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+    if (!peaks) return;
+    
+    const redraw = () => drawWaveform(canvas, peaks, peaks.duration ? audio.currentTime / peaks.duration : 0);
+    redraw();
+    audio.addEventListener('timeupdate', redraw);
+    canvas.style.cursor = 'pointer';
+    canvas.addEventListener('click', (e) => {
+        const rect = canvas.getBoundingClientRect();
+        const ratio = Math.min(1, Math.max(0, (e.clientX - rect.left) / rect.width));
+        audio.currentTime = ratio * peaks.duration;
+        audio.play().catch(() => {});
+        redraw();
+    });
+}
+
 /**
  * 更新媒体预览
  */
@@ -332,7 +553,7 @@ function updateMediaPreview(filename, container) {
     
     if (isVideo) {
         const video = document.createElement('video');
-        video.src = mediaUrl;
+        attachVideoPreview(video, filename, 'media', 'input');
         video.controls = true;
         video.loop = true;
         video.muted = false;
@@ -350,17 +571,27 @@ function updateMediaPreview(filename, container) {
         const audio = document.createElement('audio');
         audio.src = mediaUrl;
         audio.controls = true;
+        // 只在播放时才拉取媒体数据，概览由预计算的波形提供
+        audio.preload = 'none';
         audio.style.width = '100%';
         
+        const canvas = document.createElement('canvas');
+        canvas.className = 'fw-waveform';
+        canvas.width = 600;
+        canvas.height = 80;
+        
         const hint = document.createElement('div');
         hint.className = 'fw-info-badge';
-        hint.textContent = '鼠标悬停自动播放';
+        hint.textContent = '鼠标悬停自动播放，点击波形跳转';
         
         audioContainer.appendChild(icon);
+        audioContainer.appendChild(canvas);
         audioContainer.appendChild(audio);
         audioContainer.appendChild(hint);
         container.appendChild(audioContainer);
         
+        loadWaveform(filename, 'media', 'input', canvas, audio);
+        
         // 鼠标悬停播放
         container.addEventListener('mouseenter', () => {
             if (audio.paused) audio.play().catch(() => {});
@@ -371,12 +602,61 @@ function updateMediaPreview(filename, container) {
     }
 }
 
+/**
+ * 找到输入直接连接到 sourceId 节点的文本展示框
+ */
+function findLinkedTextDisplays(sourceId) {
+    const graph = app.graph;
+    if (!graph) return [];
+    return graph._nodes.filter(node =>
+        node.type === "FW_TextDisplay" &&
+        (node.inputs || []).some(input => {
+            const link = input.link != null ? graph.links[input.link] : null;
+            return link && String(link.origin_id) === sourceId;
+        })
+    );
+}
+
+/**
+ * 翻译过程中显示已完成的字幕（语音识别节点推送的实时预览）
+ */
+function showTranslationPreview(node, data) {
+    if (!node._fwMainContainer) return;
+    if (data.reset || !node._fwPreviewCues) {
+        node._fwPreviewCues = new Map();
+    }
+    for (const [index, source, text] of data.cues) {
+        node._fwPreviewCues.set(index, [source, text]);
+    }
+    
+    const indices = [...node._fwPreviewCues.keys()].sort((a, b) => a - b);
+    node._fwSingleDisplay.style.display = 'none';
+    node._fwDualContainer.style.display = 'flex';
+    node._fwLeftContent.textContent = indices.map(i => `${i + 1}\n${node._fwPreviewCues.get(i)[0]}`).join('\n\n');
+    node._fwRightContent.textContent = indices.map(i => `${i + 1}\n${node._fwPreviewCues.get(i)[1]}`).join('\n\n');
+    node._fwRightHeader.textContent = data.done
+        ? '🌐 翻译'
+        : `🌐 翻译中 ${data.translated}/${data.total}`;
+    node._fwRightContent.scrollTop = node._fwRightContent.scrollHeight;
+    node.setDirtyCanvas(true, true);
+}
+
 /**
  * 注册 TextDisplay 节点扩展
  */
 app.registerExtension({
     name: "FasterWhisper.TextDisplay",
     
+    async setup() {
+        api.addEventListener("faster_whisper.translation_preview", (event) => {
+            const data = event.detail;
+            if (!data) return;
+            for (const node of findLinkedTextDisplays(data.node)) {
+                showTranslationPreview(node, data);
+            }
+        });
+    },
+    
     async beforeRegisterNodeDef(nodeType, nodeData, app) {
         if (nodeData.name !== "FW_TextDisplay") return;
         
@@ -439,6 +719,7 @@ app.registerExtension({
             node._fwDualContainer = dualContainer;
             node._fwLeftContent = leftContent;
             node._fwRightContent = rightContent;
+            node._fwRightHeader = rightHeader;
         };
         
         const onExecuted = nodeType.prototype.onExecuted;
@@ -450,6 +731,10 @@ app.registerExtension({
             const originalText = message.text && message.text[0] ? message.text[0] : '';
             const translatedText = message.translated_text && message.translated_text[0] ? message.translated_text[0] : '';
             
+            // 最终结果替换实时预览
+            this._fwPreviewCues = null;
+            this._fwRightHeader.textContent = '🌐 翻译';
+            
             if (translatedText) {
                 // 双列模式
                 this._fwSingleDisplay.style.display = 'none';
@@ -512,11 +797,10 @@ app.registerExtension({
             
             if (message && message.video && message.video[0]) {
                 const videoInfo = message.video[0];
-                const videoUrl = `/view?filename=${encodeURIComponent(videoInfo.filename)}&subfolder=${encodeURIComponent(videoInfo.subfolder)}&type=${videoInfo.type}`;
                 
                 if (this._fwVideoPreview && this._fwVideoElement) {
                     this._fwVideoPreview.style.display = 'block';
-                    this._fwVideoElement.src = videoUrl;
+                    attachVideoPreview(this._fwVideoElement, videoInfo.filename, videoInfo.subfolder, videoInfo.type);
                     this._fwVideoElement.load();
                 }
             }